@@ -30,6 +30,9 @@ PyInstaller.__main__.run([
     f'--add-data={os.path.join("README.md")}{OS_OPERATOR}.',
     f'--add-data={GEOMAG_WMM_PATH}{OS_OPERATOR}geomag',  # geomag WMM.COF file
     f'--add-data=resources{OS_OPERATOR}resources',
+    f'--add-data={os.path.join("..", "pySAS", "calibration.py")}{OS_OPERATOR}pySAS',  # shared with pySAS
+    f'--add-data={os.path.join("..", "pySAS", "declination.py")}{OS_OPERATOR}pySAS',  # shared with pySAS
+    f'--add-data={os.path.join("..", "pySAS", "log.py")}{OS_OPERATOR}pySAS',  # shared with pySAS
     f'--icon={os.path.join("resources", f"prepSAS.{ICON_EXT}")}',
     '--osx-bundle-identifier=com.umaine.sms.prepsas',
     f'--distpath={DIST_PATH}',
@@ -1,6 +1,8 @@
 import re
 import os
+import sys
 import glob
+import importlib.util
 import logging
 import configparser
 import multiprocessing
@@ -8,7 +10,7 @@ from functools import reduce
 from operator import xor
 from time import time
 from datetime import datetime, timedelta, timezone
-from struct import pack, unpack
+from struct import unpack
 from struct import error as StructError
 
 import numpy as np
@@ -33,6 +35,29 @@ logger = logging.getLogger('prepSAS')
 WORLD_MAGNETIC_MODEL = GeoMag()
 
 
+def load_pysas_module(name):
+    """
+    Load standalone module from pySAS (importing the package would load the pySAS configuration)
+    Look for module in source tree (../pySAS) and in application bundled with PyInstaller (pySAS)
+    :param name: name of module (e.g. 'calibration')
+    :return: module
+    """
+    for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pySAS'),
+                 os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), 'pySAS')):
+        filename = os.path.join(path, f'{name}.py')
+        if os.path.isfile(filename):
+            spec = importlib.util.spec_from_file_location(f'pySAS_{name}', filename)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return module
+    raise ImportError(f'pySAS module {name} not found.')
+
+
+calibration = load_pysas_module('calibration')
+declination = load_pysas_module('declination')
+log = load_pysas_module('log')
+
+
 def sun_position(args):
     # args = lat, lon, dt_utc, altitude
     return f'{get_azimuth(*args):05.1f}', f'{get_altitude(*args):04.1f}'
@@ -42,6 +67,7 @@ class Converter:
 
     def __init__(self, path_to_cal, path_to_cfg):
         self.parser = pySat(path_to_cal)
+        self.compiled_cal = calibration.compile_calibrations(self.parser)
         cfg = configparser.ConfigParser()
         try:
             if not cfg.read(path_to_cfg):
@@ -52,14 +78,19 @@ class Converter:
         self.cfg_tower_zero = cfg.getfloat('AutoPilot', 'indexing_table_orientation_on_ship', fallback=0)
         self.cfg_target = cfg.getfloat('AutoPilot', 'optimal_angle_away_from_sun', fallback=135)
 
-    def read_sat(self, filenames):
+    def read_sat(self, filenames, headers=None, start=None, end=None):
         """
         Read Satlantic file(s), much faster than method provided in pySatlantic format
         Split raw data based on frame header instead of using pySatlantic.instrument.Instrument.find_frame method
+        Frames are located with the index file (.idx) written by pySAS alongside the data file, if present
         :param filenames: list of file names to read
-        :param headers:
+        :param headers: list of frame headers to keep (default: all headers in calibration)
+        :param start: keep frames from datetime (UTC)
+        :param end: keep frames before datetime (UTC)
         :return:
         """
+        start = None if start is None else pd.to_datetime(start, utc=True)
+        end = None if end is None else pd.to_datetime(end, utc=True)
         data = list()
         with logging_redirect_tqdm():
             for filename in tqdm(filenames if isinstance(filenames, list) else [filenames], 'Reading SAT'):
@@ -70,6 +101,13 @@ class Converter:
                 if len(raw) == 0:
                     logger.warning(f'{os.path.basename(filename)}:Empty file.')
                     continue
+                filename_index = os.path.splitext(filename)[0] + '.idx'
+                if os.path.isfile(filename_index):
+                    try:
+                        data.append(self._read_sat_indexed(raw, filename_index, headers, start, end))
+                        continue
+                    except (ValueError, StructError) as e:
+                        logger.warning(f'{os.path.basename(filename_index)}:{e} Splitting frames instead.')
                 # logger.debug(f'read in {time()-tic:.3f} s')
                 # Separate frames with regex
                 # tic = time()
@@ -116,15 +154,75 @@ class Converter:
             logger.warning('No valid Satlantic data.')
             return
         data = pd.concat(data, ignore_index=True)
+        # Select frames
+        if headers is not None:
+            data = data[data.header.isin([h.encode('ascii') if isinstance(h, str) else h for h in headers])]
+        if start is not None:
+            data = data[data.timestamp >= start]
+        if end is not None:
+            data = data[data.timestamp < end]
         # Drop corrupted frames (check timestamp and length)
         n = len(data)
-        data.dropna(inplace=True)
+        if n == 0:
+            logger.warning('No Satlantic frames selected.')
+            return
+        data = data.dropna()
         frame_lengths = data.header.replace(*zip(*[(k.encode('ascii'), 0 if v.variable_frame_length else v.frame_length)
                                                    for k, v in self.parser.cal.items()]))
         data.drop(data.index[(data.frame.str.len() != frame_lengths) & (frame_lengths != 0)], inplace=True)
         logger.debug(f'Corrupted SAT frames dropped: {(n - len(data)) / n * 100:.2f} %')
         return data
 
+    def _read_sat_indexed(self, raw, filename_index, headers=None, start=None, end=None):
+        """
+        Get frames from Satlantic file with index of frames (no need to search for frame headers)
+        :param raw: content of Satlantic file
+        :param filename_index: index of frames in Satlantic file (.idx)
+        :param headers: list of frame headers to keep
+        :param start: keep frames from datetime (UTC)
+        :param end: keep frames before datetime (UTC)
+        :return: DataFrame with timestamp, header, and frame
+        """
+        table, records = log.read_frame_index(filename_index)
+        # Keep frames with headers from calibration, fully written in file, and within selection
+        keep = {k.encode('ascii') for k in self.parser.cal.keys()} - {b'SATHDR'}
+        if headers is not None:
+            keep &= {h.encode('ascii') if isinstance(h, str) else h for h in headers}
+        ids = [i for i, h in enumerate(table) if h in keep]
+        sel = np.isin(records['header_id'], ids) & \
+            (records['offset'] + records['length'] + log.FrameIndexWriter.TIMESTAMP_LENGTH <= len(raw))
+        # Timestamps are stored with millisecond precision in Satlantic file
+        timestamps = pd.to_datetime(np.floor(records['timestamp'] * 1000).astype(np.int64) * 1000, unit='us', utc=True)
+        if start is not None:
+            sel &= timestamps >= start
+        if end is not None:
+            sel &= timestamps < end
+        records, timestamps = records[sel], timestamps[sel]
+        timestamps = pd.Series(timestamps).where((datetime(2020, 1, 1, tzinfo=timezone.utc) <= timestamps) &
+                                                 (timestamps <= datetime.utcnow().astimezone(timezone.utc)))
+        return pd.DataFrame({'timestamp': timestamps,
+                             'header': [table[i] for i in records['header_id']],
+                             'frame': [raw[o:o + n] for o, n in zip(records['offset'].tolist(),
+                                                                     records['length'].tolist())]})
+
+    def calibrate_sat(self, data):
+        """
+        Calibrate spectral frames (Lt, Li, Es, and darks) read with read_sat in bulk
+        :param data: DataFrame returned by read_sat
+        :return: dictionary indexed by frame header of DataFrame with timestamp and calibrated core variables
+        """
+        calibrated = dict()
+        for header, frames in data.groupby('header'):
+            header = header.decode('ascii')
+            if header not in self.compiled_cal:
+                continue
+            cal = self.compiled_cal[header]
+            values = cal.decode_many(frames.frame.tolist())
+            df = pd.DataFrame(values, columns=[f'{cal.groupname}{w:.2f}' for w in cal.wavelength], index=frames.index)
+            df.insert(0, 'timestamp', frames.timestamp)
+            calibrated[header] = df
+        return calibrated
+
     @staticmethod
     def read_gps(filename):
         """
@@ -193,7 +291,7 @@ class Converter:
         """
         Make $GPRMC NMEA frames to be ingested by HyperInSPACE
         :param df: gps data frame
-        :param compute_magnetic_declination: Enable computation of magnetic declination (very slow)
+        :param compute_magnetic_declination: Compute magnetic declination of each frame (otherwise use first position)
         :return:
         """
         logger.debug('Making $GPRMC frames ...')
@@ -214,10 +312,9 @@ class Converter:
         course = (df.heading_motion).apply(lambda x: f'{x:05.1f}')
         ddmmyy = df.gps_datetime.dt.strftime('%d%m%y')
         if compute_magnetic_declination:
-            # vgeomag = np.vectorize(WORLD_MAGNETIC_MODEL.GeoMag)
-            # vgeomag(df.latitude, df.longitude, df.altitude * 3.2808399, df.gps_datetime.dt.date)
-            mag_var = df.apply(lambda row: WORLD_MAGNETIC_MODEL.GeoMag(
-                row.latitude, row.longitude, row.altitude * 3.2808399, row.gps_datetime.date()).dec, axis='columns')
+            mag_var = pd.Series(declination.geomag_declination(
+                WORLD_MAGNETIC_MODEL, df.latitude.to_numpy(), df.longitude.to_numpy(), df.altitude.to_numpy(),
+                df.gps_datetime.dt.tz_convert(None).to_numpy()), index=df.index)
             mag_var_hm = pd.Series(['E'] * len(df))
             mag_var_hm[mag_var < 0] = 'W'
             mag_var = np.abs(mag_var).apply(lambda x: f'{x:05.1f}')
@@ -338,11 +435,8 @@ class Converter:
             header[b'LONGITUDE'] = bytes(f"{meta['ll_lon']}:{meta['ur_lon']}", 'ascii')
         header = self.make_sathdr(header)
         # Format data
-        body = b''.join([f + pack('!ii', d, t)[1:] for f, d, t in zip(
-            data.frame,
-            data.timestamp.dt.strftime('%Y%j').astype(int).to_list(),
-            data.timestamp.dt.strftime('%H%M%S%f').str[:-3].astype(int).to_list()
-        ) if not pd.isna(f)])
+        timestamps = log.pack_timestamps_satlantic(pd.to_datetime(data.timestamp, utc=True).dt.tz_convert(None).to_numpy())
+        body = b''.join([f + t for f, t in zip(data.frame, timestamps) if not pd.isna(f)])
         # Write to file
         with open(filename, mode='wb') as f:
             logger.debug(f'Writing {os.path.basename(filename)}')
@@ -350,7 +444,7 @@ class Converter:
             f.write(body)
 
     def run(self, path_in, path_out, file_out_prefix='pySAS_', mode='day', parallel=True,
-            meta={}, compute_magnetic_declination=False):
+            meta={}, compute_magnetic_declination=True):
         """
         Convert pySAS output to Satlantic formatted files for HyperInSPACE.
         Output files can be written by hours or days.
@@ -362,7 +456,7 @@ class Converter:
         :param mode: process data files by day ('day') or by hour ('hour'). Use UTC as timezone.
         :param parallel: compute sun position with all cores of computer
         :param meta: metadata to append to Satlantic file header
-        :param compute_magnetic_declination: computationally intense. HyperInSPACE doesn't use it, so it can be skipped.
+        :param compute_magnetic_declination: magnetic variation of each $GPRMC frame (HyperInSPACE doesn't use it)
         :return:
         """
         # Read all data
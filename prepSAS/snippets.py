@@ -92,12 +92,14 @@ for filename in sorted(glob.glob('*.raw', root_dir=PATH_IN)):
             df.frame[i] = row.frame.replace(b',,', b',')
     c.write(df, os.path.join(PATH_OUT, filename))
 
-# %% Parse frames with pySatlantic (beyond splitting frames)
-import pySatlantic.instrument as pySat
-
-parser = pySat.Instrument(PATH_CAL)
-# parser.parse_frame(df.loc[20, 'frame'])
+# %% Parse frames (beyond splitting frames)
 print(f'Timestamp is monotonic: {df.timestamp.sort_values().index.is_monotonic_increasing}')
-for i, row in tqdm(df.iterrows(), total=len(df)):
+# Calibrate spectral frames (Lt, Li, Es, and darks) in bulk
+spectra = c.calibrate_sat(df)
+for header, s in spectra.items():
+    print(header, s.shape)
+# Other frames (e.g. THS, variable length) with pySatlantic
+others = df[~df.header.isin([h.encode('ascii') for h in spectra])]
+for i, row in tqdm(others.iterrows(), total=len(others)):
     frame = c.parser.parse_frame(row.frame, row.header.decode(), flag_get_auxiliary_variables=True, flag_get_unusable_variables=True)
 
@@ -6,6 +6,7 @@ import os
 import sys
 import traceback
 from geomag.geomag import GeoMag
+from pySAS.declination import DeclinationCache
 import configparser
 
 __version__ = '1.1.4'
@@ -61,6 +62,7 @@ logging.getLogger('werkzeug').setLevel(logging.WARNING)
 
 # Load NOAA World Magnetic Model
 WORLD_MAGNETIC_MODEL = GeoMag()
+MAGNETIC_DECLINATION = DeclinationCache(WORLD_MAGNETIC_MODEL)
 
 root_logger.info('pySAS v%s initialized' % __version__)
 
@@ -0,0 +1,141 @@
+"""
+Vectorized calibration of Satlantic HyperOCR frames (Lt, Li, Es, and darks).
+Compile the sensor definition of a fixed length frame parsed by pySatlantic into NumPy arrays (field offsets, dtype,
+and calibration coefficients) to decode one or millions of frames without going through each variable in Python.
+This module only depends on NumPy and pySatlantic so it can be shared with prepSAS.
+"""
+import numpy as np
+from pySatlantic.instrument import FrameLengthError, ParserFitError
+
+
+class CompiledCalibration:
+    """
+    Calibration of the core variables of a fixed length Satlantic frame compiled into NumPy arrays.
+    Supported fit types of core variables are OPTIC2 and OPTIC3 (integration time must be fitted with POLYU).
+        OPTIC2: im * a1 * (counts - a0)
+        OPTIC3: im * a1 * (counts - a0) * (cint / aint)
+    Results are identical to pySatlantic.instrument.Instrument.parse_frame for the core variables.
+    """
+
+    def __init__(self, cal):
+        """
+        :param cal: pySatlantic.instrument.Parser of a fixed length frame
+        """
+        if cal.variable_frame_length:
+            raise ParserFitError(f'{cal.frame_header}: variable length frames can not be compiled.')
+        if not cal.core_variables:
+            raise ParserFitError(f'{cal.frame_header}: no core variables to compile.')
+        self.frame_header = cal.frame_header
+        self.frame_length = cal.frame_length
+        self.groupname = cal.core_groupname
+        self.fit_type = cal.fit_type[cal.core_variables[0]]
+        if self.fit_type not in ('OPTIC2', 'OPTIC3'):
+            raise ParserFitError(f'{cal.frame_header}: fit type {self.fit_type} can not be compiled.')
+        self.wavelength = np.array([float(cal.id[i]) for i in cal.core_variables])
+        # Field offsets and dtypes (big endian) from frame format
+        offsets = np.cumsum([cal.frame_header_length] + cal.field_length[:-1])
+        dtypes = [self._field_dtype(t, l) for t, l in zip(cal.data_type, cal.field_length)]
+        names, formats, field_offsets = [], [], []
+        core_dtype = dtypes[cal.core_variables[0]]
+        contiguous = all(dtypes[i] == core_dtype and offsets[i] == offsets[cal.core_variables[0]] + k * core_dtype.itemsize
+                         for k, i in enumerate(cal.core_variables))
+        if contiguous:
+            # Core variables read as one sub-array (typical case of HyperOCR)
+            names.append('counts')
+            formats.append((core_dtype, len(cal.core_variables)))
+            field_offsets.append(offsets[cal.core_variables[0]])
+            self._core_fields = None
+        else:
+            self._core_fields = [f'c{i}' for i in cal.core_variables]
+            names += self._core_fields
+            formats += [dtypes[i] for i in cal.core_variables]
+            field_offsets += [offsets[i] for i in cal.core_variables]
+        # Integration time
+        self._inttime_coefs = None
+        if self.fit_type == 'OPTIC3':
+            if 'INTTIME' not in cal.type:
+                raise ParserFitError(f'{cal.frame_header}: OPTIC3 requires INTTIME.')
+            i = cal.type.index('INTTIME')
+            if cal.fit_type[i] != 'POLYU' or dtypes[i] is None:
+                raise ParserFitError(f'{cal.frame_header}: INTTIME must be binary with a POLYU fit.')
+            names.append('inttime')
+            formats.append(dtypes[i])
+            field_offsets.append(offsets[i])
+            self._inttime_coefs = np.array(cal.cal_coefs[i], dtype=np.float64)
+        if contiguous and core_dtype is None:
+            raise ParserFitError(f'{cal.frame_header}: core variables must be binary.')
+        self.dtype = np.dtype({'names': names, 'formats': formats, 'offsets': [int(o) for o in field_offsets],
+                               'itemsize': self.frame_length})
+        # Calibration coefficients: a0, a1, im, [cint]
+        coefs = cal.core_cal_coefs
+        self.a0 = np.ascontiguousarray(coefs[0], dtype=np.float64)
+        self.gain = coefs[1] * (coefs[2] if cal.immersed else 1.0)
+        if self.fit_type == 'OPTIC3':
+            self.gain = self.gain * coefs[3]
+        self.gain = np.ascontiguousarray(self.gain, dtype=np.float64)
+
+    @staticmethod
+    def _field_dtype(data_type, field_length):
+        if data_type in ('BU', 'BS') and field_length in (1, 2, 4):
+            return np.dtype(f'>{"u" if data_type == "BU" else "i"}{field_length}')
+        elif data_type == 'BF' and field_length == 4:
+            return np.dtype('>f4')
+        elif data_type == 'BD' and field_length == 8:
+            return np.dtype('>f8')
+        return None  # ASCII field (not used in computation)
+
+    def _counts(self, records):
+        if self._core_fields is None:
+            return records['counts']
+        return np.stack([records[f] for f in self._core_fields], axis=-1)
+
+    def _inttime(self, records):
+        raw = records['inttime'].astype(np.float64)
+        return np.polynomial.polynomial.polyval(raw, self._inttime_coefs)
+
+    def decode(self, frame):
+        """
+        Decode and calibrate core variables of one frame
+        :param frame: bytes of complete frame (header included)
+        :return: calibrated core variables (1D array)
+        """
+        if len(frame) != self.frame_length:
+            raise FrameLengthError('Unexpected frame length: %s expected %d actual %d' %
+                                   (self.frame_header, self.frame_length, len(frame)))
+        record = np.frombuffer(frame, dtype=self.dtype, count=1)[0]
+        if self._inttime_coefs is None:
+            return (self._counts(record) - self.a0) * self.gain
+        return (self._counts(record) - self.a0) * (self.gain / self._inttime(record))
+
+    def decode_many(self, frames):
+        """
+        Decode and calibrate core variables of frames in bulk
+        :param frames: bytes of contiguous frames or sequence of frames (all of same frame header)
+        :return: calibrated core variables (2D array: frames x core variables)
+        """
+        if not isinstance(frames, (bytes, bytearray, memoryview)):
+            frames = b''.join(frames)
+        if len(frames) % self.frame_length:
+            raise FrameLengthError('Unexpected length of frames: %s expected multiple of %d actual %d' %
+                                   (self.frame_header, self.frame_length, len(frames)))
+        records = np.frombuffer(frames, dtype=self.dtype)
+        values = self._counts(records) - self.a0
+        values *= self.gain
+        if self._inttime_coefs is not None:
+            values /= self._inttime(records)[:, np.newaxis]
+        return values
+
+
+def compile_calibrations(parser):
+    """
+    Compile all fixed length frames with supported core variables of a pySatlantic instrument
+    :param parser: pySatlantic.instrument.Instrument
+    :return: dictionary of CompiledCalibration indexed by frame header
+    """
+    compiled = dict()
+    for frame_header, cal in parser.cal.items():
+        try:
+            compiled[frame_header] = CompiledCalibration(cal)
+        except ParserFitError:
+            pass
+    return compiled
@@ -0,0 +1,137 @@
+import os
+from collections import namedtuple
+from struct import Struct
+from threading import Lock
+from time import gmtime, sleep, strftime, time
+
+# Capture file: header (magic, version, and name of instrument) followed by records
+# Each record is the timestamp at which bytes were received (or sent), direction, length, and raw bytes
+MAGIC = b'pySASCAP'
+VERSION = 1
+HEADER = Struct('<8sBH')
+RECORD = Struct('<dBI')
+RX, TX = 0, 1
+FILE_EXT = 'cap'
+
+ReplayStatistics = namedtuple('ReplayStatistics', ['chunks', 'bytes', 'duration', 'elapsed'])
+
+
+class CaptureWriter:
+    """
+    Record raw bytes exchanged with an instrument and their arrival time in a compact binary file. Thread safe.
+    """
+
+    def __init__(self, filename, name=''):
+        """
+        :param filename: path to capture file
+        :param name: name of instrument recorded
+        """
+        self.filename = filename
+        self._lock = Lock()
+        name = name.encode('utf-8')
+        self._file = open(filename, 'wb', buffering=65536)
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(name)) + name)
+
+    @classmethod
+    def open(cls, path, name):
+        """
+        Create new capture file named after instrument and current time
+        :param path: directory of capture files
+        :param name: name of instrument recorded
+        """
+        if not os.path.exists(path):
+            os.makedirs(path)
+        prefix = os.path.join(path, f"{name}_{strftime('%Y%m%d_%H%M%S', gmtime())}")
+        filename, suffix = f'{prefix}.{FILE_EXT}', 0
+        while os.path.exists(filename):
+            filename, suffix = f'{prefix}_{suffix}.{FILE_EXT}', suffix + 1
+        return cls(filename, name)
+
+    def write(self, data, timestamp, direction=RX):
+        """
+        :param data: bytes received from (or sent to) instrument
+        :param timestamp: time at which bytes were received (or sent)
+        :param direction: RX (received) or TX (sent)
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(RECORD.pack(timestamp, direction, len(data)) + data)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class CaptureReader:
+    """
+    Iterate over records of capture file: (timestamp, direction, data)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            magic, version, length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{filename} is not a pySAS capture file (version {VERSION})')
+            self.name = f.read(length).decode('utf-8')
+            self._offset = HEADER.size + length
+
+    def __iter__(self):
+        with open(self.filename, 'rb') as f:
+            f.seek(self._offset)
+            while True:
+                record = f.read(RECORD.size)
+                if len(record) < RECORD.size:
+                    return
+                timestamp, direction, length = RECORD.unpack(record)
+                data = f.read(length)
+                if len(data) < length:  # Capture interrupted while writing record
+                    return
+                yield timestamp, direction, data
+
+
+def replay(instrument, filename, speed=1.):
+    """
+    Feed bytes received in capture file to instrument (data_received) with their original timestamp
+    :param instrument: Sensor instance (e.g. GPS, IMU, HyperSAS), does not need to be started
+    :param filename: path to capture file
+    :param speed: replay speed relative to capture (e.g. 1, 10), None for as fast as possible
+    :return: ReplayStatistics: number of chunks and bytes replayed, duration of capture, and elapsed time (s)
+    """
+    chunks, n, first, last, start = 0, 0, None, None, time()
+    for timestamp, direction, data in CaptureReader(filename):
+        if direction != RX:
+            continue
+        if first is None:
+            first = timestamp
+        if speed:
+            delay = (timestamp - first) / speed - (time() - start)
+            if delay > 0:
+                sleep(delay)
+        instrument.data_received(data, timestamp)
+        chunks, n, last = chunks + 1, n + len(data), timestamp
+    return ReplayStatistics(chunks, n, 0 if first is None else last - first, time() - start)
+
+
+class ReplaySerial:
+    """
+    Serial port answering requests of the IndexingTable with the replies of a capture file (in order)
+    Replace serial connection of a started IndexingTable: indexing_table._serial = ReplaySerial(filename)
+    """
+
+    def __init__(self, filename, timeout=None):
+        self._replies = (data for _, direction, data in CaptureReader(filename) if direction == RX)
+        self.timeout = timeout
+        self.is_open = True
+
+    def write(self, data):
+        return len(data)
+
+    def read_until(self, expected=b'\n', size=None):
+        return next(self._replies, b'')
+
+    def reset_input_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
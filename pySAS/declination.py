@@ -0,0 +1,151 @@
+from datetime import date, datetime
+from functools import lru_cache
+from math import floor, isnan
+
+import numpy as np
+
+
+class DeclinationCache:
+    """
+    Magnetic declination from the World Magnetic Model (geomag) cached on a grid.
+    The model is evaluated at the corners of the grid cell containing the position (bounded LRU cache keyed by
+    cell, altitude, and UTC date) and the declination is interpolated bilinearly inside the cell.
+
+    Error bound: declination is smooth away from the magnetic poles; with the default cell of 0.25 x 0.25 deg
+    the interpolation error is below 0.02 deg for latitudes within +/-60 deg, 0.11 deg within +/-70 deg, and
+    0.2 deg within +/-80 deg (WMM-2015, random sample), under the accuracy of the model and of the compasses.
+    Rounding the altitude to 1000 m adds less than 0.002 deg and the date less than 0.001 deg near the surface.
+    """
+
+    def __init__(self, model, resolution=0.25, altitude_resolution=1000, maxsize=256):
+        """
+        :param model: geomag.geomag.GeoMag instance
+        :param resolution: size of grid cell in latitude and longitude (deg)
+        :param altitude_resolution: altitude is rounded to the nearest multiple of (m)
+        :param maxsize: maximum number of grid corners cached
+        """
+        self.model = model
+        self.resolution = resolution
+        self.altitude_resolution = altitude_resolution
+        self._corner = lru_cache(maxsize=maxsize)(self._evaluate)
+
+    def _evaluate(self, lat_index, lon_index, alt_index, day):
+        latitude = min(max(lat_index * self.resolution, -90), 90)
+        return self.model.GeoMag(latitude, lon_index * self.resolution,
+                                 alt_index * self.altitude_resolution * 3.2808399,  # m to ft
+                                 date.fromordinal(day)).dec
+
+    def get(self, latitude, longitude, altitude=0, day=None):
+        """
+        Get magnetic declination
+        :param latitude: latitude in decimal degrees North
+        :param longitude: longitude in decimal degrees East
+        :param altitude: altitude above mean sea level in meters
+        :param day: date or datetime (UTC), default today
+        :return: declination in degrees (positive East), nan if position is unknown
+        """
+        if isnan(latitude) or isnan(longitude):
+            return float('nan')
+        if day is None:
+            day = datetime.utcnow().date()
+        elif isinstance(day, datetime):
+            day = day.date()
+        day = day.toordinal()
+        alt_index = round(altitude / self.altitude_resolution) if not isnan(altitude) else 0
+        y, x = latitude / self.resolution, longitude / self.resolution
+        i, j = floor(y), floor(x)
+        dy, dx = y - i, x - j
+        d00, d01 = self._corner(i, j, alt_index, day), self._corner(i, j + 1, alt_index, day)
+        d10, d11 = self._corner(i + 1, j, alt_index, day), self._corner(i + 1, j + 1, alt_index, day)
+        # Interpolate differences to first corner as declination wraps around +/-180 near the magnetic poles
+        d01, d10, d11 = (d00 + (d - d00 + 180) % 360 - 180 for d in (d01, d10, d11))
+        return d00 + (d01 - d00) * dx + (d10 - d00) * dy + (d00 - d01 - d10 + d11) * dx * dy
+
+    def cache_info(self):
+        return self._corner.cache_info()
+
+    def cache_clear(self):
+        self._corner.cache_clear()
+
+
+def geomag_declination(model, latitude, longitude, altitude=0, dates=None):
+    """
+    Magnetic declination of arrays of positions and dates in one call
+    Vectorized version of geomag.geomag.GeoMag.GeoMag using the coefficients loaded by model:
+    the Legendre recursion and the spherical harmonic expansion are evaluated over all points at once.
+    :param model: geomag.geomag.GeoMag instance
+    :param latitude: latitude in decimal degrees North
+    :param longitude: longitude in decimal degrees East
+    :param altitude: altitude above mean sea level in meters
+    :param dates: dates (UTC) as datetime64 or any array-like numpy can convert to datetime64, default today
+    :return: declination in degrees (positive East)
+    """
+    latitude, longitude, altitude = np.broadcast_arrays(np.asarray(latitude, dtype=float),
+                                                        np.asarray(longitude, dtype=float),
+                                                        np.asarray(altitude, dtype=float))
+    if dates is None:
+        dates = np.datetime64(datetime.utcnow().date())
+    days = np.broadcast_to(np.asarray(dates, dtype='datetime64[D]'), latitude.shape)
+    years = days.astype('datetime64[Y]')
+    dt = years.astype(float) + 1970 + (days - years).astype(float) / 365.0 - model.epoch
+    alt = altitude / 1000  # km
+    # Convert from geodetic to spherical coordinates
+    rlat, rlon = np.radians(latitude), np.radians(longitude)
+    srlat, crlat = np.sin(rlat), np.cos(rlat)
+    srlat2, crlat2 = srlat * srlat, crlat * crlat
+    q = np.sqrt(model.a2 - model.c2 * srlat2)
+    q1 = alt * q
+    q2 = ((q1 + model.a2) / (q1 + model.b2)) ** 2
+    ct = srlat / np.sqrt(q2 * crlat2 + srlat2)
+    st = np.sqrt(1.0 - ct * ct)
+    r = np.sqrt(alt * alt + 2.0 * q1 + (model.a4 - model.c4 * srlat2) / (q * q))
+    d = np.sqrt(model.a2 * crlat2 + model.b2 * srlat2)
+    ca = (alt + d) / r
+    sa = model.c2 * crlat * srlat / (r * d)
+    # Accumulate terms of the spherical harmonic expansion
+    maxord = model.maxord
+    c, cd, k = np.asarray(model.c), np.asarray(model.cd), np.asarray(model.k)
+    m_lon = np.arange(maxord + 1).reshape((-1,) + (1,) * rlon.ndim) * rlon
+    sp, cp = np.sin(m_lon), np.cos(m_lon)
+    p = np.zeros((maxord + 1, maxord + 1) + latitude.shape)
+    dp = np.zeros_like(p)
+    pp = np.zeros((maxord + 1,) + latitude.shape)
+    p[0][0], pp[0] = 1.0, 1.0
+    aor = model.re / r
+    ar = aor * aor
+    br, bt, bp, bpp = (np.zeros(latitude.shape) for _ in range(4))
+    for n in range(1, maxord + 1):
+        ar = ar * aor
+        for m in range(n + 1):
+            # Unnormalized associated Legendre polynomials and derivatives
+            if n == m:
+                p[m][n] = st * p[m - 1][n - 1]
+                dp[m][n] = st * dp[m - 1][n - 1] + ct * p[m - 1][n - 1]
+            elif n == 1 and m == 0:
+                p[m][n] = ct * p[m][n - 1]
+                dp[m][n] = ct * dp[m][n - 1] - st * p[m][n - 1]
+            else:
+                if m > n - 2:
+                    p[m][n - 2], dp[m][n - 2] = 0.0, 0.0
+                p[m][n] = ct * p[m][n - 1] - k[m][n] * p[m][n - 2]
+                dp[m][n] = ct * dp[m][n - 1] - st * p[m][n - 1] - k[m][n] * dp[m][n - 2]
+            # Time adjusted Gauss coefficients
+            tc_mn = c[m][n] + dt * cd[m][n]
+            par = ar * p[m][n]
+            if m == 0:
+                temp1, temp2 = tc_mn * cp[m], tc_mn * sp[m]
+            else:
+                tc_nm = c[n][m - 1] + dt * cd[n][m - 1]
+                temp1 = tc_mn * cp[m] + tc_nm * sp[m]
+                temp2 = tc_mn * sp[m] - tc_nm * cp[m]
+            bt -= ar * temp1 * dp[m][n]
+            bp += model.fm[m] * temp2 * par
+            br += model.fn[n] * temp1 * par
+            if m == 1:  # Special case of geographic poles
+                pp[n] = pp[n - 1] if n == 1 else ct * pp[n - 1] - k[m][n] * pp[n - 2]
+                bpp += model.fm[m] * temp2 * ar * pp[n]
+    bp = np.where(st == 0.0, bpp, bp / np.where(st == 0.0, 1.0, st))
+    # Rotate magnetic vector components from spherical to geodetic coordinates
+    bx = -bt * ca - br * sa
+    by = bp
+    return np.degrees(np.arctan2(by, bx))
@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from functools import reduce, wraps
 from operator import xor
 
@@ -6,24 +8,36 @@ from timeit import default_timer
 from time import sleep, time
 from datetime import datetime
 from math import isnan, floor
-from threading import Thread, Lock, RLock
+from threading import Thread, Lock, RLock, Event, current_thread
+from collections import namedtuple, deque
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeoutError
 import logging
-from struct import unpack_from
+import numpy as np
+import re
 
-from pySAS import WORLD_MAGNETIC_MODEL
+from pySAS import MAGNETIC_DECLINATION
 from pySAS.log import Log, LogBinary, pack_timestamp_satlantic, SatlanticLogger
+from pySAS.calibration import compile_calibrations
 from gpiozero import OutputDevice
 from gpiozero.pins.mock import MockFactory  # required for virtual hardware
 from gpiozero.exc import BadPinFactory
 import os
-from ubxtranslator.core import Parser as UBXParser
-from pySAS.ubxtranslator_messages import NAV_ARDUSIMPLE
+from pySAS.ubx import UBXDecoder, VALID_DATE, VALID_TIME, PVT_GNSS_FIX_OK, PVT_HEAD_VEH_VALID, \
+    RELPOSNED_GNSS_FIX_OK, RELPOSNED_REL_POS_HEADING_VALID
 from configparser import NoOptionError, ConfigParser
 import pytz
 from pySatlantic.instrument import Instrument as SatlanticParser
 from pySatlantic.instrument import FrameError as SatlanticFrameError
 from pySatlantic.instrument import CalibrationFileError as SatlanticCalibrationFileError
 import atexit
+from pySAS.capture import CaptureWriter, TX
+
+
+def get_capture_path(interface, cfg):
+    if not cfg.getboolean(interface, 'capture', fallback=False):
+        return None
+    return cfg.get(interface, 'path_to_captures',
+                   fallback=cfg.get(interface, 'path_to_data', fallback=os.path.join(os.path.dirname(__file__), 'data')))
 
 
 def get_serial_instance(interface, cfg):
@@ -52,6 +66,85 @@ class NoRelay():
         pass
 
 
+class SerialTransport:
+    """
+    Read an open serial port from an asyncio event loop, waiting on the readiness of its file descriptor
+    Bytes are timestamped when read (before being handled by coroutines).
+    """
+    READ_SIZE = 4096
+
+    def __init__(self, serial):
+        self._serial = serial
+        self._fd = serial.fileno()
+        self._loop = asyncio.get_running_loop()
+        self._buffer = bytearray()
+        self._timestamp = float('nan')  # Time first bytes of buffer were read
+        self._error = None
+        self._readable = asyncio.Event()
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, self.READ_SIZE)
+        except OSError as e:
+            self._error = e
+            self._loop.remove_reader(self._fd)
+            self._readable.set()
+            return
+        if data:
+            if not self._buffer:
+                self._timestamp = time()
+            self._buffer.extend(data)
+            self._readable.set()
+
+    async def _wait(self, timeout):
+        self._readable.clear()
+        await asyncio.wait_for(self._readable.wait(), timeout)
+        if self._error is not None:
+            raise SerialException(self._error)
+
+    async def read(self, timeout=None):
+        """
+        Wait for bytes
+        :param timeout: seconds (None: wait forever)
+        :return: bytes available and time at which first bytes were read
+        """
+        while not self._buffer:
+            await self._wait(timeout)
+        data, timestamp = bytes(self._buffer), self._timestamp
+        self._buffer.clear()
+        return data, timestamp
+
+    async def read_until(self, terminator, timeout):
+        """
+        Wait for bytes up to terminator
+        :param terminator: bytes ending message
+        :param timeout: seconds
+        :return: bytes up to terminator included, or bytes available if timeout occurs (None if no bytes)
+        """
+        deadline = self._loop.time() + timeout
+        while self._buffer.find(terminator) < 0:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await self._wait(remaining)
+            except asyncio.TimeoutError:
+                break
+        end = self._buffer.find(terminator)
+        end = len(self._buffer) if end < 0 else end + len(terminator)
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data if data else None
+
+    def write(self, data):
+        self._serial.write(data)
+
+    def close(self):
+        if self._error is None:
+            self._loop.remove_reader(self._fd)
+
+
 def thread_safe_method(func):
     """Decorator to make a method thread-safe using self._serial_lock"""
     @wraps(func)
@@ -73,6 +166,43 @@ def alive_and_thread_safe_method(func):
     return wrapper
 
 
+# Snapshot of indexing table telemetry read in one exchange (poll_status), moving and velocity are None if not read
+TableStatus = namedtuple('TableStatus', ['position', 'stalled', 'moving', 'velocity', 'received'],
+                         defaults=[float('nan'), None, None, None, float('nan')])
+
+
+class Motion:
+    """
+    Motion of indexing table requested with move_to_async, completed by the motion poller of the indexing table
+    future result is True if motion completed, False if stalled, timed out, or interrupted (e.g. table stopped or
+    serial connection lost), and cancelled if superseded
+    """
+    __slots__ = ('target', 'start_position', 'position', 'started', 'duration', 'future')
+
+    def __init__(self, target, start_position, duration):
+        self.target = target
+        self.start_position = start_position
+        self.position = start_position
+        self.started = time()
+        self.duration = duration if duration is not None else float('nan')
+        self.future = Future()
+
+    @property
+    def eta(self):
+        """Estimated time of arrival (epoch)"""
+        return self.started + self.duration
+
+    @property
+    def progress(self):
+        """Fraction of motion done based on last position polled (0 to 1)"""
+        if self.future.done() and not self.future.cancelled() and self.future.result():
+            return 1.0
+        span = self.target - self.start_position
+        if isnan(span) or isnan(self.position) or span == 0:
+            return 0.0
+        return min(max((self.position - self.start_position) / span, 0.0), 1.0)
+
+
 class IndexingTable:
     """
     Python Interface to custom-made indexing table. The indexing table is made of a Lexium MDrive LMD M85 which is
@@ -81,12 +211,19 @@ class IndexingTable:
     GEAR_BOX_RATIO = 200000 / 360
     POSITION_LIMITS = [-180, 180]
     MOTION_TIMEOUT = 10  # seconds
+    POLL_INTERVAL_MIN = 0.05  # seconds, motion poller interval once estimated time of arrival is reached
+    POLL_INTERVAL_MAX = 1     # seconds
+    POLL_FAILURES_MAX = 3     # consecutive polls without position before motion is considered failed
 
     COMMAND_EXECUTION_TIME = 0.05
+    REPLY_TIMEOUT = 0.5  # seconds, maximum time to wait for reply of commands
+    RTT_HISTORY_LENGTH = 100
     ENCODING = 'latin-1'
     REGISTRATOR = '\x08'  # Backspace
     TERMINATOR = '\r\n'   # CR LF (\x0D\x0A)
     UNICODE_HANDLING = 'replace'
+    # Motor configuration: acceleration, deceleration, initial velocity, maximum velocity, echo mode, encoder enable
+    CONFIGURATION = {'ee': 1, 'a': 78125, 'd': 78125, 'vi': 78, 'vm': 20000, 'em': 1}
 
     def __new__(cls, *args, **kwargs):
         """
@@ -111,7 +248,7 @@ class IndexingTable:
     def __init__(self, cfg):
         # Prevent re-init if asking for second instance
         if hasattr(self, '_serial_port'):
-            self.__logger.debug(self.__class__.__name__ + ' already initialized for port ' + self._serial_port)
+            self.eng_log.debug(self.__class__.__name__ + ' already initialized for port ' + self._serial_port)
             return
         self._serial_port = cfg.get(self.__class__.__name__, 'port')
         # Loggers
@@ -119,6 +256,7 @@ class IndexingTable:
         # Serial
         self._serial = get_serial_instance(self.__class__.__name__, cfg)
         self._lock = RLock()  # To avoid multiple threads using the serial connection at the same time (e.g. UI and main thread)
+        self._async_lock, self._async_lock_loop = None, None  # Serialize coroutines of the same event loop
         # GPIO
         try:
             # Try to load physical pin factory (Factory())
@@ -143,6 +281,17 @@ class IndexingTable:
         self.stalled = False
         self.position = float('nan')
         self.packet_received = float('nan')
+        self.status = TableStatus()
+        self.motion = None  # Last motion requested with move_to_async
+        self._motion_thread = None
+        self._started = 0  # Number of calls to start
+        self._powered = None  # Time at which relay was switched on
+        # Record requests and replies in capture files (see pySAS.capture)
+        self.capture = None
+        self._capture_path = get_capture_path(self.__class__.__name__, cfg)
+        # Round-trip time of commands (seconds), from request sent to reply terminator received
+        self.rtt = float('nan')
+        self.rtt_history = deque(maxlen=self.RTT_HISTORY_LENGTH)
         # Register methods to execute at exit as cannot use __del__ as logging is already off-loaded
         atexit.register(self.stop)
 
@@ -150,17 +299,20 @@ class IndexingTable:
     def start(self):
         try:
             self.busy = True
+            self._started += 1  # Cancel pending power off of stop(wait=False)
             if not self.alive:
                 self.eng_log.debug('start')
-                self._relay.on()
-                sleep(self.COMMAND_EXECUTION_TIME)
+                self.power_on()
+                sleep(max(self._powered + self.COMMAND_EXECUTION_TIME - time(), 0))
                 try:
                     self._serial.open()
                 except SerialException as e:
                     self.eng_log.critical(e)
-                    self._relay.off()
+                    self._relay_off()
                     return False
-                self.set_configuration()
+                if self._capture_path is not None:
+                    self.capture = CaptureWriter.open(self._capture_path, self.__class__.__name__)
+                self.reconcile_configuration()
                 self.alive = True
                 self.get_stall_flag()
                 self.get_position()
@@ -169,71 +321,191 @@ class IndexingTable:
             self.busy = False
 
     @thread_safe_method
+    def power_on(self):
+        """
+        Switch relay on, start only waits for the remaining time of the drive to turn on
+        Used to switch all relays together before starting instruments (see PowerOrchestrator)
+        """
+        if self._powered is None:
+            self._relay.on()
+            self._powered = time()
+
+    def _relay_off(self):
+        self._relay.off()
+        self._powered = None
+
+    def reconcile_configuration(self):
+        """
+        Read motor configuration in one exchange and only write parameters that differ from CONFIGURATION
+        The motor is reset (set_configuration) only if the configuration can't be read (e.g. echo enabled)
+        :return: parameters written (None if motor was reset)
+        """
+        configuration = self.get_configuration()
+        if configuration is None:
+            self.set_configuration()
+            return None
+        changes = {k: v for k, v in self.CONFIGURATION.items() if configuration[k] != v}
+        if changes:
+            self.eng_log.debug(f'reconcile_configuration: {changes}')
+            self._write(b''.join(bytes(f'{self.REGISTRATOR}{k}={v}{self.TERMINATOR}', self.ENCODING)
+                                 for k, v in changes.items()))
+            sleep(self.COMMAND_EXECUTION_TIME)
+        else:
+            self.eng_log.debug('reconcile_configuration: already configured')
+        return changes
+
+    def get_configuration(self):
+        """
+        Read parameters of CONFIGURATION in a single exchange with the drive
+        :return: dict of parameters (None if any could not be read)
+        """
+        commands = ['pr ' + k for k in self.CONFIGURATION]
+        configuration = {}
+        for k, msg in zip(self.CONFIGURATION, self._commands(commands)):
+            try:
+                configuration[k] = int(msg.decode(self.ENCODING, self.UNICODE_HANDLING).strip())
+            except (AttributeError, ValueError):
+                self.eng_log.debug(f'get_configuration: unable to read {k}')
+                return None
+        return configuration
+
     def set_configuration(self):
-        self._serial.write(b'\x03')  # ctrl+c for resetting motor  # TODO Might Loose zero position due to that
+        self._write(b'\x03')  # ctrl+c for resetting motor  # TODO Might Loose zero position due to that
         self.eng_log.debug('set_configuration')
         sleep(0.5)                   # Reset takes longer than standard COMMAND_EXECUTION_TIME
         # Settings motor configuration
-        self._serial.write(bytes('ee=1' + self.TERMINATOR, self.ENCODING))  # First command so no need for registration (backspace)
-        sleep(self.COMMAND_EXECUTION_TIME)
-        self._serial.write(bytes(self.REGISTRATOR + 'a=78125' + self.TERMINATOR, self.ENCODING))
-        sleep(self.COMMAND_EXECUTION_TIME)
-        self._serial.write(bytes(self.REGISTRATOR + 'd=78125' + self.TERMINATOR, self.ENCODING))
-        sleep(self.COMMAND_EXECUTION_TIME)
-        self._serial.write(bytes(self.REGISTRATOR + 'vi=78' + self.TERMINATOR, self.ENCODING))
-        sleep(self.COMMAND_EXECUTION_TIME)
-        self._serial.write(bytes(self.REGISTRATOR + 'vm=20000' + self.TERMINATOR, self.ENCODING))
-        sleep(self.COMMAND_EXECUTION_TIME)
-        self._serial.write(bytes(self.REGISTRATOR + 'em=1' + self.TERMINATOR, self.ENCODING))
-        sleep(self.COMMAND_EXECUTION_TIME)
+        for i, (k, v) in enumerate(self.CONFIGURATION.items()):
+            # First command so no need for registration (backspace)
+            self._write(bytes(('' if i == 0 else self.REGISTRATOR) + f'{k}={v}' + self.TERMINATOR, self.ENCODING))
+            sleep(self.COMMAND_EXECUTION_TIME)
         # Log initialization
         msg = self._serial_read()
         if msg:
             self.eng_log.debug(msg.decode(self.ENCODING, self.UNICODE_HANDLING))
 
-    @thread_safe_method
     def set_position(self, position_degrees, check_stall_flag=False):
         # The stall flag must be checked after using the set_position function
         # to make sure the motion was done without issues.
         # This can be done by setting the argument check_stall_flag = True
+        # which waits for the motion to complete (without holding the serial connection)
+        if check_stall_flag:
+            return self.wait_motion(self.move_to_async(position_degrees))
+        with self._lock:
+            return self._move_to(position_degrees)
+
+    def _move_to(self, position_degrees):
         if not self.alive:
             self.eng_log.error('set_position: unable, not alive')
             return False
         if position_degrees < self.POSITION_LIMITS[0] or self.POSITION_LIMITS[1] < position_degrees:
             self.eng_log.error('set_position: unable, position out of range ' + str(position_degrees))
             return False
-        self.eng_log.debug('set_position(' + str(position_degrees) + ', ' + str(check_stall_flag) + ')')
+        self.eng_log.debug('set_position(' + str(position_degrees) + ')')
         pos_steps = int(position_degrees * self.GEAR_BOX_RATIO)
-        self._serial.write(bytes(self.REGISTRATOR + 'ma ' + str(pos_steps) + self.TERMINATOR, self.ENCODING))
-        if check_stall_flag:
-            # Wait till the tower stops moving
-            start_time = time()
-            pre_pos = self.get_position()
-            if isnan(pre_pos):  # Unable to read position
-                return False
-            sleep(self.COMMAND_EXECUTION_TIME)
-            while pre_pos != self.get_position() and time() - start_time < self.MOTION_TIMEOUT:
-                pre_pos = self.position
-                sleep(self.COMMAND_EXECUTION_TIME)
-            if self.get_stall_flag():
-                self.eng_log.warning('stalled while moving to ' + str(position_degrees))
-                return False
+        self._write(bytes(self.REGISTRATOR + 'ma ' + str(pos_steps) + self.TERMINATOR, self.ENCODING))
         return True
 
+    def move_to_async(self, position_degrees):
+        """
+        Start moving indexing table and return immediately
+        Motion is followed by a background poller (moving flag) with a backoff based on estimate_motion_time,
+        progress and estimated time of arrival are available in motion.
+        :param position_degrees: aimed position
+        :return: concurrent.futures.Future of motion (use asyncio.wrap_future to await it)
+        """
+        with self._lock:
+            motion = Motion(position_degrees, self.position, self.estimate_motion_time(self.position, position_degrees))
+            if not self._move_to(position_degrees):
+                motion.future.set_result(False)
+                return motion.future
+            if self.motion is not None:
+                self.motion.future.cancel()  # Superseded
+            self.motion = motion
+            if self._motion_thread is None:
+                self._motion_thread = Thread(name=self.__class__.__name__ + 'Motion', target=self.run_motion_poller)
+                self._motion_thread.daemon = True
+                self._motion_thread.start()
+        return motion.future
+
+    def wait_motion(self, future):
+        """
+        Wait for motion requested with move_to_async to complete
+        :param future: future returned by move_to_async
+        :return: True if position reached, False otherwise (stalled, timed out, or superseded)
+        """
+        try:
+            return future.result(timeout=self.MOTION_TIMEOUT + self.POLL_INTERVAL_MAX + self.REPLY_TIMEOUT)
+        except (CancelledError, FutureTimeoutError):
+            return False
+
+    def _resolve_motion(self, motion, result):
+        # Motion can be superseded (cancelled) by move_to_async at any time
+        with self._lock:
+            if not motion.future.done():
+                motion.future.set_result(result)
+
+    def run_motion_poller(self):
+        interval, previous_position, failures = self.POLL_INTERVAL_MIN, float('nan'), 0
+        try:
+            while True:
+                with self._lock:
+                    motion = self.motion
+                    if motion is None or motion.future.done() or not self.alive:
+                        if motion is not None and not motion.future.done():
+                            motion.future.set_result(False)
+                        self._motion_thread = None
+                        return
+                # Wait half of the estimated remaining time, then back off exponentially once it's passed
+                remaining = motion.eta - time()
+                if remaining > 2 * self.POLL_INTERVAL_MIN:
+                    interval = self.POLL_INTERVAL_MIN
+                    sleep(min(remaining / 2, self.POLL_INTERVAL_MAX))
+                else:
+                    sleep(interval)
+                    interval = min(interval * 2, self.POLL_INTERVAL_MAX)
+                status = self.poll_status(moving=True)
+                if status is None or motion.future.done():  # Not alive or superseded
+                    continue
+                if isnan(status.position):  # No reply from drive
+                    failures += 1
+                    if failures >= self.POLL_FAILURES_MAX:
+                        self.eng_log.error(f'no position while moving to {motion.target}')
+                        self._resolve_motion(motion, False)
+                    continue
+                failures = 0
+                motion.position = status.position
+                if status.moving is None:  # No moving flag, check position is steady
+                    stopped = status.position == previous_position
+                else:
+                    stopped = not status.moving
+                previous_position = status.position
+                if stopped:
+                    if status.stalled:
+                        self.eng_log.warning(f'stalled while moving to {motion.target}')
+                    self._resolve_motion(motion, status.stalled is False)
+                elif time() - motion.started > self.MOTION_TIMEOUT:
+                    self.eng_log.error(f'motion timeout while moving to {motion.target}')
+                    self._resolve_motion(motion, False)
+        except Exception as e:
+            self.eng_log.error(f'motion poller: {e}')
+        finally:
+            # Poller died, don't leave motion pending and let next motion start a new poller
+            with self._lock:
+                if self._motion_thread is current_thread():
+                    self._motion_thread = None
+                    if self.motion is not None:
+                        self._resolve_motion(self.motion, False)
+
     @thread_safe_method
     def get_position(self):
         if not self.alive:
             self.eng_log.error('get_position: unable, not alive')
             self.position = float('nan')
             return self.position
-        # Flush serial buffer
-        self._serial_read()
         # Ask current position of encoder to motor
-        self._serial.write(bytes(self.REGISTRATOR + 'pr p' + self.TERMINATOR, self.ENCODING))
-        # Wait for answer
-        sleep(self.COMMAND_EXECUTION_TIME)
-        # Read answer
-        msg = self._serial_read()
+        return self._parse_position(self._command('pr p'))
+
+    def _parse_position(self, msg):
         if msg is not None:
             try:
                 pos_steps = int(msg.decode(self.ENCODING, self.UNICODE_HANDLING).strip())
@@ -258,13 +530,16 @@ class IndexingTable:
                  True:  Motor stalled
         """
         self.stalled = self.get_flag('st')
+        self._log_stall_flag()
+        return self.stalled
+
+    def _log_stall_flag(self):
         if self.stalled is None:
             pass  # already logged in get_flag method
         elif self.stalled:
             self.eng_log.debug(f'get_stall_flag: stalled')
         else:
             self.eng_log.debug(f'get_stall_flag: operational')
-        return self.stalled
 
     @alive_and_thread_safe_method
     def get_flag(self, flag_name):
@@ -274,13 +549,101 @@ class IndexingTable:
         :param flag_name: name of flag requested
         :return: True (1) or False (0)
         """
-        # Flush serial buffer
-        self._serial_read()
-        # Ask stall flag to motor
-        self._serial.write(bytes(self.REGISTRATOR + 'pr ' + flag_name + self.TERMINATOR, self.ENCODING))
-        sleep(self.COMMAND_EXECUTION_TIME)
-        # Get answer
-        msg = self._serial_read()
+        return self._parse_flag(self._command('pr ' + flag_name), flag_name)
+
+    def _command(self, command, timeout=None):
+        """
+        Send command and wait for its reply, returns as soon as reply terminator is received
+        :param command: M-Code command
+        :param timeout: maximum time to wait for reply (default REPLY_TIMEOUT)
+        :return: reply (None if no reply received within timeout)
+        """
+        return self._commands([command], timeout)[0]
+
+    @thread_safe_method
+    def _commands(self, commands, timeout=None):
+        """
+        Send commands back to back and wait for their replies (one line per command)
+        A single exchange is pending at a time (lock) and the input is flushed before each exchange,
+        hence lines received are the replies of the requests in order (late replies are flushed by the next exchange).
+        :param commands: M-Code commands
+        :param timeout: maximum time to wait for all replies (default REPLY_TIMEOUT)
+        :return: list of replies (None if no reply received within timeout)
+        """
+        terminator = bytes(self.TERMINATOR, self.ENCODING)
+        self._serial.reset_input_buffer()
+        sent = default_timer()
+        deadline = sent + (self.REPLY_TIMEOUT if timeout is None else timeout)
+        request = b''.join(bytes(self.REGISTRATOR + c + self.TERMINATOR, self.ENCODING) for c in commands)
+        self._write(request)
+        replies = []
+        serial_timeout = self._serial.timeout  # Restore timeout configured once exchange is over
+        try:
+            for _ in commands:
+                self._serial.timeout = max(deadline - default_timer(), 0)
+                replies.append(self._serial.read_until(terminator))
+                if self.capture is not None and replies[-1]:
+                    self.capture.write(replies[-1], time())
+        finally:
+            self._serial.timeout = serial_timeout
+        return self._replies_received(commands, replies, sent)
+
+    def _replies_received(self, commands, replies, sent):
+        """
+        Check replies are complete and record round-trip time of exchange
+        :param commands: M-Code commands
+        :param replies: bytes received for each command
+        :param sent: time at which commands were sent (default_timer)
+        :return: list of replies (None if incomplete)
+        """
+        terminator = bytes(self.TERMINATOR, self.ENCODING)
+        replies = [msg if msg and msg.endswith(terminator) else None for msg in replies]
+        for command, msg in zip(commands, replies):
+            if msg is None:
+                self.eng_log.debug(f'{command}: no reply')
+        if replies[-1] is not None:
+            self.rtt = default_timer() - sent
+            self.rtt_history.append(self.rtt)
+        if any(msg is not None for msg in replies):
+            self.packet_received = time()
+        return replies
+
+    @alive_and_thread_safe_method
+    def poll_status(self, moving=False, velocity=False):
+        """
+        Read position, stall flag, and optionally moving flag and velocity in a single exchange with the drive
+        Position, stalled, and packet_received are updated together with status.
+        :param moving: read moving flag (mv)
+        :param velocity: read velocity (v)
+        :return: TableStatus
+        """
+        commands = self._status_commands(moving, velocity)
+        return self._parse_status(commands, self._commands(commands))
+
+    def _status_commands(self, moving, velocity):
+        return ['pr p', 'pr st'] + (['pr mv'] if moving else []) + (['pr v'] if velocity else [])
+
+    def _parse_status(self, commands, replies):
+        replies = dict(zip(commands, replies))
+        try:
+            position = int(replies['pr p'].decode(self.ENCODING, self.UNICODE_HANDLING).strip()) / self.GEAR_BOX_RATIO
+        except (AttributeError, ValueError):
+            self.eng_log.error('unable to get position')
+            position = float('nan')
+        stalled = self._parse_flag(replies['pr st'], 'st')
+        moving = self._parse_flag(replies['pr mv'], 'mv') if 'pr mv' in replies else None
+        velocity = None
+        if 'pr v' in replies:
+            try:
+                velocity = int(replies['pr v'].decode(self.ENCODING, self.UNICODE_HANDLING).strip()) / self.GEAR_BOX_RATIO
+            except (AttributeError, ValueError):
+                self.eng_log.error('unable to get velocity')
+        self.status = TableStatus(position, stalled, moving, velocity, self.packet_received)
+        self.position, self.stalled = position, stalled
+        self._log_stall_flag()
+        return self.status
+
+    def _parse_flag(self, msg, flag_name):
         if msg is not None:
             try:
                 flag = int(msg.decode(self.ENCODING, self.UNICODE_HANDLING).strip())
@@ -292,17 +655,114 @@ class IndexingTable:
             self.eng_log.error('unable to get flag ' + flag_name)
             return None
 
+    @asynccontextmanager
+    async def _lock_async(self):
+        """
+        Acquire serial connection from a coroutine without blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_lock_loop is not loop:
+            self._async_lock, self._async_lock_loop = asyncio.Lock(), loop
+        async with self._async_lock:
+            while not self._lock.acquire(blocking=False):  # Serial connection used by another thread
+                await asyncio.sleep(self.COMMAND_EXECUTION_TIME / 5)
+            try:
+                yield
+            finally:
+                self._lock.release()
+
+    async def _command_async(self, command):
+        """
+        Send command and wait for its reply, returns as soon as reply terminator is received
+        :param command: M-Code command
+        :return: reply (None if no reply received within REPLY_TIMEOUT)
+        """
+        return (await self._commands_async([command]))[0]
+
+    async def _commands_async(self, commands):
+        """
+        Send commands back to back and wait for their replies (one line per command), see _commands
+        :param commands: M-Code commands
+        :return: list of replies (None if no reply received within REPLY_TIMEOUT)
+        """
+        terminator = bytes(self.TERMINATOR, self.ENCODING)
+        self._serial.reset_input_buffer()
+        transport = SerialTransport(self._serial)
+        try:
+            sent = default_timer()
+            deadline = sent + self.REPLY_TIMEOUT
+            request = b''.join(bytes(self.REGISTRATOR + c + self.TERMINATOR, self.ENCODING) for c in commands)
+            transport.write(request)
+            if self.capture is not None:
+                self.capture.write(request, time(), TX)
+            replies = []
+            for _ in commands:
+                replies.append(await transport.read_until(terminator, max(deadline - default_timer(), 0)))
+                if self.capture is not None and replies[-1]:
+                    self.capture.write(replies[-1], time())
+        finally:
+            transport.close()
+        return self._replies_received(commands, replies, sent)
+
+    async def poll_status_async(self, moving=False, velocity=False):
+        async with self._lock_async():
+            if not self.alive:
+                self.eng_log.error('poll_status: unable, not alive')
+                return
+            commands = self._status_commands(moving, velocity)
+            return self._parse_status(commands, await self._commands_async(commands))
+
+    async def get_position_async(self):
+        async with self._lock_async():
+            if not self.alive:
+                self.eng_log.error('get_position: unable, not alive')
+                self.position = float('nan')
+                return self.position
+            return self._parse_position(await self._command_async('pr p'))
+
+    async def get_flag_async(self, flag_name):
+        async with self._lock_async():
+            if not self.alive:
+                self.eng_log.error(f'get_flag: unable, not alive')
+                return
+            return self._parse_flag(await self._command_async('pr ' + flag_name), flag_name)
+
+    async def get_stall_flag_async(self):
+        self.stalled = await self.get_flag_async('st')
+        self._log_stall_flag()
+        return self.stalled
+
+    async def set_position_async(self, position_degrees, check_stall_flag=False):
+        """
+        Move indexing table, if check_stall_flag wait till motion is complete (see move_to_async)
+        """
+        if check_stall_flag:
+            async with self._lock_async():
+                future = self.move_to_async(position_degrees)
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if future.cancelled():  # Superseded
+                    return False
+                raise
+        async with self._lock_async():
+            return self._move_to(position_degrees)
+
     @alive_and_thread_safe_method
     def print_all_parameters(self):
         self.eng_log.debug('print_all_parameters')
-        # Flush serial buffer
-        self._serial_read()
-        # Ask stall flag to motor
-        self._serial.write(bytes(self.REGISTRATOR + 'pr al' + self.TERMINATOR, self.ENCODING))
-        sleep(2)  # much longer than the standard COMMAND_EXECUTION_TIME
-        # Get answer
-        msg = self._serial_read()
+        # Ask all parameters to motor, reply is multiple lines long
+        msg = self._command('pr al', timeout=2)
         if msg is not None:
+            # Read following lines till drive is silent
+            serial_timeout, self._serial.timeout = self._serial.timeout, self.COMMAND_EXECUTION_TIME
+            try:
+                line = self._serial.read_until(bytes(self.TERMINATOR, self.ENCODING))
+                while line:
+                    msg += line
+                    line = self._serial.read_until(bytes(self.TERMINATOR, self.ENCODING))
+            finally:
+                self._serial.timeout = serial_timeout
             print(msg.decode(self.ENCODING, self.UNICODE_HANDLING).strip())
         else:
             self.eng_log.error('unable to read parameters')
@@ -310,13 +770,13 @@ class IndexingTable:
     @alive_and_thread_safe_method
     def reset_position_zero(self):
         self.eng_log.warning('reset_position_zero: reset zero')
-        self._serial.write(bytes(self.REGISTRATOR + 'p=0' + self.TERMINATOR, self.ENCODING))
+        self._write(bytes(self.REGISTRATOR + 'p=0' + self.TERMINATOR, self.ENCODING))
         self.position = 0
 
     @alive_and_thread_safe_method
     def reset_stall_flag(self):
         self.eng_log.warning('reset_stall_flag: reset stall flag')
-        self._serial.write(bytes(self.REGISTRATOR + 'st=0' + self.TERMINATOR, self.ENCODING))
+        self._write(bytes(self.REGISTRATOR + 'st=0' + self.TERMINATOR, self.ENCODING))
         self.stalled = False
 
     @alive_and_thread_safe_method
@@ -343,35 +803,77 @@ class IndexingTable:
         else:
             return None
 
+    def _write(self, data):
+        """
+        Write to drive and record request in capture
+        :param data: bytes to write
+        """
+        self._serial.write(data)
+        if self.capture is not None:
+            self.capture.write(data, time(), TX)
+
     @thread_safe_method
     def _serial_read(self):
         # Assumes serial connection is open and alive
         if self._serial.in_waiting > 0:
             self.packet_received = time()
-            return self._serial.read(self._serial.in_waiting)
+            data = self._serial.read(self._serial.in_waiting)
+            if self.capture is not None:
+                self.capture.write(data, self.packet_received)
+            return data
         else:
             return None
 
-    @thread_safe_method
-    def stop(self):
-        try:
+    def stop(self, wait=True):
+        """
+        Move indexing table back to 0 and power it off
+        :param wait: wait for motion to complete, otherwise power off once motion is complete (return immediately)
+        """
+        with self._lock:
             self.busy = True
             self.eng_log.debug('stop')
+            if not self.alive:
+                self.busy = False
+                return
+            # Get stall flag (and reset if necessary)
+            self.get_stall_flag()
+            if self.stalled is None:  # Unable to communicate
+                self._power_off()
+                return
+            if self.stalled:
+                self.reset_stall_flag()
+            # Move indexing table back to 0
+            future = self.move_to_async(0)
+        if wait:
+            try:
+                self.wait_motion(future)
+            finally:
+                self._power_off()
+        else:
+            motion, started = self.motion, self._started
+
+            def power_off(_):
+                with self._lock:
+                    if self.motion is motion and self._started == started:
+                        self._power_off()
+                    else:  # Moved or restarted since stop
+                        self.busy = False
+            future.add_done_callback(power_off)
+
+    @thread_safe_method
+    def _power_off(self):
+        try:
             if self.alive:
-                # Get stall flag (and reset if necessary)
-                self.get_stall_flag()
-                if self.stalled is not None: # Can read stall flag and communicate
-                    if self.stalled:
-                        self.reset_stall_flag()
-                    # Move indexing table back to 0
-                    self.set_position(0, check_stall_flag=True)
                 # Stop serial connection
                 if hasattr(self._serial, 'cancel_read'):
                     self._serial.cancel_read()
                 if self._serial.is_open:
                     self._serial.close()
                 # Stop Power
-                self._relay.off()
+                self._relay_off()
+                if self.capture is not None:
+                    self.capture.close()
+                    self.capture = None
                 # Clear position
                 self.position = float('nan')
                 self.alive = False
@@ -380,6 +882,7 @@ class IndexingTable:
 
 
 class Sensor:
+    WARM_UP_TIME = 0.5  # seconds, time for sensor to turn on
 
     def __new__(cls, *args, **kwargs):
         """
@@ -430,8 +933,14 @@ class Sensor:
             # No gpio pin specified hence no relay control
             self.__logger.warning(f'No relay for {self.__class__.__name__}.')
             self._relay = NoRelay()
-        # Thread
+        # Thread (or I/O engine reading all serial ports from a single thread if set)
         self._thread = None
+        self._task = None  # Task reading serial port if started from asyncio (start_async)
+        self.io_engine = None
+        self._powered = None  # Time at which relay was switched on
+        # Record raw bytes received in capture files (see pySAS.capture)
+        self.capture = None
+        self._capture_path = get_capture_path(self.__class__.__name__, cfg)
         self.alive = False
         self.busy = False
         # Register methods to execute at exit as cannot use __del__ as logging is already off-loaded
@@ -442,18 +951,23 @@ class Sensor:
             self.busy = True
             if not self.alive:
                 self.__logger.debug('start')
-                self._relay.on()
-                sleep(0.5)  # Leave time for sensor to turn on
+                self.power_on()
+                sleep(max(self._powered + self.WARM_UP_TIME - time(), 0))  # Leave time for sensor to turn on
                 try:
                     self._serial.open()
                 except SerialException as e:
                     self.__logger.critical(e)
-                    self._relay.off()
+                    self._relay_off()
                     return
                 self.alive = True
-                self._thread = Thread(name=self.__class__.__name__, target=self.run)
-                self._thread.daemon = True
-                self._thread.start()
+                self._open_capture()
+                if self.io_engine is not None:
+                    self._thread = None
+                    self.io_engine.register(self)
+                else:
+                    self._thread = Thread(name=self.__class__.__name__, target=self.run)
+                    self._thread.daemon = True
+                    self._thread.start()
         finally:
             self.busy = False
 
@@ -466,16 +980,111 @@ class Sensor:
                 if hasattr(self._serial, 'cancel_read'):
                     self._serial.cancel_read()
                 # TODO Find elegant way to immediately stop thread as slow down user interface when switching from auto to manual mode (timeout in serial won't do it as use serial.cancel_read)
-                if not from_thread:
+                if self._task is not None:
+                    try:
+                        self._task.get_loop().call_soon_threadsafe(self._task.cancel)
+                    except RuntimeError:  # Event loop already closed
+                        pass
+                    self._task = None
+                elif self._thread is None:
+                    self.io_engine.unregister(self)
+                elif not from_thread:
                     self._thread.join(2)
                     if self._thread.is_alive():
                         self.__logger.error('Thread did not join.')
                 self._serial.close()
-                self._relay.off()
+                self._relay_off()
+                self._close_capture()
+                self._data_logger.close()  # Required to start new log_data file when instrument restart
+        finally:
+            self.busy = False
+
+    def power_on(self):
+        """
+        Switch relay on, start only waits for the remaining WARM_UP_TIME
+        Used to switch all relays together before starting instruments (see PowerOrchestrator)
+        """
+        if self._powered is None:
+            self._relay.on()
+            self._powered = time()
+
+    def _relay_off(self):
+        self._relay.off()
+        self._powered = None
+
+    def _open_capture(self):
+        if self._capture_path is not None:
+            self.capture = CaptureWriter.open(self._capture_path, self.__class__.__name__)
+
+    def _close_capture(self):
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+
+    async def start_async(self):
+        """
+        Start sensor from asyncio event loop, serial port is read by a task of the loop running (run_async)
+        """
+        try:
+            self.busy = True
+            if not self.alive:
+                self.__logger.debug('start_async')
+                self.power_on()
+                await asyncio.sleep(max(self._powered + self.WARM_UP_TIME - time(), 0))  # Leave time for sensor to turn on
+                try:
+                    self._serial.open()
+                except SerialException as e:
+                    self.__logger.critical(e)
+                    self._relay_off()
+                    return
+                self.alive = True
+                self._open_capture()
+                self._thread = None
+                self._task = asyncio.get_running_loop().create_task(self.run_async())
+        finally:
+            self.busy = False
+
+    async def run_async(self):
+        transport = SerialTransport(self._serial)
+        try:
+            while self.alive:
+                data, timestamp = await transport.read()
+                if self.capture is not None:
+                    self.capture.write(data, timestamp)
+                try:
+                    self.data_received(data, timestamp)
+                except Exception as e:
+                    self.__logger.error(e)
+        except SerialException as e:
+            self.__logger.error(e)
+        finally:
+            transport.close()
+
+    async def stop_async(self):
+        try:
+            self.busy = True
+            self.__logger.debug('stop_async')
+            if self.alive and self._task is not None:
+                self.alive = False
+                task, self._task = self._task, None
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                self._serial.close()
+                self._relay_off()
+                self._close_capture()
                 self._data_logger.close()  # Required to start new log_data file when instrument restart
         finally:
             self.busy = False
 
+    def data_received(self, data, timestamp):
+        """
+        Handle bytes read from serial port (by I/O engine or run_async)
+        :param data: bytes read
+        :param timestamp: time at which bytes were read
+        """
+        raise NotImplementedError('Reading from a single thread or asyncio not supported by ' +
+                                  self.__class__.__name__)
+
 
 class GPS(Sensor):
 
@@ -512,14 +1121,15 @@ class GPS(Sensor):
             })
         super().__init__(cfg, data_logger)
         self.__logger = logging.getLogger(self.__class__.__name__)  # Need to recall logger as it's private
-
+        if isinstance(self._data_logger, SatlanticLogger):
+            self._data_logger.register_headers([b'$GPRMC'])
 
         self._data_logger_lock = Lock()
         self._log_data = False
         self.decimate = cfg.getint(self.__class__.__name__, 'decimate', fallback=2)
         self.counter = 0
         self._gps_orientation_on_ship = cfg.getint(self.__class__.__name__, 'orientation', fallback=0)
-        self._parser = UBXParser([NAV_ARDUSIMPLE])
+        self._decoder = UBXDecoder()
         self.packet_pvt_received = float('nan')
         self.packet_relposned_received = float('nan')
 
@@ -575,61 +1185,68 @@ class GPS(Sensor):
     def run(self):
         while self.alive:
             try:
-                packet = self._parser.receive_from(self._serial)
+                data = self._serial.read(self._serial.in_waiting or 1)
                 timestamp = time()
-                if packet:
-                    self.handle_packet(packet, timestamp)
+                if data:
+                    if self.capture is not None:
+                        self.capture.write(data, timestamp)
+                    self.data_received(data, timestamp)
             except OSError as e:
                 self.__logger.error(e)
                 self.__logger.error('device disconnected or multiple access on port?')
                 # self.stop(from_thread=True)
                 sleep(1)
-            except ValueError as e:
-                self.__logger.error(e)
-                self.__logger.error('corrupted message')
-                sleep(1)
             except Exception as e:
                 self.__logger.error(e)
                 sleep(1)
 
+    def data_received(self, data, timestamp):
+        for packet in self._decoder.decode(data):
+            self.handle_packet(packet, timestamp)
+
     def handle_packet(self, packet, timestamp):
-        if packet[1] == 'PVT':
+        """
+        Update state with message decoded and log data
+        :param packet: (message name, message) returned by UBXDecoder
+        :param timestamp: time at which message was received
+        """
+        name, msg = packet
+        if name == 'PVT':
             # Get date and time
-            self.datetime = datetime(packet[2].year, packet[2].month, packet[2].day,
-                                     packet[2].hour, packet[2].min, packet[2].sec,
-                                     packet[2].nano // 1000 if packet[2].nano > 0 else 0,  # nano to micro seconds
+            self.datetime = datetime(msg.year, msg.month, msg.day, msg.hour, msg.min, msg.sec,
+                                     msg.nano // 1000 if msg.nano > 0 else 0,  # nano to micro seconds
                                      pytz.utc)
-            self.datetime_accuracy = packet[2].tAcc // 1000  # convert nano seconds to micro seconds
-            self.datetime_valid = bool(packet[2].valid.validDate) and bool(packet[2].valid.validTime)
+            self.datetime_accuracy = msg.tAcc // 1000  # convert nano seconds to micro seconds
+            self.datetime_valid = msg.valid & (VALID_DATE | VALID_TIME) == VALID_DATE | VALID_TIME
             # Get Position
-            self.latitude = packet[2].lat / 10000000
-            self.longitude = packet[2].lon / 10000000
-            self.horizontal_accuracy = packet[2].hAcc / 1000  # convert mm to m
-            self.altitude = packet[2].hMSL / 1000  # convert mm to m, above mean sea level
-            self.altitude_accuracy = packet[2].hAcc / 1000 # convert mm to m
-            self.fix_ok = bool(packet[2].flags.gnssFixOK)
-            self.fix_type = packet[2].fixType
+            self.latitude = msg.lat / 10000000
+            self.longitude = msg.lon / 10000000
+            self.horizontal_accuracy = msg.hAcc / 1000  # convert mm to m
+            self.altitude = msg.hMSL / 1000  # convert mm to m, above mean sea level
+            self.altitude_accuracy = msg.hAcc / 1000 # convert mm to m
+            self.fix_ok = bool(msg.flags & PVT_GNSS_FIX_OK)
+            self.fix_type = msg.fixType
             # Get Speed
-            self.speed = packet[2].gSpeed / 1000  # convert mm/s to m/s
-            self.speed_accuracy = packet[2].sAcc / 1000 # covnert mm/s to m/s
+            self.speed = msg.gSpeed / 1000  # convert mm/s to m/s
+            self.speed_accuracy = msg.sAcc / 1000 # covnert mm/s to m/s
             # Get motion and vehicle headings
-            self.heading_motion = packet[2].headMot / 100000
-            self.heading_vehicle = packet[2].headVeh / 100000
-            self.heading_vehicle_accuracy = packet[2].headAcc / 100000
-            self.heading_vehicle_valid = bool(packet[2].flags.headVehValid)
+            self.heading_motion = msg.headMot / 100000
+            self.heading_vehicle = msg.headVeh / 100000
+            self.heading_vehicle_accuracy = msg.headAcc / 100000
+            self.heading_vehicle_valid = bool(msg.flags & PVT_HEAD_VEH_VALID)
             # Timestamp data
             self.packet_pvt_received = timestamp
-        elif packet[1] == 'RELPOSNED':
+        elif name == 'RELPOSNED':
             # Get relative heading
-            self.heading = packet[2].relPosHeading / 100000
-            self.heading_accuracy = packet[2].accHeading / 100000
-            self.heading_valid = bool(packet[2].flags.relPosHeadingValid)
+            self.heading = msg.relPosHeading / 100000
+            self.heading_accuracy = msg.accHeading / 100000
+            self.heading_valid = bool(msg.flags & RELPOSNED_REL_POS_HEADING_VALID)
             # Get Flags
-            self.fix_ok = bool(packet[2].flags.gnssFixOK)
+            self.fix_ok = bool(msg.flags & RELPOSNED_GNSS_FIX_OK)
             # Timestamp data
             self.packet_relposned_received = timestamp
         else:
-            self.__logger.warning('packet not supported: ' + packet[1])
+            self.__logger.warning('packet not supported: ' + name)
             return
 
         # Write parsed data
@@ -639,7 +1256,7 @@ class GPS(Sensor):
                 if self._data_logger_lock.acquire(timeout=0.5):  # Need in case stop logging
                     try:
                             if isinstance(self._data_logger, Log):
-                                data = self.format_as_list(packet[1])
+                                data = self.format_as_list(name)
                             else:  # Assume Satlantic Logger
                                 data = self.format_data_as_gprmc()
                             self._data_logger.write(data, timestamp)
@@ -673,8 +1290,7 @@ class GPS(Sensor):
         speed = f'{self.speed * 1.94384:05.1f}'  # Convert from m/s to knots
         course = f'{self.heading_motion:05.1f}'
         ddmmyy = self.datetime.strftime('%d%m%y')
-        mag_var = WORLD_MAGNETIC_MODEL.GeoMag(self.latitude, self.longitude,
-                                              self.altitude * 3.2808399, self.datetime.date()).dec
+        mag_var = MAGNETIC_DECLINATION.get(self.latitude, self.longitude, self.altitude, self.datetime)
         mag_var_hm = 'W' if mag_var < 0 else 'E'
         mag_var =f'{abs(mag_var):05.1f}'
         frame = (f'$GPRMC,{hhmmss},{valid},{lat_dd}{lat_mm},{lat_hm},{lon_ddd}{lon_mm},{lon_hm},'
@@ -686,13 +1302,23 @@ class GPS(Sensor):
 class IMU(Sensor):
     """
     Read Data from BNO085 in UART-RVC mode
+    Frames are decoded in bulk: all the frames waiting on the serial port are found and checked at once.
     """
+    # UART-RVC frame following separator (0xAAAA): index, yaw, pitch, roll, acceleration, reserved, checksum
+    FRAME_DTYPE = np.dtype([('index', 'u1'), ('yaw', '<i2'), ('pitch', '<i2'), ('roll', '<i2'),
+                            ('x_accel', '<i2'), ('y_accel', '<i2'), ('z_accel', '<i2'),
+                            ('reserved', 'u1', (3,)), ('checksum', 'u1')])
+    FRAME_LENGTH = 19  # bytes, including separator
+    VARIABLES = ('yaw', 'pitch', 'roll', 'x_accel', 'y_accel', 'z_accel')
+    SCALE = np.array([.01, .01, .01, 0.0098067, 0.0098067, 0.0098067])
 
     def __init__(self, cfg, data_logger=None):
         super().__init__(cfg, data_logger)
         self.__logger = logging.getLogger(self.__class__.__name__)  # Need to recall logger as it's private
         # Get configuration
         self.serial_number = cfg.getint(self.__class__.__name__, 'serial_number', fallback=1500)
+        if isinstance(self._data_logger, SatlanticLogger):
+            self._data_logger.register_headers([f'SATTHS{self.serial_number:04d}'])
         data_format = cfg.get(self.__class__.__name__, 'data_format', fallback='satths').lower()
         if data_format == 'list':
             self.format_data = self.format_data_as_list
@@ -711,8 +1337,12 @@ class IMU(Sensor):
         #                          'variable_units': ['deg', 'deg', 'deg', 'm/s^2', 'm/s^2', 'm/s^2'],
         #                          'variable_precision': ['%.2f', '%.2f', '%.2f', '%.5f','%.5f', '%.5f']})
         self.decimate = cfg.getint(self.__class__.__name__, 'decimate', fallback=10)
+        self.aggregate = cfg.getboolean(self.__class__.__name__, 'aggregate', fallback=False)
+        self._block = np.empty((self.decimate, len(self.VARIABLES)))  # Samples of current decimation block
+        self._block_size = 0
         self.separator = b'\xAA\xAA'
         self.separator_len = len(self.separator)
+        self._buffer = bytearray()
         # Variables
         self.yaw = float('nan')
         self.pitch = float('nan')
@@ -729,39 +1359,117 @@ class IMU(Sensor):
         self.t0 = time()
         while self.alive:
             try:
-                packet = self._serial.read_until(self.separator, 256)  # return less than expected if timeout occurs
-                if packet:
+                data = self._serial.read(self._serial.in_waiting or 1)
+                if data:
                     timestamp = time()
+                    if self.capture is not None:
+                        self.capture.write(data, timestamp)
                     try:
-                        self.handle_packet(packet[:-self.separator_len], timestamp)  # Drop separator
+                        self.data_received(data, timestamp)
                     except Exception as e:
                         self.__logger.error(e)
                         sleep(0.1)
-            except SerialException:
+            except SerialException as e:
                 self.__logger.error(e)
                 self.stop(from_thread=True)
 
-    def handle_packet(self, packet, timestamp):
-        # Check sum
-        if len(packet) == 17 and bool(sum(packet[0:15]) % 256 == packet[16]):
-            # Unpack data
-            data = unpack_from("<BhhhhhhBBBB", packet)
-            self.counter = data[0]
-            self.yaw = data[1] * .01
-            self.pitch = data[2] * .01
-            self.roll = data[3] * .01
-            self.x_accel = data[4] * 0.0098067
-            self.y_accel = data[5] * 0.0098067
-            self.z_accel = data[6] * 0.0098067
-        else:
-            # Corrupted packet
-            self.counter, self.yaw, self.pitch, self.roll, self.x_accel, self.y_accel, self.z_accel = [float('nan')]*7
+    def data_received(self, data, timestamp):
+        self._buffer.extend(data)
+        frames, consumed = self.decode_frames(self._buffer)
+        del self._buffer[:consumed]
+        if len(frames):
+            self.handle_frames(frames, timestamp)
+
+    @classmethod
+    def decode_frames(cls, data):
+        """
+        Find and decode all complete frames in data
+        :param data: bytes received from sensor
+        :return: structured array of valid frames (FRAME_DTYPE), number of bytes consumed from data
+        """
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        n = len(buffer)
+        # Candidate frames start with separator and are complete
+        start = np.flatnonzero((buffer[:-1] == 0xAA) & (buffer[1:] == 0xAA))
+        complete = start[start <= n - cls.FRAME_LENGTH]
+        raw = buffer[complete[:, None] + np.arange(2, cls.FRAME_LENGTH)]
+        valid = raw[:, 0:15].sum(axis=1, dtype=np.uint32) % 256 == raw[:, 16]
+        complete, raw = complete[valid], raw[valid]
+        if np.any(np.diff(complete) < cls.FRAME_LENGTH):
+            # Separator found in frame content also passed checksum, keep first of overlapping frames
+            keep, end = np.zeros(len(complete), dtype=bool), -1
+            for i, s in enumerate(complete):
+                if s >= end:
+                    keep[i], end = True, s + cls.FRAME_LENGTH
+            complete, raw = complete[keep], raw[keep]
+        # Keep bytes that could still be the beginning of an incomplete frame
+        consumed = max(complete[-1] + cls.FRAME_LENGTH if len(complete) else 0, n - cls.FRAME_LENGTH + 1, 0)
+        return np.ascontiguousarray(raw).view(cls.FRAME_DTYPE)[:, 0], int(consumed)
+
+    def handle_frames(self, frames, timestamp):
+        """
+        Update state with newest frame and log frames of batch matching decimation
+        :param frames: structured array of valid frames (FRAME_DTYPE)
+        :param timestamp: time at which frames were received
+        """
         self.packet_received = timestamp
-        if isnan(self.yaw):
+        if self.aggregate:
+            self._update(*frames[-1].tolist()[:7])
+            self.aggregate_frames(frames, timestamp)
             return
-        # Write parsed data
-        if not self.counter % self.decimate:
+        decimated = frames['index'] % self.decimate == 0
+        for frame in frames[decimated].tolist():
+            self._update(*frame[:7])
             self._data_logger.write(self.format_data(), timestamp)
+        if not decimated[-1]:
+            self._update(*frames[-1].tolist()[:7])
+
+    def aggregate_frames(self, frames, timestamp):
+        """
+        Fill decimation block with frames and log statistics of each block completed
+        :param frames: structured array of valid frames (FRAME_DTYPE)
+        :param timestamp: time at which frames were received
+        """
+        values = np.column_stack([frames[k] for k in self.VARIABLES]) * self.SCALE
+        start = 0
+        while start < len(values):
+            n = min(self.decimate - self._block_size, len(values) - start)
+            self._block[self._block_size:self._block_size + n] = values[start:start + n]
+            self._block_size += n
+            start += n
+            if self._block_size == self.decimate:
+                counter = int(frames['index'][start - 1])
+                self._data_logger.write(self.format_block(self.get_block_statistics(), counter), timestamp)
+                self._block_size = 0
+
+    def get_block_statistics(self):
+        """
+        Statistics of the samples in current decimation block, yaw is averaged on the circle
+        :return: array of mean, min, max, and std (rows) of each variable (columns)
+        """
+        block = self._block[:self._block_size]
+        stats = np.stack((block.mean(axis=0), block.min(axis=0), block.max(axis=0), block.std(axis=0)))
+        yaw = np.radians(block[:, 0])
+        mean = np.degrees(np.arctan2(np.sin(yaw).mean(), np.cos(yaw).mean()))
+        deviation = (block[:, 0] - mean + 180) % 360 - 180
+        stats[:, 0] = mean, mean + deviation.min(), mean + deviation.max(), deviation.std()
+        return stats
+
+    def format_block(self, stats, counter):
+        # SATTHS frame with means of yaw, pitch, and roll in place of instantaneous values (as in SN0045)
+        # followed by the mean of acceleration and min, max, and std of all variables
+        return (f'SATTHS{self.serial_number:04d},{counter},{self.packet_received - self.t0:07.2f},' +
+                ','.join(f'{v:.2f}' if i % len(self.VARIABLES) < 3 else f'{v:.4f}' for i, v in enumerate(stats.flat)) +
+                '\x0D\x0A').encode('ascii')
+
+    def _update(self, counter, yaw, pitch, roll, x_accel, y_accel, z_accel):
+        self.counter = counter
+        self.yaw = yaw * .01
+        self.pitch = pitch * .01
+        self.roll = roll * .01
+        self.x_accel = x_accel * 0.0098067
+        self.y_accel = y_accel * 0.0098067
+        self.z_accel = z_accel * 0.0098067
 
     def format_data_as_list(self):
         return [self.yaw, self.pitch, self.roll, self.x_accel, self.y_accel, self.z_accel]
@@ -782,10 +1490,294 @@ class IMU(Sensor):
                 f',{self.yaw:.1f},{self.pitch:.1f},{self.roll:.1f}\x0D\x0A').encode('ascii')
 
 
+class FrameMatcher:
+    """
+    Frame matcher compiled once per calibration. Search all the frame headers of the calibration in a single pass
+    with one regular expression alternation and look up the frame length or terminator of the header matched.
+    """
+
+    def __init__(self, parser):
+        headers = sorted(parser.cal.keys(), key=len, reverse=True)  # Longest header first in alternation
+        self.regex = re.compile(b'|'.join(b'(' + re.escape(bytes(h, parser.ENCODING)) + b')' for h in headers)
+                                if headers else b'(?!)')  # Never match without calibration
+        # Lookup table indexed by regex group: (frame header, frame length (0 if variable), frame terminator)
+        self.frames = [None] + [(h, 0 if parser.cal[h].variable_frame_length else parser.cal[h].frame_length,
+                                 parser.cal[h].frame_terminator_bytes if parser.cal[h].frame_terminator else None)
+                                for h in headers]
+        self.frame_lengths = {h: length for h, length, _ in self.frames[1:]}
+        self.max_header_length = max((len(h) for h in headers), default=1)
+
+
+class ArrivalTimeModel:
+    """
+    Reconstruct time at which the end of each frame was received from the number of bytes received after it.
+    A chunk read from the serial port is timestamped once when the read returns (~ end of its last byte),
+    the bytes following a frame in the chunk took bits_per_byte / baudrate seconds each to be transmitted.
+    Timestamps are clamped to be monotonic per port (a chunk read late gets the previous estimate).
+    """
+    __slots__ = ('byte_time', 'last', 'count', 'clamped', 'total_correction', 'max_correction')
+
+    def __init__(self, baudrate, bits_per_byte=10):
+        """
+        :param baudrate: baud rate of serial port (bits per second)
+        :param bits_per_byte: start, data, parity, and stop bits (10 for 8N1)
+        """
+        self.byte_time = bits_per_byte / baudrate
+        self.last = float('-inf')
+        self.count, self.clamped = 0, 0
+        self.total_correction, self.max_correction = 0., 0.
+
+    @classmethod
+    def from_serial(cls, serial):
+        return cls(serial.baudrate, 1 + serial.bytesize + (serial.parity != 'N') + serial.stopbits)
+
+    def estimate(self, timestamp, bytes_after, chunk_length):
+        """
+        :param timestamp: time at which chunk was read
+        :param bytes_after: number of bytes received after end of frame (bytes left in buffer)
+        :param chunk_length: number of bytes of chunk read (frame can't be received before chunk)
+        :return: time at which end of frame was received
+        """
+        estimate = timestamp - min(bytes_after, chunk_length) * self.byte_time
+        if estimate < self.last:
+            estimate = self.last
+            self.clamped += 1
+        correction = timestamp - estimate
+        self.count += 1
+        self.total_correction += correction
+        if correction > self.max_correction:
+            self.max_correction = correction
+        self.last = estimate
+        return estimate
+
+    def get_statistics(self):
+        """
+        :return: number of frames timestamped, number clamped, mean and maximum correction (seconds)
+        """
+        return {'count': self.count, 'clamped': self.clamped, 'max_correction': self.max_correction,
+                'mean_correction': self.total_correction / self.count if self.count else float('nan')}
+
+
+class FrameBuffer:
+    """
+    Preallocated buffer to find Satlantic frames without copying the bytes left over after each frame.
+    Data is appended at the end of the buffer and consumed from its start. The unread bytes are only moved back to
+    the beginning of the buffer when there is no more room at the end of it.
+    Frames and unknown bytes are returned as memoryview of the buffer, they are valid until the next call to extend.
+    """
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self._data = bytearray(2 * max_length)
+        self._view = memoryview(self._data)
+        self._start, self._end = 0, 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def clear(self):
+        self._start, self._end = 0, 0
+
+    def extend(self, data):
+        n = len(data)
+        if self._end + n > len(self._data):
+            # Move unread bytes to the beginning of the buffer
+            length = self._end - self._start
+            if length + n > len(self._data):
+                # Data would not fit even after compacting (caller did not trim buffer), grow buffer
+                self._data = self._data[self._start:self._end] + bytearray(max(length + n, 2 * self.max_length))
+                self._view = memoryview(self._data)
+            elif length:
+                self._view[0:length] = self._view[self._start:self._end]
+            self._start, self._end = 0, length
+        self._view[self._end:self._end + n] = data
+        self._end += n
+
+    def next_frame(self, matcher):
+        """
+        Find the first known and complete frame in the buffer, mirror pySatlantic.instrument.Instrument.find_frame
+        :param matcher: FrameMatcher of the calibration of the frames to find
+        :return: frame: first known frame found (memoryview, None if no frame complete)
+                 frame_header: frame header of frame found
+                 unknown_bytes: bytes preceding the frame or invalid frame (memoryview, None if none)
+        """
+        data, start, end = self._data, self._start, self._end
+        if end - start < matcher.max_header_length:
+            # Buffer too short to find frame header
+            return None, None, None
+        match = matcher.regex.search(data, start, end)
+        if match is None:
+            # No frame found, keep end of buffer as could be the beginning of a frame header
+            keep = min(matcher.max_header_length - 1, end - start)
+            self._start = end - keep
+            return None, None, (self._view[start:self._start] if self._start > start else None)
+        frame_header, frame_length, frame_terminator = matcher.frames[match.lastindex]
+        frame_header_index = match.start()
+        if not frame_length:
+            # Variable length frame, look for frame terminator
+            frame_end_index = data.find(frame_terminator, match.end(), end)
+            if frame_end_index == -1:
+                # Buffer too short (need to get more data in buffer)
+                return self._consume_unknown(start, frame_header_index)
+            frame_end_index += len(frame_terminator)
+        else:
+            frame_end_index = frame_header_index + frame_length
+            if frame_end_index > end:
+                # Buffer too short (need to get more data in buffer)
+                return self._consume_unknown(start, frame_header_index)
+            if frame_terminator and \
+                    data[frame_end_index - len(frame_terminator):frame_end_index] != frame_terminator:
+                # Invalid frame terminator (skip frame)
+                self._start = frame_end_index
+                return None, frame_header, self._view[start:frame_end_index]
+        self._start = frame_end_index
+        return (self._view[frame_header_index:frame_end_index], frame_header,
+                self._view[start:frame_header_index] if frame_header_index > start else None)
+
+    def _consume_unknown(self, start, frame_header_index):
+        # Drop unknown bytes preceding an incomplete frame
+        self._start = frame_header_index
+        return None, None, self._view[start:frame_header_index] if frame_header_index > start else None
+
+    def trim(self, matcher):
+        """
+        Drop bytes which can not be part of a frame anymore to keep buffer under max_length.
+        The buffer only exceeds its maximum length when a frame header was found but its end never came
+        (e.g. missing terminator). Only the bytes up to the next frame header are dropped.
+        :param matcher: FrameMatcher of the calibration of the frames to find
+        :return: bytes dropped (memoryview), None if nothing was dropped
+        """
+        start, end = self._start, self._end
+        if end - start <= self.max_length:
+            return None
+        match = matcher.regex.search(self._data, start + 1, end)
+        if match is not None:
+            next_index = match.start()
+        else:
+            # No other frame header, only keep end of buffer as could be the beginning of a frame header
+            next_index = end - min(matcher.max_header_length - 1, end - start)
+        self._start = next_index
+        return self._view[start:next_index]
+
+
+# Immutable snapshot of latest calibrated spectra (dark corrected) and their parsing time
+Spectra = namedtuple('Spectra', ['Lt', 'Li', 'Es', 'Lt_parsed', 'Li_parsed', 'Es_parsed'],
+                     defaults=[None, None, None, float('nan'), float('nan'), float('nan')])
+
+
+def freeze(values):
+    """
+    Make calibrated values read only to share them between threads without copy
+    :param values: array like or None
+    :return: read only numpy array or None
+    """
+    if values is None:
+        return None
+    values = np.asarray(values)
+    values.flags.writeable = False
+    return values
+
+
+class SpectralHistory:
+    """
+    Ring buffer of the last spectra calibrated (float32) and their timestamps, preallocated for a fixed length
+    """
+    __slots__ = ('values', 'timestamps', '_index', '_count', '_lock')
+
+    def __init__(self, length, n_wavelengths):
+        self.values = np.full((length, n_wavelengths), np.nan, dtype=np.float32)
+        self.timestamps = np.full(length, np.nan)
+        self._index, self._count = 0, 0
+        self._lock = Lock()
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        with self._lock:
+            self.values.fill(np.nan)
+            self.timestamps.fill(np.nan)
+            self._index, self._count = 0, 0
+
+    def append(self, values, timestamp):
+        with self._lock:
+            self.values[self._index] = values  # Cast in place, no allocation
+            self.timestamps[self._index] = timestamp
+            self._index = (self._index + 1) % len(self.timestamps)
+            self._count = min(self._count + 1, len(self.timestamps))
+
+    def get(self, duration=None):
+        """
+        Get spectra in chronological order
+        :param duration: only return spectra received during the last duration seconds (all if None)
+        :return: timestamps (1D array), values (2D array: spectra x wavelengths), both copied from buffer
+        """
+        with self._lock:
+            sel = (np.arange(-self._count, 0) + self._index) % len(self.timestamps)
+            timestamps, values = self.timestamps[sel], self.values[sel]
+        if duration is not None and len(timestamps):
+            keep = timestamps >= timestamps[-1] - duration
+            timestamps, values = timestamps[keep], values[keep]
+        return timestamps, values
+
+    def mean(self, duration=None):
+        return np.mean(self.get(duration)[1], axis=0) if self._count else None
+
+    def std(self, duration=None):
+        return np.std(self.get(duration)[1], axis=0) if self._count else None
+
+
+class ChannelState:
+    """
+    Latest frame received and calibrated values of one channel of a HyperOCR (e.g. Lt, Li_dark, Es, THS)
+    Spectral frames received are queued in pending till parsed, so every frame is appended to history
+    """
+    __slots__ = ('name', 'raw', 'received', 'parsed', 'values', 'wavelength', 'history', 'pending')
+
+    def __init__(self, name):
+        self.name = name
+        self.wavelength = None
+        self.history = None
+        self.pending = deque()
+        self.reset()
+
+    def reset(self, raw=True, parsed=True):
+        if raw:
+            self.raw = None
+            self.received = float('nan')
+            self.pending.clear()
+        if parsed:
+            self.values = None
+            self.parsed = float('nan')
+            if self.history is not None:
+                self.history.clear()
+
+    @property
+    def updated(self):
+        """Frame received since last parsing"""
+        return self.received > self.parsed or (isnan(self.parsed) and not isnan(self.received))
+
+    def pop_pending(self):
+        """
+        Get frames queued since last call, thread safe with frames queued by reading thread
+        :return: list of (frame, timestamp) in order of reception
+        """
+        frames = []
+        try:
+            while True:
+                frames.append(self.pending.popleft())
+        except IndexError:
+            return frames
+
+
 class HyperOCR(Sensor):
 
     MAX_BUFFER_LENGTH = 16384
     DATA_TIMEOUT = 60  # seconds
+    # Channel of spectral frames indexed by frame header prefix and core variable group (light and dark)
+    CHANNELS = {('SATHSL', 'LT'): 'Lt', ('SATHLD', 'LT'): 'Lt_dark',
+                ('SATHSL', 'LI'): 'Li', ('SATHLD', 'LI'): 'Li_dark',
+                ('SATHSE', 'ES'): 'Es', ('SATHED', 'ES'): 'Es_dark'}
 
     def __init__(self, cfg, data_logger=None, parser=None):
         super().__init__(cfg, data_logger)
@@ -799,52 +1791,41 @@ class HyperOCR(Sensor):
         else:
             self._data_logger = data_logger
 
-        self._buffer = bytearray()
+        self._buffer = FrameBuffer(self.MAX_BUFFER_LENGTH)
+        # Timestamp frames with end of chunk read (chunk) or reconstruct time of each frame from baud rate (baudrate)
+        self.arrival_time = None
+        if cfg.get(self.__class__.__name__, 'timestamp_model', fallback='chunk') == 'baudrate':
+            self.arrival_time = ArrivalTimeModel.from_serial(self._serial)
+
+        self.channels = {name: ChannelState(name) for name in ('THS', *self.CHANNELS.values())}
+        self._ths = self.channels['THS']
+        self._spectral_channels = [(self.channels[n], self.channels[n + '_dark']) for n in ('Lt', 'Li', 'Es')]
 
-        self._packet_Lt_raw = None
-        self._packet_Lt_dark_raw = None
-        self._packet_Li_raw = None
-        self._packet_Li_dark_raw = None
-        self._packet_Es_raw = None
-        self._packet_Es_dark_raw = None
-        self._packet_THS_raw = None
-
-        self._packet_Lt_received = float('nan')
-        self._packet_Lt_dark_received = float('nan')
-        self._packet_Li_received = float('nan')
-        self._packet_Li_dark_received = float('nan')
-        self._packet_Es_received = float('nan')
-        self._packet_Es_dark_received = float('nan')
-        self._packet_THS_received = float('nan')
-
-        self.Lt = None
-        self.Lt_dark = None
-        self.Li = None
-        self.Li_dark = None
-        self.Es = None
-        self.Es_dark = None
         self.roll = float('nan')
         self.pitch = float('nan')
         self.compass = float('nan')      # Compass heading measured
         self.compass_adj = float('nan')  # Compass heading corrected for magnetic declination
 
-        self.packet_Lt_parsed = float('nan')
-        self.packet_Lt_dark_parsed = float('nan')
-        self.packet_Li_parsed = float('nan')
-        self.packet_Li_dark_parsed = float('nan')
-        self.packet_Es_parsed = float('nan')
-        self.packet_Es_dark_parsed = float('nan')
-        self.packet_THS_parsed = float('nan')
-
         heading_source = cfg.get(self.__class__.__name__, 'heading_source', fallback='gps_relative_position')
         self.auto_parse_ths = heading_source == 'ths_heading'
 
+        # Number of spectra kept in history of each channel
+        self.history_length = cfg.getint(self.__class__.__name__, 'history_length', fallback=600)
+
+        # Parse frames in background as they are received (otherwise parsed on request of the user interface)
+        self.parse_in_background = cfg.getboolean(self.__class__.__name__, 'parse_in_background', fallback=False)
+        self.spectra = Spectra()
+        self._parse_lock = Lock()
+        self._parse_event = Event()
+        self._parse_thread = None
+
         # Set device file (which sets dispatcher and wavelengths)
         self._parser = SatlanticParser()
         self._parser_device_file = None
         self.__immersed = cfg.getboolean(self.__class__.__name__, 'immersed', fallback=False)
         self._dispatcher = dict()
-        self.Lt_wavelength, self.Li_wavelength, self.Es_wavelength = None, None, None
+        self._matcher = FrameMatcher(self._parser)
+        self._compiled = dict()
         if parser is None:
             try:
                 self.set_parser(cfg.get(self.__class__.__name__, 'sip'))
@@ -866,6 +1847,31 @@ class HyperOCR(Sensor):
         self.__missing_packet_header = []
         self.__missing_dispatcher_key = []
 
+    def stop(self, from_thread=False):
+        super().stop(from_thread)
+        self._stop_parser()
+
+    async def stop_async(self):
+        await super().stop_async()
+        self._stop_parser()
+
+    def _stop_parser(self):
+        if self._parse_thread is not None:
+            self._parse_event.set()  # Wake up parser to exit
+            self._parse_thread.join(2)
+            if self._parse_thread.is_alive():
+                self.__logger.error('Parser thread did not join.')
+            self._parse_thread = None
+
+    def run_parser(self):
+        while self.alive:
+            if self._parse_event.wait(0.5):
+                self._parse_event.clear()
+                try:
+                    self.parse_packets()
+                except Exception as e:
+                    self.__logger.error(e)
+
     def set_parser(self, device_file):
         if self._parser_device_file == device_file:
             self.__logger.debug('device file already up to date ' + device_file)
@@ -885,95 +1891,66 @@ class HyperOCR(Sensor):
             self.start()
 
     def set_dispatcher(self):
-        self._dispatcher = dict()
+        if isinstance(self._data_logger, SatlanticLogger):
+            self._data_logger.register_headers(self._parser.cal.keys())
+        self._matcher = FrameMatcher(self._parser)  # Compile frame headers of calibration loaded
+        self._compiled = compile_calibrations(self._parser)  # Compile calibration of spectral frames
+        self._dispatcher = dict()  # Channel record indexed by frame header
         for packet_header, cal in self._parser.cal.items():
-            if 'SATTHS' in packet_header:
-                self._dispatcher[packet_header] = 'THS'
-            elif 'LT' == cal.core_groupname and 'SATHSL' in packet_header:
-                self._dispatcher[packet_header] = 'Lt'
-            elif 'LI' == cal.core_groupname and 'SATHSL' in packet_header:
-                self._dispatcher[packet_header] = 'Li'
-            elif 'ES' == cal.core_groupname and 'SATHSE' in packet_header:
-                self._dispatcher[packet_header] = 'Es'
-            elif 'LT' == cal.core_groupname and 'SATHLD' in packet_header:
-                self._dispatcher[packet_header] = 'Lt_dark'
-            elif 'LI' == cal.core_groupname and 'SATHLD' in packet_header:
-                self._dispatcher[packet_header] = 'Li_dark'
-            elif 'ES' == cal.core_groupname and 'SATHED' in packet_header:
-                self._dispatcher[packet_header] = 'Es_dark'
+            if packet_header.startswith('SATTHS'):
+                self._dispatcher[packet_header] = self._ths
+            elif (packet_header[:6], cal.core_groupname) in self.CHANNELS:
+                self._dispatcher[packet_header] = self.channels[self.CHANNELS[(packet_header[:6], cal.core_groupname)]]
             else:
                 self.__logger.warning(f'Packet header {packet_header} ignored.')
 
     def set_wavelengths(self):
-        Lt_frame_header, Li_frame_header, Es_frame_header = None, None, None
-        for packet_header, cal in self._parser.cal.items():
-            if 'LT' == cal.core_groupname and 'SATHSL' in packet_header:
-                Lt_frame_header = packet_header
-            elif 'LI' == cal.core_groupname and 'SATHSL' in packet_header:
-                Li_frame_header = packet_header
-            elif 'ES' == cal.core_groupname and 'SATHSE' in packet_header:
-                Es_frame_header = packet_header
-        if Lt_frame_header:
-            self.Lt_wavelength = [float(self._parser.cal[Lt_frame_header].id[i])
-                                  for i in self._parser.cal[Lt_frame_header].core_variables]
-        else:
-            self.Es_wavelength = float('nan')
-        if Li_frame_header:
-            self.Li_wavelength = [float(self._parser.cal[Li_frame_header].id[i])
-                                  for i in self._parser.cal[Li_frame_header].core_variables]
-        else:
-            self.Es_wavelength = float('nan')
-        if Es_frame_header:
-            self.Es_wavelength = [float(self._parser.cal[Es_frame_header].id[i])
-                                  for i in self._parser.cal[Es_frame_header].core_variables]
-        else:
-            self.Es_wavelength = float('nan')
+        for channel in self.channels.values():
+            channel.wavelength, channel.history = None, None
+            channel.pending = deque()
+        for packet_header, channel in self._dispatcher.items():
+            cal = self._parser.cal[packet_header]
+            if channel is not self._ths:
+                channel.wavelength = [float(cal.id[i]) for i in cal.core_variables]
+                channel.history = SpectralHistory(self.history_length, len(channel.wavelength))
+                channel.pending = deque(maxlen=self.history_length)  # Older frames wouldn't fit in history
 
     def reset_buffers(self, raw=True, parsed=True):
-        if raw:
-            self._packet_Lt_raw = None
-            self._packet_Lt_dark_raw = None
-            self._packet_Li_raw = None
-            self._packet_Li_dark_raw = None
-            self._packet_Es_raw = None
-            self._packet_Es_dark_raw = None
-            self._packet_THS_raw = None
-
-            self._packet_Lt_received = float('nan')
-            self._packet_Lt_dark_received = float('nan')
-            self._packet_Li_received = float('nan')
-            self._packet_Li_dark_received = float('nan')
-            self._packet_Es_received = float('nan')
-            self._packet_Es_dark_received = float('nan')
-            self._packet_THS_received = float('nan')
+        for channel in self.channels.values():
+            channel.reset(raw, parsed)
         if parsed:
-            self.Lt = None
-            self.Lt_dark = None
-            self.Li = None
-            self.Li_dark = None
-            self.Es = None
-            self.Es_dark = None
+            self.spectra = Spectra()
             self.roll = float('nan')
             self.pitch = float('nan')
             self.compass = float('nan')  # Compass heading measured
             self.compass_adj = float('nan')  # Compass heading corrected for magnetic declination
 
-            self.packet_Lt_parsed = float('nan')
-            self.packet_Lt_dark_parsed = float('nan')
-            self.packet_Li_parsed = float('nan')
-            self.packet_Li_dark_parsed = float('nan')
-            self.packet_Es_parsed = float('nan')
-            self.packet_Es_dark_parsed = float('nan')
-            self.packet_THS_parsed = float('nan')
-
     def start(self):
         self.busy = True
         if not self._parser.cal:
             self.__logger.critical('A calibration file is required for the system to work. '
                                    'Please set a calibration file using the button "Select or Upload" under '
                                    'the section "HyperSAS Device File" at the bottom of the sidebar.')
+            self._relay_off()  # In case relay was switched on by power_on
         else:
             super().start()
+            self._start_parser()
+
+    async def start_async(self):
+        if not self._parser.cal:
+            self.__logger.critical('A calibration file is required for the system to work. '
+                                   'Please set a calibration file using the button "Select or Upload" under '
+                                   'the section "HyperSAS Device File" at the bottom of the sidebar.')
+        else:
+            await super().start_async()
+            self._start_parser()
+
+    def _start_parser(self):
+        if self.alive and self.parse_in_background and \
+                (self._parse_thread is None or not self._parse_thread.is_alive()):
+            self._parse_thread = Thread(name=self.__class__.__name__ + 'Parser', target=self.run_parser)
+            self._parse_thread.daemon = True
+            self._parse_thread.start()
 
     def run(self):
         data_timeout_flag, data_received = False, None
@@ -982,11 +1959,10 @@ class HyperOCR(Sensor):
                 data = self._serial.read(self._serial.in_waiting or 1)
                 timestamp = time()
                 if data:
+                    if self.capture is not None:
+                        self.capture.write(data, timestamp)
                     try:
                         self.data_received(data, timestamp)
-                        if len(self._buffer) > self.MAX_BUFFER_LENGTH:
-                            self.__logger.error('Buffer exceeded maximum length. Buffer emptied to prevent overflow')
-                            self._buffer = bytearray()
                         data_received = timestamp
                         if data_timeout_flag:
                             data_timeout_flag = False
@@ -1008,10 +1984,10 @@ class HyperOCR(Sensor):
 
     def data_received(self, data, timestamp):
         self._buffer.extend(data)
-        packet = True
-        while packet:
-            packet, packet_header, self._buffer, unknown_bytes = self._parser.find_frame(self._buffer)
-            if unknown_bytes:
+        while True:
+            packet, packet_header, unknown_bytes = self._buffer.next_frame(self._matcher)
+            if unknown_bytes is not None:
+                unknown_bytes = bytes(unknown_bytes)  # Copy out of buffer as queued by data logger
                 self._data_logger.write(unknown_bytes, timestamp)
                 unknown_bytes_header = unknown_bytes[0:10].decode(self._parser.ENCODING, self._parser.UNICODE_HANDLING)
                 if unknown_bytes_header not in self.__missing_packet_header:
@@ -1019,41 +1995,39 @@ class HyperOCR(Sensor):
                         self.__missing_packet_header = list()
                     self.__missing_packet_header.append(unknown_bytes_header)
                     self.__logger.info('Data logged not registered: ' + str(unknown_bytes_header) + '...')
-            if packet:
-                self._data_logger.write(packet, timestamp)
-                self.dispatch_packet(packet_header, packet, timestamp)
+            if packet is not None:
+                packet = bytes(packet)  # Single copy shared by data logger and dispatcher
+                frame_timestamp = timestamp if self.arrival_time is None else \
+                    self.arrival_time.estimate(timestamp, len(self._buffer), len(data))
+                self._data_logger.write(packet, frame_timestamp)
+                self.dispatch_packet(packet_header, packet, frame_timestamp)
+            elif unknown_bytes is None:
+                break
+        dropped_bytes = self._buffer.trim(self._matcher)
+        if dropped_bytes is not None:
+            self.__logger.error(f'Buffer exceeded maximum length. '
+                                f'Dropped {len(dropped_bytes)} bytes of incomplete frame.')
+            self._data_logger.write(bytes(dropped_bytes), timestamp)
 
     def dispatch_packet(self, packet_header, packet, timestamp):
         try:
-            if self._dispatcher[packet_header] == 'THS':
-                self._packet_THS_raw = packet
-                self._packet_THS_received = timestamp
-                if self.auto_parse_ths:
-                    self.parse_ths()
-            elif self._dispatcher[packet_header] == 'Lt':
-                self._packet_Lt_raw = packet
-                self._packet_Lt_received = timestamp
-            elif self._dispatcher[packet_header] == 'Lt_dark':
-                self._packet_Lt_dark_raw = packet
-                self._packet_Lt_dark_received = timestamp
-            elif self._dispatcher[packet_header] == 'Li':
-                self._packet_Li_raw = packet
-                self._packet_Li_received = timestamp
-            elif self._dispatcher[packet_header] == 'Li_dark':
-                self._packet_Li_dark_raw = packet
-                self._packet_Li_dark_received = timestamp
-            elif self._dispatcher[packet_header] == 'Es':
-                self._packet_Es_raw = packet
-                self._packet_Es_received = timestamp
-            elif self._dispatcher[packet_header] == 'Es_dark':
-                self._packet_Es_dark_raw = packet
-                self._packet_Es_dark_received = timestamp
+            channel = self._dispatcher[packet_header]
         except KeyError:
             if packet_header not in self.__missing_dispatcher_key:
                 if len(self.__missing_dispatcher_key) > 100:
                     self.__missing_dispatcher_key = list()
                 self.__missing_dispatcher_key.append(packet_header)
                 self.__logger.warning(f'Dispatcher does not support packet {packet_header}.')
+            return
+        channel.raw = packet
+        channel.received = timestamp
+        if channel is self._ths:
+            if self.auto_parse_ths:
+                self.parse_ths()
+        else:
+            channel.pending.append((packet, timestamp))
+        if self.parse_in_background:
+            self._parse_event.set()
 
     def parse_ths(self):
         """
@@ -1061,97 +2035,93 @@ class HyperOCR(Sensor):
         :return:
         """
         try:
-            THS, _ = self._parser.parse_frame(self._packet_THS_raw)
-            self.packet_THS_parsed = time()
+            THS, _ = self._parser.parse_frame(self._ths.raw)
+            self._ths.parsed = time()
             self.roll, self.pitch, self.compass = THS['ROLL'], THS['PITCH'], THS['COMP']
         except SatlanticFrameError as e:
-            self.__logger.error('THS:' + e)
+            self.__logger.error(f'THS: {e}')
             self.roll, self.pitch, self.compass = float('nan'), float('nan'), float('nan')
-            self._packet_THS_received = float('nan')
+            self._ths.received = float('nan')
+
+    def _calibrate(self, packet):
+        """
+        Calibrate core variables of packet with compiled calibration (fallback on pySatlantic)
+        :param packet: complete frame
+        :return: calibrated core variables
+        """
+        header = packet[:self._matcher.max_header_length].decode(self._parser.ENCODING, self._parser.UNICODE_HANDLING)
+        if header in self._compiled:
+            return self._compiled[header].decode(packet)
+        data, _ = self._parser.parse_frame(packet)
+        return data[self._parser.cal[header].core_groupname]
+
+    def _calibrate_many(self, packets):
+        """
+        Calibrate core variables of packets at once if they share the same compiled calibration (see _calibrate)
+        :param packets: list of complete frames
+        :return: calibrated core variables (2D array like: frames x wavelengths)
+        """
+        length = self._matcher.max_header_length
+        header = packets[0][:length].decode(self._parser.ENCODING, self._parser.UNICODE_HANDLING) if packets else None
+        if header in self._compiled and all(p[:length] == packets[0][:length] for p in packets):
+            return self._compiled[header].decode_many(packets)
+        return [self._calibrate(p) for p in packets]
+
+    def get_spectra(self):
+        """
+        Get latest calibrated spectra, parse packets received if not parsed in background. Called by UX
+        :return: Spectra snapshot (read only)
+        """
+        if not self.parse_in_background:
+            self.parse_packets()
+        return self.spectra
 
     def parse_packets(self):
         """
-        Parse packet received since last parsing. Called by UX
+        Parse packet received since last parsing and publish snapshot of spectra
         """
-        # Parse THS
-        if self._packet_THS_received > self.packet_THS_parsed or \
-                (isnan(self.packet_THS_parsed) and not isnan(self._packet_THS_received)):
-            self.parse_ths()
-        # Parse Lt Dark
-        if self._packet_Lt_dark_received > self.packet_Lt_dark_parsed or \
-                (isnan(self.packet_Lt_dark_parsed) and not isnan(self._packet_Lt_dark_received)):
-            try:
-                Lt_dark, _ = self._parser.parse_frame(self._packet_Lt_dark_raw)
-                self.packet_Lt_dark_parsed = time()
-                self.Lt_dark = Lt_dark['LT']
-            except SatlanticFrameError as e:
-                self.__logger.error('Lt_dark:' + e)
-                self.Lt_dark = None
-                self._packet_Lt_dark_received = float('nan')
-        # Parse Lt
-        if self._packet_Lt_received > self.packet_Lt_parsed or \
-                (isnan(self.packet_Lt_parsed) and not isnan(self._packet_Lt_received)):
-            try:
-                Lt, _ = self._parser.parse_frame(self._packet_Lt_raw)
-                self.packet_Lt_parsed = time()
-                if self.Lt_dark is not None:
-                    self.Lt = Lt['LT'] - self.Lt_dark
-                else:
-                    self.Lt = Lt['LT']
-            except SatlanticFrameError as e:
-                self.__logger.error('Lt:' + e)
-                self.Lt = None
-                self._packet_Lt_received = float('nan')
-        # Parse Li Dark
-        if self._packet_Li_dark_received > self.packet_Li_dark_parsed or \
-                (isnan(self.packet_Li_dark_parsed) and not isnan(self._packet_Li_dark_received)):
-            try:
-                Li_dark, _ = self._parser.parse_frame(self._packet_Li_dark_raw)
-                self.packet_Li_dark_parsed = time()
-                self.Li_dark = Li_dark['LI']
-            except SatlanticFrameError as e:
-                self.__logger.error('Li_dark:' + e)
-                self.Li_dark = None
-                self._packet_Li_dark_received = float('nan')
-        # Parse Li
-        if self._packet_Li_received > self.packet_Li_parsed or \
-                (isnan(self.packet_Li_parsed) and not isnan(self._packet_Li_received)):
-            try:
-                Li, _ = self._parser.parse_frame(self._packet_Li_raw)
-                self.packet_Li_parsed = time()
-                if self.Li_dark is not None:
-                    self.Li = Li['LI'] - self.Li_dark
-                else:
-                    self.Li = Li['LI']
-            except SatlanticFrameError as e:
-                self.__logger.error('Li:' + e)
-                self.Li = None
-                self._packet_Li_received = float('nan')
-        # Parse Es Dark
-        if self._packet_Es_dark_received > self.packet_Es_dark_parsed or \
-                (isnan(self.packet_Es_dark_parsed) and not isnan(self._packet_Es_dark_received)):
-            try:
-                Es_dark, _ = self._parser.parse_frame(self._packet_Es_dark_raw)
-                self.packet_Es_dark_parsed = time()
-                self.Es_dark = Es_dark['ES']
-            except SatlanticFrameError as e:
-                self.__logger.error('Es_dark:' + e)
-                self.Es_dark = None
-                self._packet_Es_dark_received = float('nan')
-        # Parse Es
-        if self._packet_Es_received > self.packet_Es_parsed or \
-                (isnan(self.packet_Es_parsed) and not isnan(self._packet_Es_received)):
-            try:
-                Es, _ = self._parser.parse_frame(self._packet_Es_raw)
-                self.packet_Es_parsed = time()
-                if self.Es_dark is not None:
-                    self.Es = Es['ES'] - self.Es_dark
-                else:
-                    self.Es = Es['ES']
-            except SatlanticFrameError as e:
-                self.__logger.error('Es:' + e)
-                self.Es = None
-                self._packet_Es_received = float('nan')
+        with self._parse_lock:
+            if self._ths.updated:
+                self.parse_ths()
+            for light, dark in self._spectral_channels:
+                if dark.pending:
+                    self.parse_channel(dark)
+                if light.pending:
+                    self.parse_channel(light, dark.values)
+            self.spectra = Spectra(*(freeze(light.values) for light, _ in self._spectral_channels),
+                                   *(light.parsed for light, _ in self._spectral_channels))
+
+    def parse_channel(self, channel, dark=None):
+        """
+        Calibrate frames of channel received since last parsing, all are appended to history
+        :param channel: ChannelState to parse
+        :param dark: calibrated dark values to subtract (None if not available)
+        """
+        frames = channel.pop_pending()
+        try:
+            values = self._calibrate_many([packet for packet, _ in frames])
+        except SatlanticFrameError:
+            # Calibrate frames one by one to only drop corrupted frames
+            values, valid = [], []
+            for packet, timestamp in frames:
+                try:
+                    values.append(self._calibrate(packet))
+                    valid.append((packet, timestamp))
+                except SatlanticFrameError as e:
+                    self.__logger.error(f'{channel.name}: {e}')
+            frames = valid
+        if not frames:
+            channel.values = None
+            channel.received = float('nan')
+            return
+        values = np.asarray(values)
+        if dark is not None:
+            values = values - dark
+        channel.parsed = time()
+        channel.values = values[-1]
+        if channel.history is not None:
+            for v, (_, timestamp) in zip(values, frames):
+                channel.history.append(v, timestamp)
 
 
 class HyperSAS(HyperOCR):
@@ -1180,13 +2150,13 @@ if __name__ == '__main__':
     # sas.start()
     # sleep(8)
     # sas.parse_packets()
-    # print(sas.Lt)
-    # print(sas.Li)
+    # print(sas.spectra.Lt)
+    # print(sas.spectra.Li)
     # print(sas.roll)
     # print(sas.pitch)
     # print(sas.compass)
-    # print(sas.Lt_wavelength)
-    # print(sas.Li_wavelength)
+    # print(sas.channels['Lt'].wavelength)
+    # print(sas.channels['Li'].wavelength)
 
     # # Test Reset em and set position to zero
     # # Indexing table is encoded with latin-1 (Western Europe, Schneider is German)
@@ -0,0 +1,87 @@
+import os
+import logging
+import selectors
+from threading import Thread, Lock, current_thread
+from time import time
+
+
+class SelectorEngine:
+    """
+    Read serial ports of all sensors from a single thread waiting on their file descriptors (epoll on linux)
+    Each chunk of bytes read is timestamped and passed to the data_received method of the sensor registered.
+    Alternative to one thread blocking on each serial port (default).
+    """
+    READ_SIZE = 4096
+    SELECT_TIMEOUT = 0.5  # seconds, maximum time to notice engine is stopped
+
+    def __init__(self):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self._selector = selectors.DefaultSelector()
+        self._lock = Lock()
+        self._thread = None
+        self.alive = False
+
+    def register(self, sensor):
+        """
+        Start reading serial port of sensor, port must be open
+        :param sensor: instance of Sensor implementing data_received(data, timestamp)
+        """
+        with self._lock:
+            self._selector.register(sensor._serial.fileno(), selectors.EVENT_READ, sensor)
+            if not self.alive:
+                self.alive = True
+                self._thread = Thread(name=self.__class__.__name__, target=self.run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def unregister(self, sensor):
+        """
+        Stop reading serial port of sensor, must be called before closing port
+        Engine thread exits (within SELECT_TIMEOUT) with last sensor unregistered.
+        """
+        with self._lock:
+            for key in list(self._selector.get_map().values()):
+                if key.data is sensor:
+                    self._selector.unregister(key.fd)
+            if not self._selector.get_map():
+                self.alive = False
+
+    def stop(self):
+        with self._lock:
+            for key in list(self._selector.get_map().values()):
+                self._selector.unregister(key.fd)
+            self.alive = False
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(2)
+            if thread.is_alive():
+                self.__logger.error('Thread did not join.')
+
+    def run(self):
+        while self.alive and self._thread is current_thread():  # Previous thread exits if engine restarted
+            try:
+                events = self._selector.select(self.SELECT_TIMEOUT)
+            except (OSError, ValueError) as e:  # Port closed while waiting
+                self.__logger.debug(e)
+                continue
+            timestamp = time()
+            for key, _ in events:
+                sensor = key.data
+                if key.fd not in self._selector.get_map():  # Unregistered while waiting
+                    continue
+                try:
+                    data = os.read(key.fd, self.READ_SIZE)
+                except OSError as e:
+                    self.__logger.error(f'{sensor.__class__.__name__}: {e}')
+                    with self._lock:
+                        if key.fd in self._selector.get_map():
+                            self._selector.unregister(key.fd)
+                    continue
+                if not data:
+                    continue
+                if sensor.capture is not None:
+                    sensor.capture.write(data, timestamp)
+                try:
+                    sensor.data_received(data, timestamp)
+                except Exception as e:
+                    self.__logger.error(f'{sensor.__class__.__name__}: {e}')
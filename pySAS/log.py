@@ -1,13 +1,15 @@
 import os
 from math import isnan
-from queue import Queue, Empty
-from threading import Thread
-from time import gmtime, strftime, time
-from struct import pack
+from queue import Queue, Empty, Full
+from threading import Lock, Thread
+from time import gmtime, monotonic, strftime, time
+from struct import pack, Struct
 import atexit
 from typing import Union, IO
 import logging
 
+import numpy as np
+
 
 eng_log = logging.getLogger(__name__)
 
@@ -125,10 +127,58 @@ def pack_timestamp(timestamp):
     return pack('!d', timestamp)
 
 
-def pack_timestamp_satlantic(timestamp):
-    s, ms = divmod(timestamp, 1)
-    return pack('!ii', int(strftime('%Y%j', gmtime(s))),
-                int('{}{:03d}'.format(strftime('%H%M%S', gmtime(s)), int(ms * 1000))))[1:]
+class SatlanticTimestampEncoder:
+    """
+    Pack timestamp in Satlantic format: date as YYYYDDD (3 bytes) and time as HHMMSSmmm (4 bytes), big-endian.
+    The date and time of the last second encoded are cached, so only the milliseconds are added
+    for the following frames received in the same second. Thread safe.
+    """
+    __slots__ = ('_cache',)
+    DATE = Struct('!i')
+    TIME = Struct('!I')
+
+    def __init__(self):
+        self._cache = (None, b'', 0)  # second, packed date, and time (HHMMSS000) of second
+
+    def __call__(self, timestamp):
+        s, ms = divmod(timestamp, 1)
+        second, date, hms = self._cache
+        if s != second:
+            t = gmtime(s)
+            date = self.DATE.pack(t.tm_year * 1000 + t.tm_yday)[1:]
+            hms = (t.tm_hour * 10000 + t.tm_min * 100 + t.tm_sec) * 1000
+            self._cache = (s, date, hms)  # Replaced at once in case used by multiple threads
+        return date + self.TIME.pack(hms + int(ms * 1000))
+
+
+pack_timestamp_satlantic = SatlanticTimestampEncoder()
+
+
+def pack_timestamps_satlantic(timestamps):
+    """
+    Pack timestamps in Satlantic format (see SatlanticTimestampEncoder) at once with integer calendar math
+    :param timestamps: array of seconds since epoch (UTC) or of datetime64
+    :return: list of packed timestamps (7 bytes each)
+    """
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        ms = timestamps.astype('datetime64[ms]').astype(np.int64)
+    else:
+        # Same arithmetic as SatlanticTimestampEncoder, as seconds * 1000 can round up to the next millisecond
+        s, ms = np.divmod(timestamps.astype(np.float64), 1)
+        ms = s.astype(np.int64) * 1000 + (ms * 1000).astype(np.int64)
+    days = ms // 86400000
+    ms_of_day = ms - days * 86400000
+    days = days.astype('datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    date = (years.astype(np.int64) + 1970) * 1000 + (days - years.astype('datetime64[D]')).astype(np.int64) + 1
+    hours, ms_of_day = divmod(ms_of_day, 3600000)
+    minutes, ms_of_day = divmod(ms_of_day, 60000)
+    packed = np.empty((len(ms), 7), dtype=np.uint8)
+    packed[:, :3] = date.astype('>i4').view(np.uint8).reshape(-1, 4)[:, 1:]
+    packed[:, 3:] = (hours * 10000000 + minutes * 100000 + ms_of_day).astype('>i4').view(np.uint8).reshape(-1, 4)
+    raw = packed.tobytes()
+    return [raw[i:i + 7] for i in range(0, len(raw), 7)]
 
 
 class LogText(Log):
@@ -155,11 +205,127 @@ class LogText(Log):
                          ', ' + self.registration + data.decode(self.ENCODING, self.UNICODE_HANDLING) + self.terminator)
 
 
+FRAME_HEADER_LENGTH = 10  # Maximum number of bytes identifying type of frame (e.g. SATHSL0250)
+
+
+def get_frame_header(data: bytes) -> bytes:
+    """
+    Get header identifying type of frame, the first bytes of a Satlantic frame (e.g. SATHSL0250) or
+    the first field of a comma separated frame (e.g. UMTWR, or $GPRMC for NMEA sentences)
+    :param data: frame
+    :return: header or empty bytes if frame doesn't start with a header
+    """
+    header = data[:FRAME_HEADER_LENGTH].split(b',', 1)[0]
+    return bytes(header) if header[header.startswith(b'$'):].isalnum() else b''
+
+
+class FrameIndexWriter:
+    """
+    Binary index of frames written in a Satlantic file (sidecar .idx file).
+    File starts with a header (magic, version, and number of slots in table of frame headers), followed by
+    the table of frame headers (MAX_HEADERS slots of FRAME_HEADER_LENGTH bytes, filled as new headers are found),
+    and by an array of fixed-width records (offset and length of frame in data file, index of header in table,
+    and timestamp of frame). Index is valid up to the last complete record in case file isn't closed properly.
+    """
+    MAGIC = b'pySASIDX'
+    VERSION = 1
+    MAX_HEADERS = 64
+    UNKNOWN_HEADER = 0xFFFF
+    HEADER = Struct('<8sBH')  # magic, version, max headers
+    RECORD = Struct('<QIHd')  # offset, length (without timestamp), header id, timestamp
+    TIMESTAMP_LENGTH = 7  # bytes appended to frame in data file
+
+    def __init__(self, filename: str):
+        self._file: IO = open(filename, 'wb')
+        self._file.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.MAX_HEADERS) +
+                         bytes(self.MAX_HEADERS * FRAME_HEADER_LENGTH))
+        self._headers: dict = {}
+        self._records: bytearray = bytearray()
+        self.offset: int = 0  # Offset of next frame in data file
+
+    @property
+    def name(self):
+        return self._file.name
+
+    def _get_header_id(self, data: bytes) -> int:
+        header = get_frame_header(data)
+        header_id = self._headers.get(header)
+        if header_id is None:
+            if not header or len(self._headers) >= self.MAX_HEADERS:
+                return self.UNKNOWN_HEADER
+            header_id = self._headers[header] = len(self._headers)
+            # Fill slot of table in place
+            self._file.seek(self.HEADER.size + header_id * FRAME_HEADER_LENGTH)
+            self._file.write(header)
+            self._file.seek(0, os.SEEK_END)
+        return header_id
+
+    def append(self, data: bytes, timestamp: float):
+        """
+        Index frame, records are written to file with write
+        :param data: frame written to data file (without timestamp)
+        :param timestamp: timestamp of frame
+        """
+        self._records += self.RECORD.pack(self.offset, len(data), self._get_header_id(data), timestamp)
+        self.offset += len(data) + self.TIMESTAMP_LENGTH
+
+    def write(self):
+        if self._records:
+            self._file.write(self._records)
+            del self._records[:]
+
+    def flush(self):
+        self.write()
+        self._file.flush()
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def close(self):
+        self.write()
+        self._file.close()
+
+
+FRAME_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4'), ('header_id', '<u2'), ('timestamp', '<f8')])
+
+
+def read_frame_index(filename: str):
+    """
+    Read index of frames written by FrameIndexWriter
+    :param filename: path to index file (.idx)
+    :return: list of headers (position in list is header id), and structured array of records
+        (fields: offset, length, header_id, and timestamp)
+    """
+    with open(filename, 'rb') as f:
+        raw = f.read()
+    magic, version, max_headers = FrameIndexWriter.HEADER.unpack_from(raw)
+    if magic != FrameIndexWriter.MAGIC or version != FrameIndexWriter.VERSION:
+        raise ValueError(f'{filename} is not a pySAS frame index (version {FrameIndexWriter.VERSION}).')
+    start = FrameIndexWriter.HEADER.size + max_headers * FRAME_HEADER_LENGTH
+    table = raw[FrameIndexWriter.HEADER.size:start]
+    headers = [table[i:i + FRAME_HEADER_LENGTH].rstrip(b'\x00')
+               for i in range(0, len(table), FRAME_HEADER_LENGTH)]
+    while headers and not headers[-1]:
+        headers.pop()
+    n = (len(raw) - start) // FRAME_INDEX_DTYPE.itemsize  # Ignore incomplete record
+    return headers, np.frombuffer(raw, dtype=FRAME_INDEX_DTYPE, count=n, offset=start)
+
+
 class SatlanticLogger:
     """
     Thread Safe Satlantic Data logger. It writes data to file in Satlantic format.
     Rotates files automatically based on timestamp. The write method is thread safe.
+    Frames are queued up to max_queue_size, beyond which the overflow_policy applies:
+        block: wait up to block_timeout seconds for space in queue, then drop the new frame.
+            Stalls the thread calling write, unsafe if a single thread reads all sensors (selector io engine)
+        drop_oldest: discard the oldest frame queued to make space for the new frame
+        drop_newest: discard the new frame
     """
+    OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+    COUNTERS = ('enqueued_frames', 'enqueued_bytes', 'written_frames', 'written_bytes',
+                'dropped_frames', 'dropped_bytes')
+    UNKNOWN_HEADER = b'unknown'  # Counters of frames with header not registered
+
     def __init__(self, cfg):
         # Load configuration
         self.file_length: int = cfg['length'] * 60 if 'length' in cfg.keys() else 60 * 60 # seconds
@@ -167,17 +333,42 @@ class SatlanticLogger:
         self.filename_ext: str = cfg['filename_ext'] if 'filename_ext' in cfg.keys() else 'raw'
         self.path: str = cfg['path'] if 'path' in cfg.keys() else ''
         self.reopen_delay: float = cfg['reopen_delay'] if 'reopen_delay' in cfg.keys() else 5.0  # seconds
+        # Frames queued are written to file in batches of up to batch_size frames or batch_delay seconds
+        self.batch_size: int = cfg['batch_size'] if 'batch_size' in cfg.keys() else 512
+        self.batch_delay: float = cfg['batch_delay'] if 'batch_delay' in cfg.keys() else 0.1  # seconds
+        # Maximum time data stays in buffer of file (flush) and in cache of operating system (fsync, 0 to disable)
+        self.flush_interval: float = cfg['flush_interval'] if 'flush_interval' in cfg.keys() else 1.0  # seconds
+        self.fsync_interval: float = cfg['fsync_interval'] if 'fsync_interval' in cfg.keys() else 0  # seconds
+        # Bound memory used by queue if storage stalls (0 for unbounded queue)
+        self.max_queue_size: int = cfg['max_queue_size'] if 'max_queue_size' in cfg.keys() else 10000  # frames
+        self.overflow_policy: str = cfg['overflow_policy'] if 'overflow_policy' in cfg.keys() else 'block'
+        self.block_timeout: float = cfg['block_timeout'] if 'block_timeout' in cfg.keys() else 0.5  # seconds
+        # Write index of frames (.idx) alongside each data file
+        self.index: bool = cfg['index'] if 'index' in cfg.keys() else True
+        if self.overflow_policy not in self.OVERFLOW_POLICIES:
+            eng_log.warning(f'Invalid overflow policy {self.overflow_policy}, fallback to block.')
+            self.overflow_policy = 'block'
 
         # File Handler
         self._file: IO = None
+        self._index: Union[FrameIndexWriter, None] = None
         self._file_timestamp: Union[int, None] = None  # time.time
         self._file_closed_timestamp: Union[int, None] = None
+        self._flushed: float = 0  # time.monotonic
+        self._synced: float = 0  # time.monotonic
+        self._batch: bytearray = bytearray()  # Reused by writing thread
 
         # Thread Safe Queue
-        self._queue: Queue = Queue()
+        self._queue: Queue = Queue(self.max_queue_size)
         self._thread: Thread = None
         self._alive: bool = False
 
+        # Counters per frame header registered (see register_headers) and high-water mark of queue depth
+        self.known_headers: set = set()
+        self._counters: dict = {}
+        self._counters_lock: Lock = Lock()
+        self.queue_high_water: int = 0
+
         # Safe exit
         atexit.register(self.close)
 
@@ -209,20 +400,76 @@ class SatlanticLogger:
         """
         while self._alive:
             try:
-                data, timestamp = self._queue.get(timeout=1)
+                items = [self._queue.get(timeout=min(1, self.flush_interval or 1))]
             except Empty:
                 # Use timeout to exit thread in timely fashion when stop thread
+                self._flush()
                 continue
-            self._smart_open(timestamp)
-            self._file.write(data + pack_timestamp_satlantic(timestamp))
+            # Drain queue up to batch_size items or batch_delay seconds
+            deadline = monotonic() + self.batch_delay
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get(timeout=max(deadline - monotonic(), 0)))
+                except Empty:
+                    break
+            self._write_batch(items)
+            self._flush()
         # Write remaining data in queue before closing file
         if self._file and not self._file.closed:
+            items = []
             while not self._queue.empty():
-                data, timestamp = self._queue.get()
-                self._file.write(data + pack_timestamp_satlantic(timestamp))
+                items.append(self._queue.get())
+            self._write_batch(items)
         # Close file
         self._close_file()
 
+    def _write_batch(self, items):
+        """
+        Write frames with a single call to write (per file)
+        :param items: list of (data, timestamp)
+        """
+        batch = self._batch
+        for data, timestamp in items:
+            if self._file is None or self._file.closed or self._rollover(timestamp):
+                if batch:
+                    self._file.write(batch)
+                    del batch[:]
+                self._smart_open(timestamp)
+            batch += data
+            batch += pack_timestamp_satlantic(timestamp)
+            if self._index:
+                self._index.append(data, timestamp)
+        if batch:
+            self._file.write(batch)
+            del batch[:]
+            if self._index:
+                self._index.write()
+        with self._counters_lock:
+            for data, _ in items:
+                self._count(data, 2)
+
+    def _flush(self):
+        """
+        Flush file buffer every flush_interval and sync file to disk every fsync_interval
+        """
+        if self._file is None or self._file.closed:
+            return
+        now = monotonic()
+        if now - self._flushed >= self.flush_interval:
+            self._file.flush()
+            if self._index:
+                self._index.flush()
+            self._flushed = now
+            if self.fsync_interval and now - self._synced >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                if self._index:
+                    os.fsync(self._index.fileno())
+                self._synced = now
+
+    def _rollover(self, timestamp):
+        return gmtime(self._file_timestamp).tm_mday != gmtime(timestamp).tm_mday or \
+            timestamp - self._file_timestamp >= self.file_length
+
     def _smart_open(self, timestamp: int):
         """
         Open file if not opened or time to roll to new file
@@ -231,9 +478,7 @@ class SatlanticLogger:
         :return:
         """
         # Open file if necessary
-        if self._file is None or self._file.closed or \
-                gmtime(self._file_timestamp).tm_mday != gmtime(timestamp).tm_mday or \
-                timestamp - self._file_timestamp >= self.file_length:
+        if self._file is None or self._file.closed or self._rollover(timestamp):
             # Close previous file if open
             if self._file and not self._file.closed:
                 self._close_file()
@@ -261,6 +506,8 @@ class SatlanticLogger:
         # Create File
         self._file = open(filename, 'wb')
         eng_log.info('Opened file %s', self._file.name)
+        if self.index:
+            self._index = FrameIndexWriter(os.path.splitext(filename)[0] + '.idx')
         # Time file open
         self._file_timestamp = timestamp
         self._file_closed_timestamp = None
@@ -272,9 +519,18 @@ class SatlanticLogger:
         :return:
         """
         if self._file and not self._file.closed:
+            if self.fsync_interval:
+                self._file.flush()
+                os.fsync(self._file.fileno())
             self._file.close()
             self._file_closed_timestamp = time()
             eng_log.info('Closed file %s', self._file.name)
+        if self._index:
+            if self.fsync_interval:
+                self._index.flush()
+                os.fsync(self._index.fileno())
+            self._index.close()
+            self._index = None
         self._file_timestamp = None
 
     def write(self, data: bytes, timestamp: int = None):
@@ -294,7 +550,77 @@ class SatlanticLogger:
                 eng_log.debug(f'File recently closed, discarding data: {data[:10]} ...')
                 return
             self._start_thread()
-        self._queue.put((data, timestamp))
+        item = (data, timestamp)
+        with self._counters_lock:
+            self._count(data, 0)
+        if self.overflow_policy == 'block':
+            try:
+                self._queue.put(item, timeout=self.block_timeout)
+            except Full:
+                self._drop(item)
+        elif self.overflow_policy == 'drop_newest':
+            try:
+                self._queue.put_nowait(item)
+            except Full:
+                self._drop(item)
+        else:  # drop_oldest
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    break
+                except Full:
+                    try:
+                        self._drop(self._queue.get_nowait())
+                    except Empty:
+                        pass
+        depth = self._queue.qsize()
+        if depth > self.queue_high_water:
+            self.queue_high_water = depth
+
+    def _count(self, data: bytes, index: int):
+        """
+        Increment frame and byte counters of frame header. Must hold counters lock.
+
+        :param data: frame
+        :param index: index of frames counter in COUNTERS (bytes counter follows)
+        """
+        header = get_frame_header(data)
+        if header not in self.known_headers:
+            header = self.UNKNOWN_HEADER
+        counters = self._counters.get(header)
+        if counters is None:
+            counters = self._counters[header] = [0] * len(self.COUNTERS)
+        counters[index] += 1
+        counters[index + 1] += len(data)
+
+    def register_headers(self, headers):
+        """
+        Register headers of frames counted separately in statistics, other frames are counted together as unknown
+        (to bound counters in case of garbage data)
+
+        :param headers: frame headers (e.g. keys of calibration of Satlantic parser, UMTWR, $GPRMC)
+        """
+        with self._counters_lock:
+            self.known_headers.update(h.encode('ascii') if isinstance(h, str) else h for h in headers)
+
+    def _drop(self, item):
+        with self._counters_lock:
+            self._count(item[0], 4)
+        eng_log.debug(f'Queue full, dropped frame: {item[0][:10]} ...')
+
+    def get_statistics(self) -> dict:
+        """
+        Get counters of frames and bytes enqueued, written, and dropped per frame header,
+        and depth of queue (current and high-water mark).
+
+        :return: dictionary of statistics
+        """
+        with self._counters_lock:
+            headers = {k.decode('ascii'): dict(zip(self.COUNTERS, v)) for k, v in self._counters.items()}
+        stats = {c: sum(h[c] for h in headers.values()) for c in self.COUNTERS}
+        stats.update(queue_depth=self._queue.qsize(), queue_high_water=self.queue_high_water,
+                     max_queue_size=self.max_queue_size, headers=headers)
+        return stats
 
     def close(self):
         """
@@ -0,0 +1,76 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import time
+
+
+class PowerOrchestrator:
+    """
+    Power up and shut down instruments concurrently
+    Relays of all instruments are switched on together, then instruments are started (serial port opened and
+    configured) from a small thread pool and waited for against a single deadline.
+    Wake-up latency is bounded by the slowest instrument instead of the sum of all instruments.
+    """
+    MAX_WORKERS = 4
+    TIMEOUT = 15  # seconds, deadline to start or stop all instruments
+
+    def __init__(self, max_workers=MAX_WORKERS, timeout=TIMEOUT):
+        """
+        :param max_workers: maximum number of instruments started or stopped simultaneously
+        :param timeout: seconds to wait for all instruments
+        """
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.readiness = {}  # Seconds to start or stop each instrument during last call (nan if failed or late)
+
+    def start(self, instruments):
+        """
+        Switch relays on and start instruments
+        :param instruments: IndexingTable or Sensor instances (None are ignored)
+        :return: seconds for each instrument to be alive (nan if failed or not alive by deadline)
+        """
+        instruments = [i for i in instruments if i is not None]
+        for instrument in instruments:
+            instrument.power_on()
+        return self._run('start', instruments, lambda i: i.alive)
+
+    def stop(self, instruments):
+        """
+        Stop instruments (and switch relays off)
+        :param instruments: IndexingTable or Sensor instances (None are ignored)
+        :return: seconds for each instrument to be stopped (nan if failed or not stopped by deadline)
+        """
+        return self._run('stop', [i for i in instruments if i is not None], lambda i: not i.alive)
+
+    def _run(self, method, instruments, ready):
+        if not instruments:
+            self.readiness = {}
+            return self.readiness
+        started = time()
+
+        def call(instrument):
+            getattr(instrument, method)()
+            return time() - started
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(instruments)),
+                                      thread_name_prefix=self.__class__.__name__)
+        futures = {instrument: executor.submit(call, instrument) for instrument in instruments}
+        wait(futures.values(), timeout=self.timeout)
+        executor.shutdown(wait=False)  # Don't wait for instruments past deadline
+        readiness = {}
+        for instrument, future in futures.items():
+            name = instrument.__class__.__name__
+            if not future.done():
+                self.__logger.error(f'{method} {name}: not done within {self.timeout} seconds')
+                readiness[name] = float('nan')
+            elif future.exception() is not None:
+                self.__logger.error(f'{method} {name}: {future.exception()}')
+                readiness[name] = float('nan')
+            elif not ready(instrument):
+                self.__logger.warning(f'{method} {name}: failed')
+                readiness[name] = float('nan')
+            else:
+                readiness[name] = future.result()
+        self.readiness = readiness
+        self.__logger.info(f'{method}: ' + ', '.join(f'{k} {v:.2f} s' for k, v in readiness.items()))
+        return readiness
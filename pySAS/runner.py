@@ -1,4 +1,5 @@
 import os
+import asyncio
 import logging
 import configparser
 from time import gmtime, time, sleep, strftime
@@ -9,7 +10,9 @@ import atexit
 from subprocess import run
 from threading import Thread
 from pySAS.interfaces import IndexingTable, GPS, HyperSAS, Es, IMU
-from pySAS import WORLD_MAGNETIC_MODEL
+from pySAS.io_engine import SelectorEngine
+from pySAS.power import PowerOrchestrator
+from pySAS import MAGNETIC_DECLINATION
 
 # pySolar
 from datetime import datetime
@@ -64,7 +67,17 @@ class Runner:
             'filename_ext': self.cfg.get('DataLogger', 'filename_ext', fallback='raw'),
             'path': self.cfg.get('DataLogger', 'path_to_data', fallback=os.path.join(os.path.dirname(__file__), 'data')),
             'reopen_delay': self.cfg.getfloat('DataLogger', 'reopen_delay', fallback=5.0),
+            'batch_size': self.cfg.getint('DataLogger', 'batch_size', fallback=512),
+            'batch_delay': self.cfg.getfloat('DataLogger', 'batch_delay', fallback=0.1),
+            'flush_interval': self.cfg.getfloat('DataLogger', 'flush_interval', fallback=1.0),
+            'fsync_interval': self.cfg.getfloat('DataLogger', 'fsync_interval', fallback=0),
+            'max_queue_size': self.cfg.getint('DataLogger', 'max_queue_size', fallback=10000),
+            'overflow_policy': self.get_overflow_policy(),
+            'block_timeout': self.cfg.getfloat('DataLogger', 'block_timeout', fallback=0.5),
+            'index': self.cfg.getboolean('DataLogger', 'index', fallback=True),
         })
+        self.data_logger.register_headers([b'UMTWR'])  # Sensors register headers of their own frames
+        self.data_logger_dropped = 0
 
         # Pilot
         self.pilot = AutoPilot(self.cfg)
@@ -87,6 +100,17 @@ class Runner:
             self.es = Es(self.cfg, self.data_logger, parser=self.hypersas._parser)
         if 'IMU' in self.cfg.sections():
             self.imu = IMU(self.cfg, self.data_logger)
+        # Read all sensors from a single thread (default: one thread per sensor)
+        self.io_engine = None
+        if self.cfg.get(self.__class__.__name__, 'io_engine', fallback='thread') == 'selector':
+            self.io_engine = SelectorEngine()
+            for sensor in (self.gps, self.hypersas, self.es, self.imu):
+                if sensor is not None:
+                    sensor.io_engine = self.io_engine
+
+        # Power up and shut down instruments concurrently
+        self.power = PowerOrchestrator(timeout=self.cfg.getfloat(self.__class__.__name__, 'power_timeout',
+                                                                 fallback=PowerOrchestrator.TIMEOUT))
 
         # Set operation mode and start thread
         self.operation_mode = self.cfg.get('Runner', 'operation_mode', fallback='auto')
@@ -124,6 +148,13 @@ class Runner:
             # self.gps.stop()
 
     def run_auto(self):
+        asyncio.run(self.run_auto_async())
+
+    async def run_auto_async(self):
+        """
+        Automatic control loop, waits on instruments replies and sun position computation concurrently
+        """
+        loop = asyncio.get_running_loop()
         flag_sun_pos, flag_sun_elev, flag_no_ship_heading, flag_no_position, flag_stalled = (
             False, False, False, False, False)
         first_iteration = True
@@ -137,12 +168,18 @@ class Runner:
             # Timer
             iteration_timestamp = time()
             try:
-                # Get Sun Position
-                if not self.get_sun_position():
+                # Get Sun Position (computed in executor), tower position and stall flag at once
+                # (tower position is needed even if tower stalled to log tower position)
+                if self.indexing_table.alive:
+                    sun_position, status = await asyncio.gather(
+                        loop.run_in_executor(None, self.get_sun_position), self.indexing_table.poll_status_async())
+                else:
+                    sun_position, status = await loop.run_in_executor(None, self.get_sun_position), None
+                if not sun_position:
                     if not flag_sun_pos:
                         self.__logger.info('No sun position.')
                         flag_sun_pos = True
-                    self._wait(iteration_timestamp)
+                    await self._wait_async(iteration_timestamp)
                     continue
 
                 # Switch operating mode: alseep, awake
@@ -157,8 +194,8 @@ class Runner:
                             flag_sun_elev = True
                         t0 = time()
                         while self.alive and time() - t0 < self.ASLEEP_INTERRUPT:
-                            sleep(1)
-                        continue  # Avoid self._wait as it would show warning
+                            await asyncio.sleep(1)
+                        continue  # Avoid self._wait_async as it would show warning
                 elif isnan(self.sun_azimuth):
                     # Sun position not available, go to sleep
                     self.go_to_sleep(first_iteration)
@@ -172,7 +209,7 @@ class Runner:
                         if not flag_no_ship_heading:
                             self.__logger.info('No ship heading.')
                             flag_no_ship_heading = True
-                        self._wait(iteration_timestamp)
+                        await self._wait_async(iteration_timestamp)
                         continue
                     flag_no_ship_heading = False
                     # Compute target position for tower
@@ -183,28 +220,33 @@ class Runner:
                             self.__logger.info('No orientation available.')
                             flag_no_position = True
                         self.go_to_sleep(first_iteration)
-                        self._wait(iteration_timestamp)
+                        await self._wait_async(iteration_timestamp)
                         continue
                     flag_no_position = False
                     # Wake up system
                     self.wakeup(first_iteration)
                     if not self.indexing_table.alive:
-                        self._wait(iteration_timestamp)
+                        await self._wait_async(iteration_timestamp)
                         continue
-                    # Get tower position (needed even if tower stalled to log tower position)
-                    pos = self.indexing_table.get_position()
+                    if status is None:  # Indexing table just woke up
+                        status = await self.indexing_table.poll_status_async()
+                        if status is None:
+                            await self._wait_async(iteration_timestamp)
+                            continue
+                    pos, stalled = status.position, status.stalled
                     # Check tower if tower stalled
-                    if self.indexing_table.get_stall_flag():
+                    if stalled:
                         if not flag_stalled:
                             self.__logger.warning('Indexing table stalled.')
                             flag_stalled = True
                     else:
                         # Set tower position
                         if abs(pos - aimed_indexing_table_orientation) > self.HEADING_TOLERANCE:
-                            self.indexing_table.set_position(aimed_indexing_table_orientation)
+                            await self.indexing_table.set_position_async(aimed_indexing_table_orientation)
                         flag_stalled = False
                     # Log Tower and Ship headings and status
                     self.data_logger.write(*self.make_umtwr_frame())
+                    self.check_data_logger()
             except Exception as e:
                 self.__logger.critical(e)
 
@@ -213,7 +255,7 @@ class Runner:
                 first_iteration = False
 
             # Wait before next iteration
-            self._wait(iteration_timestamp)
+            await self._wait_async(iteration_timestamp)
 
     def run_manual(self):
         while self.alive:
@@ -222,8 +264,7 @@ class Runner:
             try:
                 # Get Tower position and stall flag (needed by UI)
                 if self.indexing_table.alive:
-                    self.indexing_table.get_position()
-                    self.indexing_table.get_stall_flag()
+                    self.indexing_table.poll_status()
                 # Get Sun Position (requires gps, needed by UI)
                 self.get_sun_position()
                 # Do things only if HyperSAS is not measuring
@@ -235,6 +276,7 @@ class Runner:
                 self.gps.start_logging()
                 # Write Tower Data (requires gps, sun position, and tower position)
                 self.data_logger.write(*self.make_umtwr_frame())
+                self.check_data_logger()
             except Exception as e:
                 self.__logger.critical(e)
             # Wait before next iteration
@@ -254,6 +296,17 @@ class Runner:
                 self.__logger.warning('Cannot keep up with refresh rate, slowing down.')
                 sleep(1 + abs(self.refresh_delay))
 
+    async def _wait_async(self, start_iter):
+        if self.alive:
+            delta = self.refresh_delay - (time() - start_iter)
+            if delta > 0:
+                start_sleep = time()
+                while time() - start_sleep < delta and self.alive:
+                    await asyncio.sleep(min(0.1, delta))
+            else:
+                self.__logger.warning('Cannot keep up with refresh rate, slowing down.')
+                await asyncio.sleep(1 + abs(self.refresh_delay))
+
     def go_to_sleep(self, force=False):
         """
         Go to sleep, power off all instruments except GPS (needed for wake up, stop GPS logging)
@@ -267,12 +320,7 @@ class Runner:
                 self.start_sleep_timestamp = time()
             if time() - self.start_sleep_timestamp > self.ASLEEP_DELAY or force:
                 self.__logger.info('Stop instruments.')
-                self.indexing_table.stop()
-                self.hypersas.stop()
-                if self.es:
-                    self.es.stop()
-                if self.imu:
-                    self.imu.stop()
+                self.power.stop((self.indexing_table, self.hypersas, self.es, self.imu))
                 self.gps.stop_logging()
                 self.asleep = True
         # Reset wake-up timer if still asleep way passed wake-up delay
@@ -297,13 +345,8 @@ class Runner:
                 self.__logger.info('Start instruments.')
                 if not self.internet and not self.hypersas.alive:
                     self.get_time_sync()
-                self.indexing_table.start()
                 self.gps.start_logging()
-                if self.es:
-                    self.es.start()
-                if self.imu:
-                    self.imu.start()
-                self.hypersas.start()
+                self.power.start((self.indexing_table, self.es, self.imu, self.hypersas))
                 self.asleep = False
         self.start_sleep_timestamp = None  # Reset sleep timer, in any case to stay up for as long as possible
 
@@ -324,6 +367,29 @@ class Runner:
             self.__logger.warning("Unable to synchronize time.")
             return False
 
+    def get_overflow_policy(self):
+        """
+        Policy of data logger when its queue is full, block unless all sensors are read from a single thread
+        (selector io engine) which would stall reading of every sensor, in that case drop oldest frames
+        """
+        selector = self.cfg.get(self.__class__.__name__, 'io_engine', fallback='thread') == 'selector'
+        policy = self.cfg.get('DataLogger', 'overflow_policy', fallback='drop_oldest' if selector else 'block')
+        if selector and policy == 'block':
+            self.__logger.warning('Data logger overflow policy block stalls all sensors with selector io engine.')
+        return policy
+
+    def check_data_logger(self):
+        """
+        Warn if frames were dropped by data logger since last check (storage too slow or stalled)
+        :return: statistics of data logger
+        """
+        stats = self.data_logger.get_statistics()
+        if stats['dropped_frames'] > self.data_logger_dropped:
+            self.__logger.warning(f"Data logger dropped {stats['dropped_frames'] - self.data_logger_dropped} frames, "
+                                  f"queue high-water mark {stats['queue_high_water']}/{stats['max_queue_size']}.")
+            self.data_logger_dropped = stats['dropped_frames']
+        return stats
+
     def get_sun_position(self):
         """
         Compute sun position after checking that gps fix and datetime valid are ok
@@ -360,12 +426,12 @@ class Runner:
                 return True
         elif self.heading_source == 'ths_heading':
             if (self.gps.fix_ok and time() - self.gps.packet_pvt_received < self.DATA_EXPIRED_DELAY and
-                    not isnan(self.hypersas.compass) and time() - self.hypersas.packet_THS_parsed < self.DATA_EXPIRED_DELAY):
+                    not isnan(self.hypersas.compass) and time() - self.hypersas.channels['THS'].parsed < self.DATA_EXPIRED_DELAY):
                 self.hypersas.compass_adj = get_true_north_heading(self.hypersas.compass,
                                                                    self.gps.latitude, self.gps.longitude,
                                                                    self.gps.datetime, self.gps.altitude)
                 self.ship_heading = self.pilot.get_ship_heading(self.hypersas.compass_adj, self.indexing_table.get_position())
-                self.ship_heading_timestamp = self.hypersas.packet_THS_parsed
+                self.ship_heading_timestamp = self.hypersas.channels['THS'].parsed
                 return True
         else:
             raise ValueError('Invalid heading source')
@@ -495,7 +561,7 @@ def get_true_north_heading(heading, latitude, longitude, datetime_utc=None, alti
     if datetime_utc.tzinfo is None or datetime_utc.tzinfo.utcoffset(datetime_utc) is None:
         datetime_utc = datetime_utc.replace(tzinfo=pytz.utc)
 
-    return (heading + WORLD_MAGNETIC_MODEL.GeoMag(latitude, longitude, altitude * 3.2808399, datetime_utc.date()).dec) % 360
+    return (heading + MAGNETIC_DECLINATION.get(latitude, longitude, altitude, datetime_utc)) % 360
 
 
 def normalize_angle(angle):
@@ -0,0 +1,91 @@
+"""
+Hardware simulator of pySAS instruments on Linux pseudo-terminals
+Run pySAS without hardware (e.g. on a laptop) or for load and soak testing:
+    python -m pySAS.simulator --output simulator_cfg.ini
+    python -m pySAS simulator_cfg.ini
+"""
+import os
+
+from pySAS.interfaces import IndexingTable
+from pySAS.simulator.device import PtyDevice, StreamingDevice
+from pySAS.simulator.gps import GPSSimulator
+from pySAS.simulator.imu import IMUSimulator
+from pySAS.simulator.mdrive import MDriveSimulator
+from pySAS.simulator.satlantic import SatlanticSimulator, load_sip
+
+PATH_TO_SIP = os.path.join(os.path.dirname(__file__), '..', 'calibration_files', 'HyperSAS_Es_20200212.sip')
+
+
+class Simulator:
+    """
+    Simulate all instruments of pySAS: indexing table (MDrive), GPS (UBX), IMU (BNO085 RVC),
+    HyperSAS (Lt, Li, and THS), and Es (Satlantic frames generated from the calibration of the sip file).
+    The THS compass follows the heading of the ship and the position of the indexing table.
+    """
+    # Baud rate of instruments, set in configuration missing instruments (pseudo-terminals ignore it)
+    BAUDRATES = {'IndexingTable': 9600, 'GPS': 115200, 'HyperSAS': 57600, 'Es': 57600, 'IMU': 115200}
+
+    def __init__(self, sip=PATH_TO_SIP, heading=45., hypersas_rate=2, es_rate=2, gps_rate=5, imu_rate=100,
+                 es=True, imu=True):
+        """
+        :param sip: device file of HyperSAS and Es
+        :param heading: heading of ship (deg)
+        :param hypersas_rate: HyperSAS frames (Lt, Li, and THS) per second
+        :param es_rate: Es frames per second
+        :param gps_rate: navigation solutions per second
+        :param imu_rate: IMU frames per second
+        :param es: simulate Es
+        :param imu: simulate IMU
+        """
+        self.sip = os.path.abspath(sip)
+        self.heading = heading
+        calibrations = list(load_sip(self.sip).cal.values())
+        es_frames = [c for c in calibrations if c.frame_header.startswith(('SATHSE', 'SATHED'))]
+        self.devices = {
+            'IndexingTable': MDriveSimulator(parameters=IndexingTable.CONFIGURATION),
+            'GPS': GPSSimulator(gps_rate, heading=heading),
+            'HyperSAS': SatlanticSimulator([c for c in calibrations if c not in es_frames], hypersas_rate,
+                                           get_compass=self.get_tower_heading)}
+        if es:
+            self.devices['Es'] = SatlanticSimulator(es_frames, es_rate)
+        if imu:
+            self.devices['IMU'] = IMUSimulator(imu_rate, heading=heading)
+
+    def get_tower_heading(self):
+        return self.heading + self.devices['IndexingTable'].get_position() / IndexingTable.GEAR_BOX_RATIO
+
+    def configure(self, cfg):
+        """
+        Point serial ports of configuration to simulated instruments
+        :param cfg: ConfigParser of pySAS
+        :return: cfg
+        """
+        for section, device in self.devices.items():
+            if not cfg.has_section(section):
+                cfg.add_section(section)
+                cfg.set(section, 'baudrate', str(self.BAUDRATES[section]))
+            cfg.set(section, 'port', device.port)
+        for section in ('Es', 'IMU'):
+            if section not in self.devices and cfg.has_section(section):
+                cfg.remove_section(section)
+        cfg.set('HyperSAS', 'sip', self.sip)
+        return cfg
+
+    def start(self):
+        for device in self.devices.values():
+            device.start()
+
+    def stop(self):
+        for device in self.devices.values():
+            device.stop()
+
+    def close(self):
+        for device in self.devices.values():
+            device.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
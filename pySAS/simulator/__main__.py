@@ -0,0 +1,31 @@
+import argparse
+import configparser
+import logging
+from time import sleep
+
+from pySAS import CFG_FILENAME
+from pySAS.simulator import Simulator, PATH_TO_SIP
+
+parser = argparse.ArgumentParser(prog='python -m pySAS.simulator',
+                                 description='Simulate pySAS instruments on pseudo-terminals.')
+parser.add_argument('--cfg', default=CFG_FILENAME, help='configuration of pySAS to adapt')
+parser.add_argument('--output', default='simulator_cfg.ini', help='configuration pointing to simulated instruments')
+parser.add_argument('--sip', default=PATH_TO_SIP, help='device file of HyperSAS and Es')
+parser.add_argument('--heading', type=float, default=45., help='heading of ship (deg)')
+parser.add_argument('--no-es', action='store_true', help='do not simulate Es')
+parser.add_argument('--no-imu', action='store_true', help='do not simulate IMU')
+args = parser.parse_args()
+
+cfg = configparser.ConfigParser()
+cfg.read(args.cfg)
+with Simulator(args.sip, args.heading, es=not args.no_es, imu=not args.no_imu) as simulator:
+    with open(args.output, 'w') as f:
+        simulator.configure(cfg).write(f)
+    for name, device in simulator.devices.items():
+        logging.info(f'{name}: {device.port}')
+    logging.info(f'Simulating, start pySAS with: python -m pySAS {args.output}')
+    try:
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        pass
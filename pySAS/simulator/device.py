@@ -0,0 +1,100 @@
+import os
+import logging
+import select
+from threading import Thread
+from time import sleep, time
+
+
+class PtyDevice:
+    """
+    Simulated serial instrument on a Linux pseudo-terminal
+    pySAS opens the slave end (port) as any serial port, the device reads and writes the master end.
+    The master end is non-blocking: bytes written while no one reads the port are dropped once the
+    pseudo-terminal buffer is full, as they would be lost on a real serial line.
+    """
+    READ_SIZE = 1024
+    SELECT_TIMEOUT = 0.1  # seconds, maximum time to notice device is stopped
+
+    def __init__(self):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self._master, self._slave = os.openpty()
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self.dropped = 0  # Number of bytes dropped as not read by pySAS
+        self.alive = False
+        self._thread = None
+
+    def start(self):
+        if not self.alive:
+            self.alive = True
+            self._thread = Thread(name=self.__class__.__name__, target=self.run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        if self.alive:
+            self.alive = False
+            self._thread.join(2)
+            if self._thread.is_alive():
+                self.__logger.error('Thread did not join.')
+
+    def close(self):
+        self.stop()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def write(self, data):
+        try:
+            n = os.write(self._master, data)
+        except BlockingIOError:
+            n = 0
+        self.dropped += len(data) - n
+
+    def read(self, timeout=SELECT_TIMEOUT):
+        """
+        :return: bytes received from pySAS (empty if none within timeout)
+        """
+        if select.select([self._master], [], [], timeout)[0]:
+            try:
+                return os.read(self._master, self.READ_SIZE)
+            except (BlockingIOError, OSError):
+                pass
+        return b''
+
+    def run(self):
+        raise NotImplementedError()
+
+
+class StreamingDevice(PtyDevice):
+    """
+    Simulated instrument continuously sending frames at a fixed rate
+    """
+
+    def __init__(self, rate):
+        """
+        :param rate: frames per second
+        """
+        super().__init__()
+        self.rate = rate
+        self.frames_sent = 0
+        self.started = float('nan')
+
+    def make_frame(self, timestamp):
+        """
+        :param timestamp: time at which frame is sent
+        :return: bytes of frame
+        """
+        raise NotImplementedError()
+
+    def run(self):
+        self.started = next_frame = time()
+        while self.alive:
+            delay = next_frame - time()
+            if delay > 0:
+                sleep(min(delay, self.SELECT_TIMEOUT))
+                continue
+            self.write(self.make_frame(next_frame))
+            self.frames_sent += 1
+            next_frame += 1 / self.rate
+            if next_frame < time() - 1:  # Fell more than a second behind (e.g. machine suspended), skip frames
+                next_frame = time()
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from math import cos, radians, sin
+
+from pySAS.simulator.device import StreamingDevice
+from pySAS.ubx import NAV_PVT, NAV_RELPOSNED, UBXDecoder, fletcher_checksum, VALID_DATE, VALID_TIME, \
+    PVT_GNSS_FIX_OK, PVT_HEAD_VEH_VALID, RELPOSNED_GNSS_FIX_OK, RELPOSNED_REL_POS_HEADING_VALID
+
+GPS_EPOCH = datetime(1980, 1, 6, tzinfo=timezone.utc)
+EARTH_RADIUS = 6371000  # m
+RELPOSNED_REL_POS_VALID = 0x04
+RELPOSNED_CARR_SOLN_FIXED = 0x10
+
+
+def pack_ubx(msg_cls, msg_id, payload):
+    """
+    :return: UBX message (prefix, class, id, length, payload, and checksum)
+    """
+    data = UBXDecoder.HEADER.pack(msg_cls, msg_id, len(payload)) + payload
+    return UBXDecoder.PREFIX + data + bytes(fletcher_checksum(data))
+
+
+class GPSSimulator(StreamingDevice):
+    """
+    Stream UBX NAV-PVT and NAV-RELPOSNED messages of a dual antenna RTK GPS (ArduSimple simpleRTK2B)
+    The ship sails at a constant speed and heading from its initial position.
+    """
+
+    def __init__(self, rate=5, latitude=44.9, longitude=-68.7, heading=45., speed=5., baseline=1.):
+        """
+        :param rate: navigation solutions per second
+        :param latitude: initial latitude (deg North)
+        :param longitude: initial longitude (deg East)
+        :param heading: heading of ship (deg)
+        :param speed: speed over ground (m/s)
+        :param baseline: distance between antennas (m)
+        """
+        super().__init__(rate)
+        self.latitude, self.longitude = latitude, longitude
+        self.heading, self.speed, self.baseline = heading, speed, baseline
+        self._previous = None
+
+    def make_frame(self, timestamp):
+        if self._previous is not None:
+            distance = self.speed * (timestamp - self._previous)
+            self.latitude += distance * cos(radians(self.heading)) / EARTH_RADIUS * 57.29577951308232
+            self.longitude += distance * sin(radians(self.heading)) / EARTH_RADIUS * 57.29577951308232 / \
+                cos(radians(self.latitude))
+        self._previous = timestamp
+        dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        itow = int((dt - GPS_EPOCH).total_seconds() * 1000) % (7 * 24 * 3600 * 1000)
+        pvt = NAV_PVT.pack(itow, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second,
+                           VALID_DATE | VALID_TIME, 20, dt.microsecond * 1000,
+                           3, PVT_GNSS_FIX_OK | PVT_HEAD_VEH_VALID, 0, 20,
+                           int(self.longitude * 1e7), int(self.latitude * 1e7), 10000, 10000, 20, 30,
+                           int(self.speed * cos(radians(self.heading)) * 1000),
+                           int(self.speed * sin(radians(self.heading)) * 1000), 0, int(self.speed * 1000),
+                           int(self.heading % 360 * 1e5), 50, 100000, 120,
+                           int(self.heading % 360 * 1e5), 0, 0)
+        n, e = self.baseline * cos(radians(self.heading)) * 100, self.baseline * sin(radians(self.heading)) * 100
+        relposned = NAV_RELPOSNED.pack(1, 0, itow, int(n), int(e), 0, int(self.baseline * 100),
+                                       int(self.heading % 360 * 1e5), 0, 0, 0, 0, 10, 10, 10, 10, 20000,
+                                       RELPOSNED_GNSS_FIX_OK | RELPOSNED_REL_POS_VALID | RELPOSNED_CARR_SOLN_FIXED |
+                                       RELPOSNED_REL_POS_HEADING_VALID)
+        return pack_ubx(0x01, 0x07, pvt) + pack_ubx(0x01, 0x3C, relposned)
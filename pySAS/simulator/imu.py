@@ -0,0 +1,33 @@
+from math import pi, sin
+from struct import pack
+
+from pySAS.simulator.device import StreamingDevice
+
+
+class IMUSimulator(StreamingDevice):
+    """
+    Stream BNO085 UART-RVC frames (100 Hz) of a ship rolling and pitching in the swell
+    """
+
+    def __init__(self, rate=100, heading=45., roll_amplitude=5., pitch_amplitude=2., swell_period=8.):
+        """
+        :param rate: frames per second
+        :param heading: yaw of ship (deg)
+        :param roll_amplitude: amplitude of roll (deg)
+        :param pitch_amplitude: amplitude of pitch (deg)
+        :param swell_period: period of roll and pitch (s)
+        """
+        super().__init__(rate)
+        self.heading = heading
+        self.roll_amplitude, self.pitch_amplitude = roll_amplitude, pitch_amplitude
+        self.swell_period = swell_period
+        self._index = 0
+
+    def make_frame(self, timestamp):
+        phase = 2 * pi * timestamp / self.swell_period
+        yaw = (self.heading + 180) % 360 - 180  # -180 to 180
+        frame = pack('<BhhhhhhBBB', self._index % 256, int(yaw * 100),
+                     int(self.pitch_amplitude * sin(phase + pi / 2) * 100), int(self.roll_amplitude * sin(phase) * 100),
+                     0, 0, 981, 0, 0, 0)
+        self._index += 1
+        return b'\xAA\xAA' + frame + bytes([sum(frame[0:15]) % 256])
@@ -0,0 +1,118 @@
+from math import copysign, sqrt
+from time import sleep, time
+
+from pySAS.simulator.device import PtyDevice
+
+
+class MDriveSimulator(PtyDevice):
+    """
+    Answer M-Code of a Lexium MDrive driving the indexing table, with trapezoidal motion profile
+    Supports move absolute (ma), print (pr) of position (p), stall (st), moving (mv) flags, velocity (v),
+    and parameters, parameters and position assignment (e.g. vm=20000, p=0), and reset (ctrl+c).
+    Echo mode (em) is emulated: commands are echoed unless em=1.
+    """
+    REGISTRATOR = b'\x08'
+    RESET = b'\x03'
+    TERMINATOR = b'\r\n'
+    # Factory parameters (echo enabled), restored on reset unless parameters were saved
+    DEFAULT_PARAMETERS = {'ee': 0, 'a': 1000000, 'd': 1000000, 'vi': 1000, 'vm': 768000, 'em': 0}
+
+    def __init__(self, reply_delay=0.005, parameters=None):
+        """
+        :param reply_delay: time for drive to process a request (seconds)
+        :param parameters: parameters saved in non-volatile memory, restored on reset (default DEFAULT_PARAMETERS)
+        """
+        super().__init__()
+        self.reply_delay = reply_delay
+        self.saved_parameters = dict(self.DEFAULT_PARAMETERS if parameters is None else parameters)
+        self.parameters = dict(self.saved_parameters)
+        self.stalled = False  # Set to simulate a stall of the motor
+        self.mute = False  # Set to simulate a drive not replying (commands are still executed)
+        self.resets = 0
+        self._start, self._target, self._started = 0, 0, 0.
+        self._profile = (0., 0., 0., 0.)  # acceleration, cruise, and deceleration times, and peak velocity
+
+    def move_to(self, target):
+        self._start, self._target, self._started = self.get_position(), target, time()
+        distance = abs(target - self._start)
+        a, d, vm = self.parameters['a'], self.parameters['d'], self.parameters['vm']
+        if vm ** 2 / (2 * a) + vm ** 2 / (2 * d) > distance:  # Triangular profile
+            vm = sqrt(2 * distance * a * d / (a + d))
+            self._profile = (vm / a, 0., vm / d, vm)
+        else:
+            self._profile = (vm / a, (distance - vm ** 2 / (2 * a) - vm ** 2 / (2 * d)) / vm, vm / d, vm)
+
+    def set_position(self, position):
+        """
+        Set position counter, motor is stopped
+        :param position: steps
+        """
+        self._start = self._target = position
+        self._profile = (0., 0., 0., 0.)
+
+    def _state(self, now=None):
+        """
+        :return: position (steps) and velocity (steps/s) of motor
+        """
+        t = (time() if now is None else now) - self._started
+        ta, tc, td, vm = self._profile
+        a, direction = self.parameters['a'], copysign(1, self._target - self._start)
+        if t < ta:
+            distance, velocity = a * t ** 2 / 2, a * t
+        elif t < ta + tc:
+            distance, velocity = vm * ta / 2 + vm * (t - ta), vm
+        elif t < ta + tc + td:
+            t = ta + tc + td - t
+            distance, velocity = abs(self._target - self._start) - vm * t / 2 * t / td, vm * t / td
+        else:
+            return self._target, 0
+        return round(self._start + direction * distance), direction * velocity
+
+    def get_position(self):
+        return self._state()[0]
+
+    def reply(self, command):
+        if command.startswith('ma '):
+            self.move_to(int(command[3:]))
+        elif command.startswith('pr '):
+            name = command[3:]
+            if name == 'p':
+                value = self.get_position()
+            elif name == 'v':
+                value = int(self._state()[1])
+            elif name == 'mv':
+                value = int(self._state()[1] != 0)
+            elif name == 'st':
+                value = int(self.stalled)
+            else:
+                value = self.parameters.get(name, 0)
+            sleep(self.reply_delay)
+            self.write(str(value).encode() + self.TERMINATOR)
+        elif '=' in command:
+            name, value = command.split('=', 1)
+            try:
+                if name.strip() == 'p':
+                    self.set_position(int(value))
+                else:
+                    self.parameters[name.strip()] = int(value)
+            except ValueError:
+                pass
+
+    def write(self, data):
+        if not self.mute:
+            super().write(data)
+
+    def run(self):
+        buffer = b''
+        while self.alive:
+            buffer += self.read()
+            *lines, buffer = buffer.split(self.TERMINATOR)
+            for line in lines:
+                if self.RESET in line:  # Reset stops motor, restores parameters, and clears position
+                    self.resets += 1
+                    self.parameters = dict(self.saved_parameters)
+                    self.set_position(0)
+                    line = line[line.rindex(self.RESET) + 1:]
+                if self.parameters.get('em') != 1:
+                    self.write(line + self.TERMINATOR)
+                self.reply(line.strip(self.REGISTRATOR).decode('latin-1'))
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from struct import pack
+
+import numpy as np
+from pySatlantic.instrument import Instrument as SatlanticParser
+
+from pySAS.simulator.device import StreamingDevice
+
+
+def load_sip(path_to_sip):
+    """
+    Load calibration of frames to simulate
+    pySatlantic extracts the sip archive next to it, so work on a copy
+    :param path_to_sip: HyperSAS device file
+    :return: pySatlantic Instrument
+    """
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        shutil.copy(path_to_sip, tmp_dir)
+        return SatlanticParser(os.path.join(tmp_dir, os.path.basename(path_to_sip)))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+class SatlanticSimulator(StreamingDevice):
+    """
+    Stream frames of Satlantic HyperOCR radiometers (fixed length binary frames) and THS (ASCII frames)
+    Each cycle sends one light frame of every radiometer followed by a THS frame,
+    every dark_every cycles the shutter closes and dark frames are sent instead.
+    Spectra are a smooth curve over the wavelength of the pixels plus Poisson noise.
+    """
+    DARK_COUNTS = 1000
+    INTEGRATION_TIME = 64  # ms
+
+    def __init__(self, calibrations, rate=2, dark_every=5, seed=None, get_compass=None):
+        """
+        :param calibrations: pySatlantic calibrations (parser.cal values) of frames to send
+        :param rate: cycles per second
+        :param dark_every: number of cycles between dark frames (0 for none)
+        :param seed: seed of random generator of noise
+        :param get_compass: function returning heading of THS (deg), default compass attribute
+        """
+        super().__init__(rate)
+        self.dark_every = dark_every
+        self.rng = np.random.default_rng(seed)
+        self.light, self.dark, self.ths = [], [], []
+        for cal in calibrations:
+            if cal.frame_header.startswith('SATTHS'):
+                self.ths.append(cal)
+            elif cal.frame_header.startswith(('SATHLD', 'SATHED')):
+                self.dark.append(cal)
+            else:
+                self.light.append(cal)
+        self.roll, self.pitch, self.compass = 0., 0., 0.
+        self.get_compass = get_compass
+        self._cycle, self._counter = 0, 0
+
+        # Signal of light frames (counts above dark)
+        self._signal = {}
+        for cal in self.light + self.dark:
+            wavelength = np.array([float(i) for t, i in zip(cal.type, cal.id) if t == cal.core_groupname])
+            self._signal[cal.frame_header] = 10000 * np.exp(-((wavelength - 550) / 200) ** 2)
+
+    def make_satlantic_frame(self, cal, timestamp, dark=False):
+        counts = self.DARK_COUNTS + self._signal[cal.frame_header] * (not dark)
+        counts = iter(np.clip(self.rng.poisson(counts), 0, 65535).tolist())
+        values = []
+        for t, i, dt, l in zip(cal.type, cal.id, cal.data_type, cal.field_length):
+            if t == cal.core_groupname:
+                values.append(next(counts))
+            elif t == 'INTTIME':
+                values.append(self.INTEGRATION_TIME)
+            elif t == 'DARK_AVE':
+                values.append(self.DARK_COUNTS)
+            elif t == 'FRAME':
+                values.append(self._counter % 256)
+            elif t == 'TIMER':
+                values.append(f'{timestamp - self.started:0{l}.2f}'[-l:].encode('ascii'))
+            elif t == 'CRLF':
+                values.append(3338)
+            elif dt in ('AS', 'AI', 'AF'):
+                values.append(b'0' * l)
+            else:
+                values.append(0)
+        frame = bytearray(cal.frame_header.encode('ascii') + pack(cal.frame_fmt, *values))
+        frame[cal.check_sum_index] = (0 - sum(frame[0:cal.check_sum_index])) % 256
+        return bytes(frame)
+
+    def make_ths_frame(self, cal, timestamp):
+        roll, pitch = self.roll + self.rng.normal(0, 0.1), self.pitch + self.rng.normal(0, 0.1)
+        compass = self.compass if self.get_compass is None else self.get_compass()
+        compass = (compass + self.rng.normal(0, 0.5)) % 360
+        return (f'{cal.frame_header},{self._counter % 1000},{timestamp - self.started:07.2f},'
+                f'$R{roll:.2f}P{pitch:.2f}T20.0X1.0Y2.0Z3.0C{compass:.1f}*00\r\n').encode('ascii')
+
+    def make_frame(self, timestamp):
+        dark = self.dark_every and self._cycle % self.dark_every == self.dark_every - 1
+        frames = [self.make_satlantic_frame(cal, timestamp, dark) for cal in (self.dark if dark else self.light)]
+        frames += [self.make_ths_frame(cal, timestamp) for cal in self.ths]
+        self._cycle += 1
+        self._counter += 1
+        return b''.join(frames)
@@ -0,0 +1,94 @@
+from collections import namedtuple
+from itertools import accumulate
+from struct import Struct
+import logging
+
+# UBX messages of NAV_ARDUSIMPLE (ubxtranslator_messages) unpacked with precompiled structures
+# Bit fields are kept as integers, flags are extracted with the masks below.
+NavPVT = namedtuple('NavPVT', ['iTOW', 'year', 'month', 'day', 'hour', 'min', 'sec', 'valid', 'tAcc', 'nano',
+                               'fixType', 'flags', 'flags2', 'numSV', 'lon', 'lat', 'height', 'hMSL', 'hAcc', 'vAcc',
+                               'velN', 'velE', 'velD', 'gSpeed', 'headMot', 'sAcc', 'headAcc', 'pDOP',
+                               'headVeh', 'magDec', 'magAcc'])
+NAV_PVT = Struct('<IHBBBBBBIiBBBBiiiiIIiiiiiIIH6xihH')
+NavRELPOSNED = namedtuple('NavRELPOSNED', ['version', 'refStationId', 'iTOW',
+                                           'relPosN', 'relPosE', 'relPosD', 'relPosLength', 'relPosHeading',
+                                           'relPosHPN', 'relPosHPE', 'relPosHPD', 'relPosHPLength',
+                                           'accN', 'accE', 'accD', 'accLength', 'accHeading', 'flags'])
+NAV_RELPOSNED = Struct('<BxHIiiiii4xbbbbIIIII4xI')
+
+# NAV-PVT valid
+VALID_DATE = 0x01
+VALID_TIME = 0x02
+# NAV-PVT flags
+PVT_GNSS_FIX_OK = 0x01
+PVT_HEAD_VEH_VALID = 0x20
+# NAV-RELPOSNED flags
+RELPOSNED_GNSS_FIX_OK = 0x01
+RELPOSNED_REL_POS_HEADING_VALID = 0x100
+
+
+def fletcher_checksum(data):
+    """
+    8-bit Fletcher checksum of UBX messages
+    :param data: class, id, length, and payload of message
+    :return: ck_a, ck_b
+    """
+    return sum(data) & 0xFF, sum(accumulate(data)) & 0xFF
+
+
+class UBXDecoder:
+    """
+    Decode UBX NAV-PVT and NAV-RELPOSNED messages from a stream of bytes.
+    Specialized alternative to ubxtranslator.core.Parser for the messages of NAV_ARDUSIMPLE.
+    """
+    PREFIX = b'\xB5\x62'
+    # (class, id): name, structure, and named tuple of message
+    MESSAGES = {(0x01, 0x07): ('PVT', NAV_PVT, NavPVT),
+                (0x01, 0x3C): ('RELPOSNED', NAV_RELPOSNED, NavRELPOSNED)}
+    HEADER = Struct('<BBH')
+
+    def __init__(self):
+        self.__logger = logging.getLogger(self.__class__.__name__)
+        self._buffer = bytearray()
+
+    def decode(self, data):
+        """
+        Decode all complete messages in data, incomplete message is kept for next call
+        :param data: bytes received from GPS
+        :return: list of (message name, message) in order received
+        """
+        buffer = self._buffer
+        buffer.extend(data)
+        messages, start = [], 0
+        while True:
+            start = buffer.find(self.PREFIX, start)
+            if start < 0:
+                del buffer[:-1]  # Keep last byte in case first byte of prefix
+                return messages
+            if len(buffer) < start + 6:
+                break
+            msg_cls, msg_id, length = self.HEADER.unpack_from(buffer, start + 2)
+            message = self.MESSAGES.get((msg_cls, msg_id))
+            if message is None:
+                self.__logger.error(f'Received unsupported message {msg_cls:x} {msg_id:x}')
+                start += 2  # Resynchronize on next prefix
+                continue
+            name, structure, nt = message
+            if length != structure.size:
+                self.__logger.error(f'{name} payload length does not match, expected {structure.size} actual {length}')
+                start += 2
+                continue
+            end = start + 8 + length
+            if len(buffer) < end:
+                break
+            if fletcher_checksum(buffer[start + 2:end - 2]) != (buffer[end - 2], buffer[end - 1]):
+                self.__logger.error(f'{name} checksum mismatch')
+                start += 2
+                continue
+            messages.append((name, nt._make(structure.unpack_from(buffer, start + 6))))
+            start = end
+        del buffer[:start]
+        return messages
+
+    def clear(self):
+        self._buffer.clear()
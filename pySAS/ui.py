@@ -83,6 +83,8 @@ sidebar = html.Div([
                 dbc.Row([
                     dbc.Label(runner.core_instrument_name, html_for="hypersas_switch", width=6),
                     dbc.Col([
+                        dbc.Badge('Queue', id='data_logger_flag', color='warning', pill=True,
+                                  style={'lineHeight': 0.72}, className='d-none'),
                         dbc.Switch(id="hypersas_switch", value=False, className='mt-2 ms-1 d-inline-block')],
                             width=6, className="text-end"),
                 ], className="mb-3"),
@@ -299,6 +301,19 @@ def get_gps_flags(_):
     return hdg + fix + dt
 
 
+@app.callback([Output('data_logger_flag', 'children'), Output('data_logger_flag', 'color'),
+               Output('data_logger_flag', 'className')],
+              [Input('status_refresh_interval', 'n_intervals')])
+def get_data_logger_flag(_):
+    # Show disk stalls: frames dropped or queue of data logger filling up
+    stats = runner.data_logger.get_statistics()
+    if stats['dropped_frames']:
+        return f"Dropped {stats['dropped_frames']}", 'danger', 'mt-2 me-2'
+    if stats['max_queue_size'] and stats['queue_high_water'] > stats['max_queue_size'] / 2:
+        return f"Queue {stats['queue_high_water'] / stats['max_queue_size']:.0%}", 'warning', 'mt-2 me-2'
+    return no_update, no_update, 'd-none'
+
+
 @app.callback(Output('no_output', 'children', allow_duplicate=True),
               Input('tower_switch', 'value'),
               prevent_initial_call=True)
@@ -316,7 +331,7 @@ def set_tower_switch(switch):
             runner.indexing_table.start()
         else:
             logger.debug('set_tower_switch: stop')
-            runner.indexing_table.stop()
+            runner.indexing_table.stop(wait=False)
 
 
 @app.callback(Output('tower_orientation', 'value', allow_duplicate=True),
@@ -961,7 +976,7 @@ def get_fig_system_orientation(_0, _1, _2):
         sun = runner.sun_azimuth
     # Get HyperSAS Heading
     ths = float('nan')
-    if timestamp - runner.hypersas.packet_THS_parsed < runner.DATA_EXPIRED_DELAY:
+    if timestamp - runner.hypersas.channels['THS'].parsed < runner.DATA_EXPIRED_DELAY:
         if isnan(runner.gps.latitude):
             ths = runner.hypersas.compass
         else:
@@ -1043,46 +1058,36 @@ def get_fig_spectrum(_, cache):
         cache = [False] * 3
         for id in range(3):
             fig['data'][id]['visible'] = False
-    # Parse data
+    # Get latest spectra (parsed in background or on request)
     timestamp = time()
-    runner.hypersas.parse_packets()
-    if runner.es:
-        runner.es.parse_packets()
+    hypersas = runner.hypersas.get_spectra()
+    es = runner.es.get_spectra() if runner.es else hypersas
+    es_wavelength = (runner.es if runner.es else runner.hypersas).channels['Es'].wavelength
     # Update data
-    if runner.hypersas.Lt is not None and timestamp - runner.hypersas.packet_Lt_parsed < runner.DATA_EXPIRED_DELAY:
+    if hypersas.Lt is not None and timestamp - hypersas.Lt_parsed < runner.DATA_EXPIRED_DELAY:
         fig['data'][lt_id]['visible'] = True
         if cache[lt_id] is False:
-            fig['data'][lt_id]['x'] = runner.hypersas.Lt_wavelength
+            fig['data'][lt_id]['x'] = runner.hypersas.channels['Lt'].wavelength
             cache[lt_id] = True
-        fig['data'][lt_id]['y'] = runner.hypersas.Lt
+        fig['data'][lt_id]['y'] = hypersas.Lt
     else:
         fig['data'][lt_id]['visible'] = False
-    if runner.hypersas.Li is not None and timestamp - runner.hypersas.packet_Li_parsed < runner.DATA_EXPIRED_DELAY:
+    if hypersas.Li is not None and timestamp - hypersas.Li_parsed < runner.DATA_EXPIRED_DELAY:
         fig['data'][li_id]['visible'] = True
         if cache[li_id] is False:
-            fig['data'][li_id]['x'] = runner.hypersas.Li_wavelength
+            fig['data'][li_id]['x'] = runner.hypersas.channels['Li'].wavelength
             cache[li_id] = True
-        fig['data'][li_id]['y'] = runner.hypersas.Li
+        fig['data'][li_id]['y'] = hypersas.Li
     else:
         fig['data'][li_id]['visible'] = False
-    if runner.es:
-        if runner.es.Es is not None and timestamp - runner.es.packet_Es_parsed < runner.DATA_EXPIRED_DELAY:
-            fig['data'][es_id]['visible'] = True
-            if cache[es_id] is False:
-                fig['data'][es_id]['x'] = runner.es.Es_wavelength
-                cache[es_id] = True
-            fig['data'][es_id]['y'] = runner.es.Es
-        else:
-            fig['data'][es_id]['visible'] = False
+    if es.Es is not None and timestamp - es.Es_parsed < runner.DATA_EXPIRED_DELAY:
+        fig['data'][es_id]['visible'] = True
+        if cache[es_id] is False:
+            fig['data'][es_id]['x'] = es_wavelength
+            cache[es_id] = True
+        fig['data'][es_id]['y'] = es.Es
     else:
-        if runner.hypersas.Es is not None and timestamp - runner.hypersas.packet_Es_parsed < runner.DATA_EXPIRED_DELAY:
-            fig['data'][es_id]['visible'] = True
-            if cache[es_id] is False:
-                fig['data'][es_id]['x'] = runner.hypersas.Es_wavelength
-                cache[es_id] = True
-            fig['data'][es_id]['y'] = runner.hypersas.Es
-        else:
-            fig['data'][es_id]['visible'] = False
+        fig['data'][es_id]['visible'] = False
     return fig, cache
 
 
@@ -1150,9 +1155,9 @@ def get_fig_timeseries(_, cache):
             fig['data'][id]['visible'] = False
 
     # Get THS Heading
-    set_patch(runner.hypersas.packet_THS_parsed, runner.hypersas._packet_THS_received,
+    set_patch(runner.hypersas.channels['THS'].parsed, runner.hypersas.channels['THS'].received,
               runner.hypersas.pitch, ths_pitch_id)
-    set_patch(runner.hypersas.packet_THS_parsed, runner.hypersas._packet_THS_received,
+    set_patch(runner.hypersas.channels['THS'].parsed, runner.hypersas.channels['THS'].received,
               runner.hypersas.roll, ths_roll_id)
     # Get IMU Heading
     if runner.imu:
@@ -1161,16 +1166,11 @@ def get_fig_timeseries(_, cache):
         set_patch(runner.imu.packet_received, runner.imu.packet_received,
                   runner.imu.roll, imu_roll_id)
     # Get Es(490)
-    if runner.es:
-        if runner.es.Es is not None:
-            wl_id = np.argmin(abs(np.array(runner.es.Es_wavelength) - 490))
-            set_patch(runner.es.packet_Es_parsed, runner.es._packet_Es_received,
-                      runner.es.Es[wl_id], es_490_id)
-    else:
-        if runner.hypersas.Es is not None:
-            wl_id = np.argmin(abs(np.array(runner.hypersas.Es_wavelength) - 490))
-            set_patch(runner.hypersas.packet_Es_parsed, runner.hypersas._packet_Es_received,
-                      runner.hypersas.Es[wl_id], es_490_id)
+    es_sensor = runner.es if runner.es else runner.hypersas
+    es = es_sensor.spectra
+    if es.Es is not None:
+        wl_id = np.argmin(abs(np.array(es_sensor.channels['Es'].wavelength) - 490))
+        set_patch(es.Es_parsed, es_sensor.channels['Es'].received, es.Es[wl_id], es_490_id)
     return fig, (count, last_timestamp)
 
 
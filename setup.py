@@ -24,7 +24,7 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/doizuc/pySAS/",
-    packages=['pySAS'],
+    packages=['pySAS', 'pySAS.simulator'],
     package_dir={'pySAS': 'pySAS'},
     package_data={'pySAS': ['assets/*.css', 'assets/*.map']},
     install_requires=['dash>=1.9.1', 'dash-bootstrap-components', 'geomag', 'gpiozero',
@@ -0,0 +1,69 @@
+"""
+Benchmark finding HyperSAS frames in a stream of serial data.
+    before: pySatlantic find_frame on a bytearray (HyperOCR.data_received up to v1.1.4)
+    after: FrameBuffer with FrameMatcher compiled from the calibration
+
+Usage:
+    python -m tests.benchmark_frame_matcher [--cal HyperSAS.sip] [--chunk 256] [file.raw]
+Without a raw file, a stream of synthetic Lt, Li, Es, darks, and THS frames is generated from the calibration.
+"""
+import argparse
+import sys
+from time import perf_counter
+
+parser = argparse.ArgumentParser(description='Benchmark frame finder on replayed raw file.')
+parser.add_argument('raw', nargs='?', help='raw file recorded by pySAS (synthetic stream if absent)')
+parser.add_argument('--cal', help='calibration file (.sip), default HyperSAS_Es_20200212.sip')
+parser.add_argument('--chunk', type=int, default=256, help='number of bytes per serial read')
+args = parser.parse_args()
+sys.argv = sys.argv[:1]  # pySAS reads configuration file from command line arguments
+
+from tests.helpers import load_parser, make_frame, THS_FRAME, PATH_TO_SIP
+from pySAS.interfaces import FrameBuffer, FrameMatcher, HyperOCR
+
+
+def find_frame_before(stream, parser, chunk):
+    n, buffer = 0, bytearray()
+    for i in range(0, len(stream), chunk):
+        buffer.extend(stream[i:i + chunk])
+        packet = True
+        while packet:
+            packet, header, buffer, unknown_bytes = parser.find_frame(buffer)
+            if packet:
+                n += 1
+        if len(buffer) > HyperOCR.MAX_BUFFER_LENGTH:
+            buffer = bytearray()
+    return n
+
+
+def find_frame_after(stream, parser, chunk):
+    n, buffer, matcher = 0, FrameBuffer(HyperOCR.MAX_BUFFER_LENGTH), FrameMatcher(parser)
+    for i in range(0, len(stream), chunk):
+        buffer.extend(stream[i:i + chunk])
+        while True:
+            packet, header, unknown_bytes = buffer.next_frame(matcher)
+            if packet is not None:
+                n += 1
+            elif unknown_bytes is None:
+                break
+        buffer.trim(matcher)
+    return n
+
+
+if __name__ == '__main__':
+    parser = load_parser(args.cal or PATH_TO_SIP)  # Loaded from copy, pySatlantic extracts sip next to it
+    if args.raw:
+        with open(args.raw, 'rb') as f:
+            stream = f.read()
+    else:
+        # Typical HyperSAS sequence: light frames, dark frame every 5 light frames, THS at ~ 2 Hz
+        light = [make_frame(parser.cal[h], 1000 + i) for i, h in enumerate(parser.cal) if h[:6] in ('SATHSL', 'SATHSE')]
+        dark = [make_frame(parser.cal[h], 900) for h in parser.cal if h[:6] in ('SATHLD', 'SATHED')]
+        stream = b''.join(b''.join(light) + THS_FRAME + (b''.join(dark) if i % 5 == 0 else b'')
+                          for i in range(2000))
+    print(f'Stream: {len(stream) / 1e6:.1f} MB, read by chunks of {args.chunk} bytes')
+    for name, fun in (('before', find_frame_before), ('after', find_frame_after)):
+        tic = perf_counter()
+        n = fun(stream, parser, args.chunk)
+        toc = perf_counter() - tic
+        print(f'{name:>6}: {n} frames in {toc:.3f} s, {n / toc:,.0f} frames/s, {len(stream) / toc / 1e6:.1f} MB/s')
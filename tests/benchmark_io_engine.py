@@ -0,0 +1,83 @@
+"""
+Benchmark reading the serial ports of all sensors: CPU usage and timestamp jitter.
+    thread: one thread per sensor blocking on its serial port (default)
+    selector: SelectorEngine reading all serial ports from a single thread
+
+Sensors are fed through pseudo-terminals at typical rates: IMU at 100 Hz, GPS PVT and RELPOSNED at 5 Hz,
+HyperSAS (Lt, Li, THS, darks) and Es frames at ~7 Hz. Latency is measured on IMU frames, from write to timestamp.
+
+Usage:
+    python -m tests.benchmark_io_engine [--duration 10]
+"""
+import argparse
+import os
+import sys
+import threading
+from time import perf_counter, process_time, sleep, time
+
+parser = argparse.ArgumentParser(description='Benchmark thread per sensor against selector I/O engine.')
+parser.add_argument('--duration', type=float, default=10, help='duration of each run (s)')
+args = parser.parse_args()
+sys.argv = sys.argv[:1]  # pySAS reads configuration file from command line arguments
+
+import numpy as np
+from pySAS.interfaces import GPS, IMU, HyperSAS, Es
+from pySAS.io_engine import SelectorEngine
+from tests.helpers import FakeLogger, load_parser, make_cfg, make_frame, make_imu_frame, make_ubx_frames, THS_FRAME
+
+
+def feed(masters, hypersas_frames, es_frame, duration, sent):
+    pvt, relposned = make_ubx_frames()
+    tick, t0 = 0, perf_counter()
+    while perf_counter() - t0 < duration:
+        sent[tick % 256] = time()
+        os.write(masters['IMU'], make_imu_frame(tick))
+        if tick % 20 == 0:
+            os.write(masters['GPS'], pvt + relposned)
+        if tick % 14 == 0:
+            os.write(masters['HyperSAS'], hypersas_frames[(tick // 14) % len(hypersas_frames)])
+            os.write(masters['Es'], es_frame)
+        tick += 1
+        sleep(max(0, t0 + tick / 100 - perf_counter()))
+
+
+def run(mode, cal, duration):
+    ptys = {name: os.openpty() for name in ('GPS', 'IMU', 'HyperSAS', 'Es')}
+    sensors = {'GPS': GPS(make_cfg('GPS', os.ttyname(ptys['GPS'][1])), FakeLogger()),
+               'IMU': IMU(make_cfg('IMU', os.ttyname(ptys['IMU'][1])), FakeLogger()),
+               'HyperSAS': HyperSAS(make_cfg('HyperSAS', os.ttyname(ptys['HyperSAS'][1])), FakeLogger(), parser=cal),
+               'Es': Es(make_cfg('Es', os.ttyname(ptys['Es'][1])), FakeLogger(), parser=cal)}
+    # Record IMU timestamps
+    sent, latency = dict(), []
+    handle_frames = sensors['IMU'].handle_frames
+
+    def record(frames, timestamp):
+        handle_frames(frames, timestamp)
+        if sensors['IMU'].counter in sent:
+            latency.append(timestamp - sent[sensors['IMU'].counter])
+    sensors['IMU'].handle_frames = record
+    engine = SelectorEngine() if mode == 'selector' else None
+    for sensor in sensors.values():
+        sensor.io_engine = engine
+        sensor.start()
+    n_threads = threading.active_count()
+    hypersas_frames = [make_frame(cal.cal[h]) for h in cal.cal if h[:6] in ('SATHSL', 'SATHLD')]
+    hypersas_frames = [f + (THS_FRAME if i == 0 else b'') for i, f in enumerate(hypersas_frames)]
+    tic_cpu, tic = process_time(), perf_counter()
+    feed({k: v[0] for k, v in ptys.items()}, hypersas_frames, make_frame(cal.cal['SATHSE0187']), duration, sent)
+    cpu, wall = process_time() - tic_cpu, perf_counter() - tic
+    for sensor in sensors.values():
+        sensor.stop()
+    for master, slave in ptys.values():
+        os.close(master)
+        os.close(slave)
+    delay = np.array(latency[10:]) * 1000  # Skip first frames (synchronization)
+    print(f'{mode:>8}: {n_threads} threads, CPU {cpu / wall * 100:5.1f} % (feeder included), '
+          f'latency {np.mean(delay):.3f} ms, jitter (std) {np.std(delay):.3f} ms, '
+          f'p99 {np.percentile(delay, 99):.3f} ms, {len(delay)} IMU frames')
+
+
+if __name__ == '__main__':
+    cal = load_parser()
+    for mode in ('thread', 'selector'):
+        run(mode, cal, args.duration)
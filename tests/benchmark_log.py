@@ -0,0 +1,38 @@
+"""
+Benchmark packing of timestamps in Satlantic format (appended to every frame logged).
+    strftime: previous pack_timestamp_satlantic formatting date and time of each frame with strftime
+    SatlanticTimestampEncoder: date and time cached per second, only milliseconds added (SatlanticLogger)
+    pack_timestamps_satlantic: all timestamps at once with integer calendar math (prepSAS)
+
+Usage:
+    python -m tests.benchmark_log [--frames 100000] [--rate 100]
+"""
+import argparse
+import sys
+from time import perf_counter, time
+
+parser = argparse.ArgumentParser(description='Benchmark Satlantic timestamp encoders.')
+parser.add_argument('--frames', type=int, default=100000, help='number of timestamps packed')
+parser.add_argument('--rate', type=float, default=100, help='frames per second (IMU: 100 Hz)')
+args = parser.parse_args()
+sys.argv = sys.argv[:1]  # pySAS reads configuration file from command line arguments
+
+import numpy as np
+from pySAS.log import SatlanticTimestampEncoder, pack_timestamps_satlantic
+from tests.helpers import pack_timestamp_satlantic_strftime
+
+
+def run(name, pack, timestamps):
+    tic = perf_counter()
+    packed = pack(timestamps)
+    elapsed = perf_counter() - tic
+    print(f'{name:>26}: {len(timestamps)} timestamps in {elapsed:.3f} s, {elapsed / len(timestamps) * 1e6:.2f} us/frame')
+    return packed
+
+
+if __name__ == '__main__':
+    timestamps = time() + np.arange(args.frames) / args.rate
+    reference = run('strftime', lambda ts: [pack_timestamp_satlantic_strftime(t) for t in ts], timestamps.tolist())
+    encoder = SatlanticTimestampEncoder()
+    assert run('SatlanticTimestampEncoder', lambda ts: [encoder(t) for t in ts], timestamps.tolist()) == reference
+    assert run('pack_timestamps_satlantic', pack_timestamps_satlantic, timestamps) == reference
@@ -0,0 +1,41 @@
+"""
+Benchmark maximum throughput of the acquisition and logging pipeline by replaying capture files
+as fast as possible into the instruments (decoding, parsing, and logging with SatlanticLogger).
+Captures are recorded with capture = True in the configuration (see pySAS.capture).
+
+Usage:
+    python benchmark_replay.py [--sip HyperSAS.sip] [--speed 0] capture_file [capture_file ...]
+"""
+import argparse
+import sys
+import tempfile
+from configparser import ConfigParser
+
+parser = argparse.ArgumentParser(description='Replay capture files into pySAS instruments.')
+parser.add_argument('captures', nargs='+', help='capture files (instrument is read from file)')
+parser.add_argument('--sip', type=str, default=None, help='device file of HyperSAS and Es')
+parser.add_argument('--speed', type=float, default=0, help='replay speed (0 for as fast as possible)')
+args = parser.parse_args()
+sys.argv = sys.argv[:1]  # pySAS reads configuration file from command line arguments
+
+from pySAS import interfaces
+from pySAS.capture import CaptureReader, replay
+from pySAS.log import SatlanticLogger
+
+
+if __name__ == '__main__':
+    path = tempfile.mkdtemp()
+    data_logger = SatlanticLogger({'path': path, 'filename_prefix': 'benchmark_replay'})
+    for filename in args.captures:
+        name = CaptureReader(filename).name
+        cfg = ConfigParser()
+        cfg.read_dict({name: {'port': f'/dev/null_benchmark_replay_{filename}', 'baudrate': '57600'}})
+        if args.sip:
+            cfg.set(name, 'sip', args.sip)
+        instrument = getattr(interfaces, name)(cfg, data_logger)
+        stats = replay(instrument, filename, args.speed or None)
+        print(f'{name:>8}: {stats.bytes / 1e6:.1f} MB in {stats.chunks} chunks, '
+              f'captured in {stats.duration:.1f} s, replayed in {stats.elapsed:.2f} s '
+              f'({stats.bytes / stats.elapsed / 1e6:.1f} MB/s, x{stats.duration / stats.elapsed:.0f})')
+    data_logger.close()
+    print(f'Data logged in {path}')
@@ -0,0 +1,70 @@
+"""
+Benchmark decoding of UBX NAV-PVT and NAV-RELPOSNED messages.
+    ubxtranslator: generic parser reading from the stream (previous GPS.run)
+    UBXDecoder: precompiled structures decoding chunks of bytes (GPS.data_received)
+Both read the same attributes of the messages (as done by GPS.handle_packet).
+
+Usage:
+    python -m tests.benchmark_ubx [--messages 2000] [--file recorded_stream.ubx]
+"""
+import argparse
+import io
+import sys
+from time import perf_counter
+
+parser = argparse.ArgumentParser(description='Benchmark ubxtranslator against UBXDecoder.')
+parser.add_argument('--messages', type=int, default=2000, help='number of PVT and RELPOSNED pairs generated')
+parser.add_argument('--file', type=str, default=None, help='recorded UBX stream (replace generated stream)')
+args = parser.parse_args()
+sys.argv = sys.argv[:1]  # pySAS reads configuration file from command line arguments
+
+from ubxtranslator.core import Parser as UBXParser
+from pySAS.interfaces import GPS
+from pySAS.ubx import UBXDecoder, VALID_DATE, VALID_TIME, PVT_GNSS_FIX_OK, PVT_HEAD_VEH_VALID, \
+    RELPOSNED_REL_POS_HEADING_VALID
+from pySAS.ubxtranslator_messages import NAV_ARDUSIMPLE
+from tests.helpers import FakeLogger, make_cfg, make_ubx_stream
+
+
+def run_ubxtranslator(stream, gps):
+    parser, length, stream = UBXParser([NAV_ARDUSIMPLE]), len(stream), io.BytesIO(stream)
+    n, tic = 0, perf_counter()
+    while stream.tell() < length:  # Parser would wait for prefix forever at end of stream
+        _, name, msg = parser.receive_from(stream)
+        if name == 'PVT':
+            gps.latitude, gps.longitude, gps.heading_motion = msg.lat / 1e7, msg.lon / 1e7, msg.headMot / 1e5
+            gps.datetime_valid = bool(msg.valid.validDate) and bool(msg.valid.validTime)
+            gps.fix_ok, gps.heading_vehicle_valid = bool(msg.flags.gnssFixOK), bool(msg.flags.headVehValid)
+        else:
+            gps.heading, gps.heading_valid = msg.relPosHeading / 1e5, bool(msg.flags.relPosHeadingValid)
+        n += 1
+    return n, perf_counter() - tic
+
+
+def run_decoder(stream, gps, chunk=4096):
+    decoder = UBXDecoder()
+    n, tic = 0, perf_counter()
+    for i in range(0, len(stream), chunk):
+        for name, msg in decoder.decode(stream[i:i + chunk]):
+            if name == 'PVT':
+                gps.latitude, gps.longitude, gps.heading_motion = msg.lat / 1e7, msg.lon / 1e7, msg.headMot / 1e5
+                gps.datetime_valid = msg.valid & (VALID_DATE | VALID_TIME) == VALID_DATE | VALID_TIME
+                gps.fix_ok, gps.heading_vehicle_valid = bool(msg.flags & PVT_GNSS_FIX_OK), \
+                    bool(msg.flags & PVT_HEAD_VEH_VALID)
+            else:
+                gps.heading, gps.heading_valid = msg.relPosHeading / 1e5, \
+                    bool(msg.flags & RELPOSNED_REL_POS_HEADING_VALID)
+            n += 1
+    return n, perf_counter() - tic
+
+
+if __name__ == '__main__':
+    if args.file:
+        with open(args.file, 'rb') as f:
+            stream = f.read()
+    else:
+        stream = make_ubx_stream(args.messages)
+    gps = GPS(make_cfg('GPS', '/dev/null_benchmark_ubx'), FakeLogger())
+    for name, run in (('ubxtranslator', run_ubxtranslator), ('UBXDecoder', run_decoder)):
+        n, elapsed = run(stream, gps)
+        print(f'{name:>14}: {n} messages in {elapsed:.3f} s, {elapsed / n * 1e6:.1f} us/message')
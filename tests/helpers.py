@@ -0,0 +1,108 @@
+"""
+Helpers shared by tests and benchmarks: frames of each instrument, calibration, and stubs
+"""
+import os
+import random
+import shutil
+import tempfile
+from configparser import ConfigParser
+from struct import pack
+from time import gmtime, strftime
+
+from pySatlantic.instrument import Instrument as SatlanticParser
+from ubxtranslator.core import Parser as UBXParser
+
+from pySAS.ubxtranslator_messages import NAV_ARDUSIMPLE
+
+
+PATH_TO_SIP = os.path.join(os.path.dirname(__file__), '..', 'pySAS', 'calibration_files', 'HyperSAS_Es_20200212.sip')
+
+
+def load_parser(path_to_sip=PATH_TO_SIP):
+    # pySatlantic extracts the sip archive next to it, so work on a copy
+    tmp_dir = tempfile.mkdtemp()
+    shutil.copy(path_to_sip, tmp_dir)
+    parser = SatlanticParser(os.path.join(tmp_dir, os.path.basename(path_to_sip)))
+    shutil.rmtree(tmp_dir)
+    return parser
+
+
+def make_frame(cal, counts=1000):
+    # Build fixed length frame with all binary fields set to counts
+    values = []
+    for t, l in zip(cal.data_type, cal.field_length):
+        if t in ('AS', 'AI', 'AF'):
+            values.append(b'0' * l)
+        else:
+            values.append(counts if l > 1 else 0)
+    values[-1] = 3338  # CRLF terminator
+    frame = bytearray(cal.frame_header.encode('ascii') + pack(cal.frame_fmt, *values))
+    frame[cal.check_sum_index] = (0 - sum(frame[0:cal.check_sum_index])) % 256
+    return bytes(frame)
+
+
+THS_FRAME = b'SATTHS0009,100,0012.34,$R1.00P-2.00T20.0X1.0Y2.0Z3.0C45.0*00\r\n'
+
+
+class FakeLogger:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, data, timestamp):
+        self.frames.append(data)
+
+    def close(self):
+        pass
+
+
+def make_imu_frame(index, yaw=0, pitch=0, roll=0):
+    # BNO085 UART-RVC frame
+    frame = pack('<BhhhhhhBBB', index % 256, int(yaw * 100), int(pitch * 100), int(roll * 100), 0, 0, 981, 0, 0, 0)
+    return b'\xAA\xAA' + frame + bytes([sum(frame[0:15]) % 256])
+
+
+def make_ubx_frames():
+    parser = UBXParser([NAV_ARDUSIMPLE])
+    pvt = parser.prepare_msg('NAV', 'PVT')
+    pvt.update({'year': 2024, 'month': 5, 'day': 1, 'hour': 12, 'lat': 445000000, 'lon': -685000000,
+                'hMSL': 10000, 'headMot': 9000000})
+    relposned = parser.prepare_msg('NAV', 'RELPOSNED')
+    relposned['relPosHeading'] = 18000000
+    return parser._pack_for_transfer(pvt), parser._pack_for_transfer(relposned)
+
+
+def make_cfg(section, port):
+    cfg = ConfigParser()
+    cfg.read_dict({section: {'port': port, 'baudrate': '57600', 'timeout': '0.2'}})
+    return cfg
+
+
+def make_ubx_stream(n, seed=0):
+    """Stream of n pairs of NAV-PVT and NAV-RELPOSNED messages with random content"""
+    rng = random.Random(seed)
+    parser = UBXParser([NAV_ARDUSIMPLE])
+    stream = bytearray()
+    for _ in range(n):
+        for name in ('PVT', 'RELPOSNED'):
+            msg = parser.prepare_msg('NAV', name)
+            for k, v in msg.items():
+                if isinstance(v, dict):
+                    msg[k] = {f: rng.randint(0, 1) for f in v}
+                elif not k.startswith('_'):
+                    msg[k] = rng.randint(0, 127)
+            if name == 'PVT':
+                msg.update({'year': 2024, 'month': 5, 'day': 1, 'hour': rng.randint(0, 23), 'min': rng.randint(0, 59),
+                            'sec': rng.randint(0, 59), 'lat': rng.randint(-900000000, 900000000),
+                            'lon': rng.randint(-1800000000, 1800000000), 'headMot': rng.randint(0, 36000000),
+                            'nano': rng.randint(-1000000, 999999999)})
+            else:
+                msg.update({'relPosHeading': rng.randint(0, 36000000), 'relPosN': rng.randint(-10000, 10000)})
+            stream += parser._pack_for_transfer(msg)
+    return bytes(stream)
+
+
+def pack_timestamp_satlantic_strftime(timestamp):
+    # Reference implementation formatting date and time with strftime
+    s, ms = divmod(timestamp, 1)
+    return pack('!ii', int(strftime('%Y%j', gmtime(s))),
+                int('{}{:03d}'.format(strftime('%H%M%S', gmtime(s)), int(ms * 1000))))[1:]
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import unittest
+from configparser import ConfigParser
+from time import perf_counter
+
+from pySAS.interfaces import IndexingTable, IMU
+from pySAS.simulator import MDriveSimulator
+from tests.helpers import FakeLogger, make_imu_frame
+
+
+class TestIndexingTableAsync(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.drive = MDriveSimulator(parameters=IndexingTable.CONFIGURATION)
+        cls.drive.start()
+        cfg = ConfigParser()
+        cfg.read_dict({'IndexingTable': {'port': cls.drive.port, 'baudrate': '9600', 'timeout': '1'}})
+        cls.indexing_table = IndexingTable(cfg)
+        cls.indexing_table.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.drive.mute = False
+        cls.indexing_table.stop()
+        cls.drive.close()
+
+    def test_commands(self):
+        async def run():
+            self.assertTrue(await self.indexing_table.set_position_async(30, check_stall_flag=True))
+            tic = perf_counter()
+            position, stalled = await asyncio.gather(self.indexing_table.get_position_async(),
+                                                     self.indexing_table.get_stall_flag_async())
+            return position, stalled, perf_counter() - tic
+        position, stalled, elapsed = asyncio.run(run())
+        self.assertAlmostEqual(position, 30, places=2)
+        self.assertFalse(stalled)
+        # Both replies are read as soon as received instead of waiting COMMAND_EXECUTION_TIME for each
+        self.assertLess(elapsed, 2 * IndexingTable.COMMAND_EXECUTION_TIME)
+        # Synchronous interface is still available
+        self.assertAlmostEqual(self.indexing_table.get_position(), 30, places=2)
+
+    def test_no_reply(self):
+        self.drive.mute = True
+        try:
+            tic = perf_counter()
+            position = asyncio.run(self.indexing_table.get_position_async())
+            elapsed = perf_counter() - tic
+        finally:
+            self.drive.mute = False
+        self.assertTrue(position != position)  # nan
+        self.assertAlmostEqual(elapsed, IndexingTable.REPLY_TIMEOUT, delta=0.1)
+
+
+class TestSensorAsync(unittest.TestCase):
+
+    def test_start_stop(self):
+        master, slave = os.openpty()
+        cfg = ConfigParser()
+        cfg.read_dict({'IMU': {'port': os.ttyname(slave), 'baudrate': '115200'}})
+        imu = IMU(cfg, FakeLogger())
+
+        async def run():
+            await imu.start_async()
+            self.assertTrue(imu.alive)
+            os.write(master, make_imu_frame(1, yaw=45))
+            for _ in range(100):
+                if imu.counter == 1:
+                    break
+                await asyncio.sleep(0.01)
+            await imu.stop_async()
+        try:
+            asyncio.run(run())
+        finally:
+            os.close(master)
+            os.close(slave)
+        self.assertAlmostEqual(imu.yaw, 45)
+        self.assertFalse(imu.alive)
+        self.assertIsNone(imu._task)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from pySatlantic.instrument import FrameLengthError
+
+from pySAS.calibration import CompiledCalibration, compile_calibrations
+from tests.helpers import load_parser, make_frame, PATH_TO_SIP, THS_FRAME
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'prepSAS'))
+from prepSAS import Converter
+
+
+class TestCompiledCalibration(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parser = load_parser()
+        cls.compiled = compile_calibrations(cls.parser)
+
+    def test_compiled_frames(self):
+        # Spectral frames are compiled, THS (variable length) is left to pySatlantic
+        self.assertEqual(sorted(self.compiled), sorted(h for h in self.parser.cal if h[:6] != 'SATTHS'))
+
+    def test_decode_matches_pysatlantic(self):
+        for header, cal in self.compiled.items():
+            frame = make_frame(self.parser.cal[header], 1234)
+            data, _ = self.parser.parse_frame(frame)
+            np.testing.assert_allclose(cal.decode(frame), data[cal.groupname])
+            np.testing.assert_array_equal(cal.wavelength, [float(self.parser.cal[header].id[i])
+                                                           for i in self.parser.cal[header].core_variables])
+
+    def test_decode_many(self):
+        cal = self.compiled['SATHSE0187']
+        frames = [make_frame(self.parser.cal['SATHSE0187'], c) for c in (900, 1000, 1100)]
+        values = cal.decode_many(frames)
+        self.assertEqual(values.shape, (3, len(cal.wavelength)))
+        for frame, v in zip(frames, values):
+            np.testing.assert_allclose(v, cal.decode(frame))
+        np.testing.assert_allclose(cal.decode_many(b''.join(frames)), values)
+
+    def test_frame_length_error(self):
+        cal = self.compiled['SATHSL0250']
+        frame = make_frame(self.parser.cal['SATHSL0250'])
+        with self.assertRaises(FrameLengthError):
+            cal.decode(frame[:-1])
+        with self.assertRaises(FrameLengthError):
+            cal.decode_many(frame + frame[:10])
+
+
+class TestConverterCalibration(unittest.TestCase):
+
+    def test_calibrate_sat(self):
+        tmp_dir = tempfile.mkdtemp()  # pySatlantic extracts the sip archive next to it
+        try:
+            shutil.copy(PATH_TO_SIP, tmp_dir)
+            converter = Converter(os.path.join(tmp_dir, os.path.basename(PATH_TO_SIP)),
+                                  os.path.join(os.path.dirname(__file__), '..', 'pySAS', 'pysas_cfg.ini'))
+        finally:
+            shutil.rmtree(tmp_dir)
+        frames = [(b'SATHSL0250', make_frame(converter.parser.cal['SATHSL0250'], c)) for c in (900, 1000)] + \
+                 [(b'SATTHS0009', THS_FRAME), (b'SATHED0187', make_frame(converter.parser.cal['SATHED0187'], 950))]
+        data = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=len(frames), freq='s', tz='UTC'),
+                             'header': [h for h, _ in frames], 'frame': [f for _, f in frames]})
+        calibrated = converter.calibrate_sat(data)
+        self.assertEqual(sorted(calibrated), ['SATHED0187', 'SATHSL0250'])  # THS isn't a spectral frame
+        self.assertEqual(list(calibrated['SATHSL0250'].index), [0, 1])
+        for i, (header, frame) in enumerate(frames):
+            if header in (b'SATHSL0250', b'SATHED0187'):
+                df = calibrated[header.decode('ascii')]
+                expected, _ = converter.parser.parse_frame(frame)
+                np.testing.assert_allclose(df.loc[i].iloc[1:].to_numpy(dtype=float),
+                                           expected[converter.compiled_cal[header.decode('ascii')].groupname])
+                self.assertEqual(df.loc[i, 'timestamp'], data.timestamp[i])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from configparser import ConfigParser
+from math import isnan
+from time import sleep
+
+from pySAS.capture import CaptureReader, CaptureWriter, ReplaySerial, replay, RX, TX
+from pySAS.interfaces import GPS, IndexingTable
+from pySAS.simulator import GPSSimulator, MDriveSimulator
+from tests.helpers import FakeLogger
+
+
+def make_cfg(section, port, path):
+    cfg = ConfigParser()
+    cfg.read_dict({section: {'port': port, 'baudrate': '115200', 'timeout': '0.2',
+                             'capture': 'True', 'path_to_captures': path}})
+    return cfg
+
+
+class TestCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_file(self):
+        filename = os.path.join(self.path, 'test.cap')
+        writer = CaptureWriter(filename, 'GPS')
+        writer.write(b'\xb5\x62abc', 1.5)
+        writer.write(b'pr p\r\n', 2.5, TX)
+        writer.write(b'', 3.5)
+        writer.close()
+        reader = CaptureReader(filename)
+        self.assertEqual(reader.name, 'GPS')
+        self.assertEqual(list(reader), [(1.5, RX, b'\xb5\x62abc'), (2.5, TX, b'pr p\r\n'), (3.5, RX, b'')])
+
+    def test_record_and_replay(self):
+        simulator = GPSSimulator(rate=20)
+        simulator.start()
+        try:
+            gps = GPS(make_cfg('GPS', simulator.port, self.path), FakeLogger())
+            gps._capture_path = self.path  # In case instance was already initialized for port
+            gps.start()
+            sleep(0.5)
+            gps.stop()
+        finally:
+            simulator.close()
+        filename = os.path.join(self.path, os.listdir(self.path)[0])
+        self.assertTrue(os.path.basename(filename).startswith('GPS_'))
+        self.assertGreater(sum(len(d) for _, _, d in CaptureReader(filename)), 0)
+        # Replay into instance of another port
+        gps_replay = GPS(make_cfg('GPS', '/dev/null_test_capture', self.path), FakeLogger())
+        stats = replay(gps_replay, filename, speed=None)
+        self.assertGreater(stats.chunks, 0)
+        self.assertLess(stats.elapsed, stats.duration)
+        self.assertEqual(gps_replay.latitude, gps.latitude)
+        self.assertEqual(gps_replay.packet_pvt_received, gps.packet_pvt_received)
+        stats = replay(gps_replay, filename, speed=4)
+        self.assertAlmostEqual(stats.elapsed, stats.duration / 4, delta=0.05)
+
+    def test_indexing_table(self):
+        drive = MDriveSimulator(parameters=IndexingTable.CONFIGURATION)
+        drive.start()
+        try:
+            indexing_table = IndexingTable(make_cfg('IndexingTable', drive.port, self.path))
+            indexing_table._capture_path = self.path
+            indexing_table.start()
+            drive.set_position(int(12 * IndexingTable.GEAR_BOX_RATIO))
+            indexing_table.get_position()
+            drive.mute = True  # No reply isn't recorded
+            try:
+                self.assertTrue(isnan(asyncio.run(indexing_table.poll_status_async()).position))
+            finally:
+                drive.mute = False
+            filename = indexing_table.capture.filename
+            indexing_table.stop()
+            records = list(CaptureReader(filename))
+            self.assertIn((TX, b'\x08pr p\r\n'), [(d, data) for _, d, data in records])
+            self.assertIn((TX, b'\x08ma 0\r\n'), [(d, data) for _, d, data in records])  # Written outside _commands
+            self.assertNotIn(None, [data for _, _, data in records])
+            self.assertEqual(records[-1][1:], (RX, b'0\r\n'))  # Stall flag checked before moving back to 0
+            # Replies replayed in order
+            indexing_table.start()
+            serial, indexing_table._serial = indexing_table._serial, ReplaySerial(filename)
+            try:
+                self.assertEqual(indexing_table.get_configuration(), IndexingTable.CONFIGURATION)
+                self.assertFalse(indexing_table.get_stall_flag())
+                self.assertEqual(indexing_table.get_position(), 0)  # Position before moving drive
+                self.assertAlmostEqual(indexing_table.get_position(), 12, places=2)
+            finally:
+                indexing_table._serial = serial
+                indexing_table.stop()
+        finally:
+            drive.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
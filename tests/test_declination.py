@@ -0,0 +1,47 @@
+import unittest
+from datetime import date, datetime
+from math import isnan
+
+import numpy as np
+
+from pySAS import WORLD_MAGNETIC_MODEL
+from pySAS.declination import DeclinationCache, geomag_declination
+
+
+class TestDeclinationCache(unittest.TestCase):
+
+    def test_interpolation(self):
+        cache = DeclinationCache(WORLD_MAGNETIC_MODEL)
+        for lat, lon, alt in ((44.9, -68.7, 10), (-33.3, 151.1, 0), (0.1, -179.9, 100), (59.8, 20.6, 3000)):
+            expected = WORLD_MAGNETIC_MODEL.GeoMag(lat, lon, alt * 3.2808399, date(2020, 4, 2)).dec
+            self.assertAlmostEqual(cache.get(lat, lon, alt, datetime(2020, 4, 2, 12)), expected, delta=0.02)
+
+    def test_cache(self):
+        cache = DeclinationCache(WORLD_MAGNETIC_MODEL, maxsize=8)
+        cache.get(44.91, -68.71, 10, date(2020, 4, 2))
+        cache.get(44.92, -68.72, 20, date(2020, 4, 2))  # Same cell
+        self.assertEqual(cache.cache_info().misses, 4)
+        self.assertEqual(cache.cache_info().hits, 4)
+        cache.get(44.92, -68.72, 20, date(2020, 4, 3))  # Next day
+        self.assertEqual(cache.cache_info().currsize, 8)
+        self.assertTrue(isnan(cache.get(float('nan'), -68.7)))
+
+
+class TestGeomagDeclination(unittest.TestCase):
+
+    def test_same_as_geomag(self):
+        rng = np.random.default_rng(0)
+        latitude = np.concatenate(([90, -90, 0], rng.uniform(-90, 90, 200)))
+        longitude = rng.uniform(-180, 180, len(latitude))
+        altitude = rng.uniform(0, 5000, len(latitude))
+        dates = np.datetime64('2015-01-01') + rng.integers(0, 2000, len(latitude))
+        expected = [WORLD_MAGNETIC_MODEL.GeoMag(lat, lon, alt * 3.2808399, d.astype(date)).dec
+                    for lat, lon, alt, d in zip(latitude, longitude, altitude, dates)]
+        np.testing.assert_allclose(geomag_declination(WORLD_MAGNETIC_MODEL, latitude, longitude, altitude, dates),
+                                   expected, atol=0.01)
+        self.assertAlmostEqual(geomag_declination(WORLD_MAGNETIC_MODEL, 40, -70, 1000, date(2020, 4, 2)),
+                               -14.2833, delta=0.5)  # NOAA web model
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from pySAS.interfaces import FrameBuffer, FrameMatcher
+from tests.helpers import load_parser, make_frame, THS_FRAME
+
+
+class TestFrameBuffer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parser = load_parser()
+        cls.matcher = FrameMatcher(cls.parser)
+        cls.lt = make_frame(cls.parser.cal['SATHSL0250'])
+        cls.es = make_frame(cls.parser.cal['SATHSE0187'])
+
+    def read_all(self, buffer):
+        frames, unknown = [], []
+        while True:
+            frame, header, unknown_bytes = buffer.next_frame(self.matcher)
+            if unknown_bytes is not None:
+                unknown.append(bytes(unknown_bytes))
+            if frame is not None:
+                frames.append((header, bytes(frame)))
+            elif unknown_bytes is None:
+                return frames, unknown
+
+    def test_frames_split_across_chunks(self):
+        stream = self.lt + THS_FRAME + self.es + self.lt
+        buffer = FrameBuffer(1024)
+        frames = []
+        for i in range(0, len(stream), 37):
+            buffer.extend(stream[i:i + 37])
+            frames += self.read_all(buffer)[0]
+        self.assertEqual([h for h, _ in frames], ['SATHSL0250', 'SATTHS0009', 'SATHSE0187', 'SATHSL0250'])
+        self.assertEqual(b''.join(f for _, f in frames), stream)
+        self.assertEqual(len(buffer), 0)
+
+    def test_unknown_bytes(self):
+        buffer = FrameBuffer(1024)
+        buffer.extend(b'garbage' + self.lt + b'UNKNOWN_FRAME_HEADER')
+        frames, unknown = self.read_all(buffer)
+        self.assertEqual(frames, [('SATHSL0250', self.lt)])
+        self.assertEqual(unknown[0], b'garbage')
+        # End of buffer is kept as could be the beginning of a frame header
+        self.assertEqual(b''.join(unknown[1:]) + bytes(buffer._view[buffer._start:buffer._end]),
+                         b'UNKNOWN_FRAME_HEADER')
+        self.assertLess(len(buffer), self.matcher.max_header_length)
+
+    def test_trim_keeps_recoverable_frames(self):
+        buffer = FrameBuffer(256)
+        # THS frame without terminator followed by valid frames
+        buffer.extend(b'SATTHS0009,100,' + b'1' * 300)
+        self.assertEqual(self.read_all(buffer), ([], []))
+        dropped = buffer.trim(self.matcher)
+        self.assertEqual(len(dropped), 315 - self.matcher.max_header_length + 1)
+        self.assertLessEqual(len(buffer), 256)
+        buffer.extend(THS_FRAME[:20])
+        buffer.extend(THS_FRAME[20:] + self.es)
+        frames, _ = self.read_all(buffer)
+        self.assertEqual(frames, [('SATTHS0009', THS_FRAME), ('SATHSE0187', self.es)])
+
+    def test_trim_drops_up_to_next_header(self):
+        buffer = FrameBuffer(256)
+        buffer.extend(b'SATTHS0009,100,' + b'1' * 300 + THS_FRAME[:20])
+        self.read_all(buffer)
+        self.assertEqual(bytes(buffer.trim(self.matcher)), b'SATTHS0009,100,' + b'1' * 300)
+        buffer.extend(THS_FRAME[20:])
+        self.assertEqual(self.read_all(buffer), ([('SATTHS0009', THS_FRAME)], []))
+
+    def test_matcher_lookup_table(self):
+        self.assertEqual(self.matcher.frame_lengths['SATHSL0250'], self.parser.cal['SATHSL0250'].frame_length)
+        self.assertEqual(self.matcher.frame_lengths['SATTHS0009'], 0)  # Variable length frame
+        self.assertEqual(self.matcher.max_header_length, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+from configparser import ConfigParser
+from threading import Thread
+from time import sleep, time
+
+import numpy as np
+
+from pySAS.interfaces import HyperSAS, Spectra, SpectralHistory
+from tests.helpers import FakeLogger, load_parser, make_frame, THS_FRAME
+
+
+class TestHyperOCRParsing(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parser = load_parser()
+        cfg = ConfigParser()
+        cfg.read_dict({'HyperSAS': {'port': '/dev/null_test_hyperocr', 'baudrate': '57600',
+                                    'parse_in_background': 'True'}})
+        cls.hypersas = HyperSAS(cfg, FakeLogger(), parser=cls.parser)
+        cls.li = make_frame(cls.parser.cal['SATHSL0250'], 1200)
+        cls.li_dark = make_frame(cls.parser.cal['SATHLD0250'], 1000)
+        cls.es = make_frame(cls.parser.cal['SATHSE0187'], 1500)
+
+    def setUp(self):
+        self.hypersas.reset_buffers()
+
+    def expected(self, frame, dark=None):
+        data, _ = self.parser.parse_frame(frame)
+        values = data[self.parser.cal[frame[:10].decode()].core_groupname]
+        if dark is not None:
+            values = values - self.parser.parse_frame(dark)[0][self.parser.cal[dark[:10].decode()].core_groupname]
+        return values
+
+    def test_dispatcher(self):
+        channels = self.hypersas.channels
+        self.assertIs(self.hypersas._dispatcher['SATHSL0250'], channels['Li'])
+        self.assertIs(self.hypersas._dispatcher['SATHLD0250'], channels['Li_dark'])
+        self.assertIs(self.hypersas._dispatcher['SATHSE0187'], channels['Es'])
+        self.assertIs(self.hypersas._dispatcher['SATTHS0009'], channels['THS'])
+        self.assertEqual(len(channels['Es'].wavelength), len(self.parser.cal['SATHSE0187'].core_variables))
+        self.assertIsNone(channels['THS'].wavelength)
+        timestamp = time()
+        self.hypersas.data_received(self.es + THS_FRAME, timestamp)
+        self.assertEqual(channels['Es'].raw, self.es)
+        self.assertEqual(channels['Es'].received, timestamp)
+        self.assertEqual(channels['THS'].raw, THS_FRAME)
+        self.assertTrue(channels['Es'].updated)
+        self.assertFalse(channels['Lt'].updated)
+
+    def test_parse_in_background(self):
+        self.assertEqual(self.hypersas.spectra, Spectra())
+        # Run parser as if sensor was started (without serial port)
+        self.hypersas.alive = True
+        thread = Thread(target=self.hypersas.run_parser, daemon=True)
+        thread.start()
+        try:
+            self.hypersas.data_received(self.li_dark + self.li + THS_FRAME + self.es, time())
+            for _ in range(100):
+                if self.hypersas.spectra.Es is not None and self.hypersas.spectra.Li is not None:
+                    break
+                sleep(0.01)
+            spectra = self.hypersas.get_spectra()  # Read snapshot without parsing
+        finally:
+            self.hypersas.alive = False
+            thread.join(2)
+        np.testing.assert_allclose(spectra.Li, self.expected(self.li, self.li_dark))
+        np.testing.assert_allclose(spectra.Es, self.expected(self.es))
+        self.assertIsNone(spectra.Lt)
+        self.assertFalse(spectra.Es.flags.writeable)
+        with self.assertRaises(ValueError):
+            spectra.Es[0] = 0
+
+    def test_snapshot_is_immutable(self):
+        self.hypersas.data_received(self.es, time())
+        self.hypersas.parse_packets()
+        first = self.hypersas.spectra
+        self.hypersas.data_received(make_frame(self.parser.cal['SATHSE0187'], 2000), time())
+        self.hypersas.parse_packets()
+        # Previous snapshot is left untouched by new parsing
+        np.testing.assert_allclose(first.Es, self.expected(self.es))
+        self.assertGreater(self.hypersas.spectra.Es[0], first.Es[0])
+
+    def test_history(self):
+        history = self.hypersas.channels['Es'].history
+        self.assertEqual(history.values.shape, (self.hypersas.history_length, len(self.hypersas.channels['Es'].wavelength)))
+        for counts in (1000, 2000):
+            self.hypersas.data_received(make_frame(self.parser.cal['SATHSE0187'], counts), time())
+            self.hypersas.parse_packets()
+        timestamps, values = history.get()
+        self.assertEqual(len(history), 2)
+        self.assertEqual(values.dtype, np.float32)
+        np.testing.assert_allclose(values[-1], self.hypersas.spectra.Es, rtol=1e-6)
+        self.hypersas.reset_buffers()
+        self.assertEqual(len(history), 0)
+
+    def test_history_every_frame(self):
+        # Frames received between two parsings are all kept in history, with their own timestamp
+        history = self.hypersas.channels['Es'].history
+        frames = [make_frame(self.parser.cal['SATHSE0187'], c) for c in (1000, 1100, 1200)]
+        for i, frame in enumerate(frames):
+            self.hypersas.data_received(frame, 100 + i)
+        self.hypersas.data_received(self.es[:-1] + THS_FRAME, 103)  # Corrupted frame is dropped
+        self.hypersas.parse_packets()
+        timestamps, values = history.get()
+        np.testing.assert_array_equal(timestamps, [100, 101, 102])
+        np.testing.assert_allclose(values, [self.expected(f) for f in frames], rtol=1e-6)
+        np.testing.assert_allclose(self.hypersas.spectra.Es, self.expected(frames[-1]))
+
+
+class TestArrivalTime(unittest.TestCase):
+
+    def test_baudrate(self):
+        parser = load_parser()
+        cfg = ConfigParser()
+        cfg.read_dict({'HyperSAS': {'port': '/dev/null_test_arrival_time', 'baudrate': '57600',
+                                    'timestamp_model': 'baudrate'}})
+        hypersas = HyperSAS(cfg, FakeLogger(), parser=parser)
+        es, li = make_frame(parser.cal['SATHSE0187'], 1500), make_frame(parser.cal['SATHSL0250'], 1200)
+        byte_time = 10 / 57600
+        timestamp = time()
+        hypersas.data_received(es + THS_FRAME + li[:20], timestamp)
+        self.assertAlmostEqual(hypersas.channels['Es'].received, timestamp - (len(THS_FRAME) + 20) * byte_time)
+        self.assertAlmostEqual(hypersas.channels['THS'].received, timestamp - 20 * byte_time)
+        # Chunk timestamped earlier than previous frames is clamped to be monotonic
+        hypersas.data_received(li[20:] + THS_FRAME, timestamp - 1)
+        received = [hypersas.channels[c].received for c in ('Es', 'THS', 'Li')]
+        self.assertEqual(received, sorted(received))
+        self.assertEqual(hypersas.channels['Li'].received, hypersas.channels['THS'].received)
+        stats = hypersas.arrival_time.get_statistics()
+        self.assertEqual(stats['count'], 4)
+        self.assertEqual(stats['clamped'], 2)
+        self.assertAlmostEqual(stats['max_correction'], (len(THS_FRAME) + 20) * byte_time, places=6)
+
+
+class TestSpectralHistory(unittest.TestCase):
+
+    def test_ring(self):
+        history = SpectralHistory(3, 2)
+        buffer = history.values
+        for i in range(5):
+            history.append([i, 10 * i], 100 + i)
+        self.assertIs(history.values, buffer)  # No reallocation
+        timestamps, values = history.get()
+        np.testing.assert_array_equal(timestamps, [102, 103, 104])
+        np.testing.assert_array_equal(values[:, 1], [20, 30, 40])
+        np.testing.assert_array_equal(history.get(duration=1)[0], [103, 104])
+        np.testing.assert_allclose(history.mean(), [3, 30])
+        np.testing.assert_allclose(history.std(duration=1), [0.5, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
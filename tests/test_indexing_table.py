@@ -0,0 +1,143 @@
+import unittest
+from configparser import ConfigParser
+from time import perf_counter
+
+from serial import SerialException
+
+from pySAS.interfaces import IndexingTable, TableStatus
+from pySAS.simulator import MDriveSimulator
+
+
+class TestIndexingTableCommands(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.drive = MDriveSimulator(reply_delay=0.002, parameters=IndexingTable.CONFIGURATION)
+        cls.drive.start()
+        cfg = ConfigParser()
+        cfg.read_dict({'IndexingTable': {'port': cls.drive.port, 'baudrate': '9600', 'timeout': '1'}})
+        cls.indexing_table = IndexingTable(cfg)
+        cls.indexing_table.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.drive.mute = False
+        cls.indexing_table.stop()
+        cls.drive.close()
+
+    def test_reply_driven(self):
+        self.drive.set_position(int(-45 * IndexingTable.GEAR_BOX_RATIO))
+        tic = perf_counter()
+        position = self.indexing_table.get_position()
+        stalled = self.indexing_table.get_stall_flag()
+        elapsed = perf_counter() - tic
+        self.assertAlmostEqual(position, -45, places=2)
+        self.assertFalse(stalled)
+        # Queries return as soon as drive replies instead of after COMMAND_EXECUTION_TIME
+        self.assertLess(elapsed, IndexingTable.COMMAND_EXECUTION_TIME)
+        self.assertLess(self.indexing_table.rtt, IndexingTable.COMMAND_EXECUTION_TIME / 2)
+        self.assertGreaterEqual(self.indexing_table.rtt, self.drive.reply_delay)
+        self.assertGreaterEqual(len(self.indexing_table.rtt_history), 2)
+        self.assertEqual(self.indexing_table._serial.timeout, 1)  # Timeout configured is left untouched
+
+    def test_poll_status(self):
+        self.drive.set_position(int(30 * IndexingTable.GEAR_BOX_RATIO))
+        n = len(self.indexing_table.rtt_history)
+        status = self.indexing_table.poll_status()
+        self.assertIsInstance(status, TableStatus)
+        self.assertAlmostEqual(status.position, 30, places=2)
+        self.assertFalse(status.stalled)
+        self.assertIsNone(status.moving)
+        self.assertEqual(self.indexing_table.position, status.position)
+        self.assertEqual(self.indexing_table.packet_received, status.received)
+        self.assertEqual(len(self.indexing_table.rtt_history), min(n + 1, IndexingTable.RTT_HISTORY_LENGTH))
+        status = self.indexing_table.poll_status(moving=True, velocity=True)
+        self.assertIs(status.moving, False)
+        self.assertEqual(status.velocity, 0)
+
+    def test_move_to_async(self):
+        future = self.indexing_table.move_to_async(20)
+        self.assertTrue(future.result(timeout=IndexingTable.MOTION_TIMEOUT))
+        self.assertAlmostEqual(self.indexing_table.position, 20, places=2)
+        self.assertEqual(self.indexing_table.motion.progress, 1)
+        # Superseded motion is cancelled
+        first, second = self.indexing_table.move_to_async(-10), self.indexing_table.move_to_async(10)
+        self.assertTrue(second.result(timeout=IndexingTable.MOTION_TIMEOUT))
+        self.assertTrue(first.cancelled())
+        self.assertFalse(self.indexing_table.wait_motion(first))
+        # Out of range is rejected without moving
+        future = self.indexing_table.move_to_async(IndexingTable.POSITION_LIMITS[1] + 1)
+        self.assertTrue(future.done())
+        self.assertFalse(future.result())
+        self.assertTrue(self.indexing_table.set_position(0, check_stall_flag=True))
+
+    def test_stop_then_start(self):
+        # Switching table back on while it returns to zero cancels pending power off
+        self.assertTrue(self.indexing_table.set_position(20, check_stall_flag=True))
+        self.indexing_table.stop(wait=False)
+        self.indexing_table.start()
+        self.indexing_table.wait_motion(self.indexing_table.motion.future)
+        self.assertTrue(self.indexing_table.alive)
+        self.assertFalse(self.indexing_table.busy)
+
+    def test_motion_poller_error(self):
+        def poll_status(*args, **kwargs):
+            raise SerialException('device disconnected')
+        self.indexing_table.poll_status = poll_status
+        try:
+            future = self.indexing_table.move_to_async(5)
+            self.assertFalse(self.indexing_table.wait_motion(future))
+            self.assertIsNone(self.indexing_table._motion_thread)
+        finally:
+            del self.indexing_table.poll_status
+        # Next motion starts a new poller
+        self.assertTrue(self.indexing_table.set_position(0, check_stall_flag=True))
+
+    def test_motion_no_reply(self):
+        future = self.indexing_table.move_to_async(5)
+        self.drive.mute = True
+        try:
+            tic = perf_counter()
+            self.assertFalse(self.indexing_table.wait_motion(future))
+            elapsed = perf_counter() - tic
+        finally:
+            self.drive.mute = False
+        self.assertLess(elapsed, IndexingTable.MOTION_TIMEOUT / 2)
+        self.assertTrue(self.indexing_table.set_position(0, check_stall_flag=True))
+
+    def test_reconcile_configuration(self):
+        self.indexing_table.stop()
+        self.drive.parameters['vm'] = 5000
+        resets = self.drive.resets
+        self.assertTrue(self.indexing_table.start())
+        self.assertEqual(self.drive.parameters, IndexingTable.CONFIGURATION)
+        self.assertEqual(self.drive.resets, resets)
+        # Only parameters that differ are written
+        self.drive.parameters['vm'] = 5000
+        self.assertEqual(self.indexing_table.reconcile_configuration(), {'vm': 20000})
+        self.assertEqual(self.drive.parameters, IndexingTable.CONFIGURATION)
+        # Reset and write all parameters if configuration can't be read
+        self.drive.saved_parameters['vm'] = 5000  # Restored by reset
+        self.drive.mute = True
+        try:
+            self.assertIsNone(self.indexing_table.reconcile_configuration())
+        finally:
+            self.drive.mute = False
+            self.drive.saved_parameters['vm'] = IndexingTable.CONFIGURATION['vm']
+        self.assertEqual(self.drive.resets, resets + 1)
+        self.assertEqual(self.drive.parameters, IndexingTable.CONFIGURATION)
+
+    def test_no_reply(self):
+        self.drive.mute = True
+        try:
+            tic = perf_counter()
+            position = self.indexing_table.get_position()
+            elapsed = perf_counter() - tic
+        finally:
+            self.drive.mute = False
+        self.assertTrue(position != position)  # nan
+        self.assertAlmostEqual(elapsed, IndexingTable.REPLY_TIMEOUT, delta=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
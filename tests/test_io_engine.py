@@ -0,0 +1,112 @@
+import os
+import threading
+import unittest
+from time import sleep, time
+
+import numpy as np
+
+from pySAS.interfaces import GPS, IMU, HyperSAS
+from pySAS.io_engine import SelectorEngine
+from tests.helpers import FakeLogger, load_parser, make_cfg, make_frame, make_imu_frame, make_ubx_frames
+
+
+class TestDataReceived(unittest.TestCase):
+
+    def test_gps(self):
+        gps = GPS(make_cfg('GPS', '/dev/null_test_io_engine_gps'), FakeLogger())
+        pvt, relposned = make_ubx_frames()
+        corrupted = pvt[:-1] + bytes([pvt[-1] ^ 0xFF])
+        stream = b'\x00\xB5' + corrupted + pvt + b'garbage' + relposned
+        for i in range(0, len(stream), 7):
+            gps.data_received(stream[i:i + 7], 1.0)
+        self.assertAlmostEqual(gps.latitude, 44.5)
+        self.assertAlmostEqual(gps.longitude, -68.5)
+        self.assertAlmostEqual(gps.heading, 180)
+        self.assertEqual(gps.packet_pvt_received, 1.0)
+        self.assertEqual(gps.packet_relposned_received, 1.0)
+        self.assertLess(len(gps._decoder._buffer), 2)
+
+    def test_imu(self):
+        imu = IMU(make_cfg('IMU', '/dev/null_test_io_engine_imu'), FakeLogger())
+        stream = b''.join(make_imu_frame(i, yaw=i) for i in range(1, 6))
+        for i in range(0, len(stream), 5):
+            imu.data_received(stream[i:i + 5], 1.0)
+        # Frames are handled as soon as complete
+        self.assertAlmostEqual(imu.yaw, 5)
+        self.assertEqual(imu.counter, 5)
+        self.assertEqual(imu.packet_received, 1.0)
+        self.assertEqual(len(imu._buffer), 0)
+
+    def test_imu_bulk(self):
+        imu = IMU(make_cfg('IMU', '/dev/null_test_io_engine_imu_bulk'), FakeLogger())
+        corrupted = bytearray(make_imu_frame(3, yaw=-90))
+        corrupted[5] ^= 0xFF
+        # Separator in content of frame (yaw of -218.46 deg is 0xAAAA) and partial frame at end
+        stream = b'\x00\xAA' + b''.join(make_imu_frame(i, yaw=i) for i in (0, 1, 2)) + corrupted \
+            + make_imu_frame(10, yaw=-218.46) + make_imu_frame(20, yaw=-12.34, pitch=1.5, roll=-2.25) \
+            + make_imu_frame(21)[:7]
+        imu.data_received(stream, 1.0)
+        self.assertEqual(imu.counter, 20)
+        self.assertAlmostEqual(imu.yaw, -12.34)
+        self.assertAlmostEqual(imu.pitch, 1.5)
+        self.assertAlmostEqual(imu.roll, -2.25)
+        self.assertAlmostEqual(imu.z_accel, 981 * 0.0098067)
+        self.assertEqual(bytes(imu._buffer), make_imu_frame(21)[:7])
+        # Only frames with index multiple of decimate are logged
+        self.assertEqual([f.split(b',')[1] for f in imu._data_logger.frames], [b'0', b'10', b'20'])
+        imu.data_received(make_imu_frame(21)[7:], 2.0)
+        self.assertEqual(imu.counter, 21)
+
+
+    def test_imu_aggregate(self):
+        cfg = make_cfg('IMU', '/dev/null_test_io_engine_imu_aggregate')
+        cfg['IMU'].update({'decimate': '4', 'aggregate': 'True'})
+        imu = IMU(cfg, FakeLogger())
+        yaw, pitch = [179, -179, 178, -178, 10], [1, 2, 3, 4, 5]
+        imu.data_received(b''.join(make_imu_frame(i, yaw=y, pitch=p) for i, (y, p) in enumerate(zip(yaw, pitch))), 1.0)
+        self.assertAlmostEqual(imu.yaw, 10)  # State from newest sample
+        self.assertEqual(imu._block_size, 1)
+        self.assertEqual(len(imu._data_logger.frames), 1)
+        fields = imu._data_logger.frames[0].split(b',')
+        self.assertEqual(fields[1], b'3')
+        stats = np.array(fields[3:], dtype=float).reshape(4, 6)
+        self.assertAlmostEqual(abs(stats[0, 0]), 180)  # Mean of yaw across +/-180
+        np.testing.assert_allclose(stats[:, 1], [2.5, 1, 4, np.std([1, 2, 3, 4])], atol=0.01)
+        self.assertAlmostEqual(stats[3, 0], 1.58, places=2)
+        self.assertAlmostEqual(stats[0, 5], 981 * 0.0098067, places=3)
+
+
+class TestSelectorEngine(unittest.TestCase):
+
+    def test_read_sensors(self):
+        parser = load_parser()
+        ptys = [os.openpty() for _ in range(2)]
+        engine = SelectorEngine()
+        imu = IMU(make_cfg('IMU', os.ttyname(ptys[0][1])), FakeLogger())
+        hypersas = HyperSAS(make_cfg('HyperSAS', os.ttyname(ptys[1][1])), FakeLogger(), parser=parser)
+        imu.io_engine, hypersas.io_engine = engine, engine
+        imu.start()
+        hypersas.start()
+        try:
+            self.assertEqual([t.name for t in threading.enumerate()].count('SelectorEngine'), 1)
+            self.assertIsNone(imu._thread)
+            os.write(ptys[0][0], make_imu_frame(1, yaw=12.5))
+            os.write(ptys[1][0], make_frame(parser.cal['SATHSE0187']))
+            for _ in range(100):
+                if imu.counter == 1 and hypersas.channels['Es'].raw is not None:
+                    break
+                sleep(0.01)
+        finally:
+            imu.stop()
+            hypersas.stop()
+            for master, slave in ptys:
+                os.close(master)
+                os.close(slave)
+        self.assertAlmostEqual(imu.yaw, 12.5)
+        self.assertAlmostEqual(imu.packet_received, time(), delta=1)
+        self.assertEqual(hypersas.channels['Es'].raw, make_frame(parser.cal['SATHSE0187']))
+        self.assertFalse(engine.alive)
+
+
+if __name__ == '__main__':
+    unittest.main()
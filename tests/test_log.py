@@ -0,0 +1,153 @@
+import glob
+import os
+import tempfile
+import unittest
+from struct import pack
+from time import sleep, time
+
+import numpy as np
+
+from pySAS.log import SatlanticLogger, SatlanticTimestampEncoder, pack_timestamp_satlantic, pack_timestamps_satlantic, \
+    read_frame_index, FRAME_INDEX_DTYPE
+from tests.helpers import pack_timestamp_satlantic_strftime
+
+
+class TestSatlanticTimestamp(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        start = 1704067199.0  # 2023-12-31 23:59:59 UTC
+        self.timestamps = np.concatenate((start + np.sort(rng.uniform(0, 3, 200)),  # Same and successive seconds
+                                          rng.uniform(1577836800, 1893456000, 200),  # 2020 to 2030
+                                          [start, start + 1, 1709164800.999]))  # Year rollover and leap day
+
+    def test_encoder(self):
+        encoder = SatlanticTimestampEncoder()
+        for t in self.timestamps:
+            self.assertEqual(encoder(t), pack_timestamp_satlantic_strftime(t), t)
+
+    def test_bulk(self):
+        self.assertEqual(pack_timestamps_satlantic(self.timestamps),
+                         [pack_timestamp_satlantic_strftime(t) for t in self.timestamps])
+        dt = np.array(['2024-02-29T23:59:59.999999', '2024-12-31T12:00:00.001'], dtype='datetime64[us]')
+        self.assertEqual(pack_timestamps_satlantic(dt), [pack('!ii', 2024060, 235959999)[1:],
+                                                         pack('!ii', 2024366, 120000001)[1:]])
+
+    def test_bulk_millisecond_boundaries(self):
+        # Timestamps on either side of millisecond boundaries are truncated alike by both encoders
+        boundaries = 1704067199 + np.arange(0, 3, 0.001)
+        timestamps = np.concatenate((boundaries, np.nextafter(boundaries, 0), np.nextafter(boundaries, np.inf),
+                                     boundaries - 1e-7, boundaries + 1e-7))
+        encoder = SatlanticTimestampEncoder()
+        self.assertEqual(pack_timestamps_satlantic(timestamps), [encoder(float(t)) for t in timestamps])
+
+
+class TestSatlanticLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def read_files(self):
+        return [open(f, 'rb').read() for f in sorted(glob.glob(os.path.join(self.tmp_dir.name, '*.raw')))]
+
+    def test_batch(self):
+        logger = SatlanticLogger({'path': self.tmp_dir.name, 'length': 1 / 60, 'batch_delay': 0.05})
+        start = (time() // 1) - 10
+        frames = [(b'SATTHS%04d\r\n' % i, start + i / 100) for i in range(300)]  # 3 files of 1 second
+        for data, timestamp in frames:
+            logger.write(data, timestamp)
+        logger.close()
+        files = self.read_files()
+        self.assertEqual(len(files), 3)
+        self.assertEqual(b''.join(files), b''.join(d + pack_timestamp_satlantic(t) for d, t in frames))
+
+    def test_overflow_policy(self):
+        frames = [(b'SATHSL%04d\r\n' % i, 1704067200 + i) for i in range(8)]
+        for policy, queued in (('drop_oldest', frames[3:]), ('drop_newest', frames[:5]), ('block', frames[:5])):
+            logger = SatlanticLogger({'path': self.tmp_dir.name, 'max_queue_size': 5, 'overflow_policy': policy,
+                                      'block_timeout': 0.01})
+            logger.register_headers(['SATHSL0000'])
+            logger._alive = True  # Simulate stalled storage: writing thread is not consuming queue
+            for data, timestamp in frames:
+                logger.write(data, timestamp)
+            self.assertEqual(list(logger._queue.queue), queued, policy)
+            stats = logger.get_statistics()
+            self.assertEqual(stats['queue_high_water'], len(queued))
+            self.assertEqual((stats['enqueued_frames'], stats['dropped_frames'], stats['written_frames']),
+                             (8, 8 - len(queued), 0))
+            self.assertEqual(stats['headers']['SATHSL0000']['enqueued_bytes'], 12)
+            self.assertEqual(stats['headers']['unknown']['enqueued_frames'], 7)  # Headers not registered
+            logger._alive = False
+        # Unbounded queue keeps all frames silently whatever the policy
+        for policy in SatlanticLogger.OVERFLOW_POLICIES:
+            logger = SatlanticLogger({'path': self.tmp_dir.name, 'max_queue_size': 0, 'overflow_policy': policy})
+            logger._alive = True
+            with self.assertNoLogs(level='WARNING'):
+                for data, timestamp in frames:
+                    logger.write(data, timestamp)
+            self.assertEqual(list(logger._queue.queue), frames, policy)
+            logger._alive = False
+
+    def test_default_overflow_policy(self):
+        # Writers wait for space in queue by default rather than discarding frames
+        self.assertEqual(SatlanticLogger({'path': self.tmp_dir.name}).overflow_policy, 'block')
+
+    def test_statistics(self):
+        logger = SatlanticLogger({'path': self.tmp_dir.name})
+        logger.register_headers(['SATHSL0250', b'SATTHS0009'])
+        for i in range(10):
+            logger.write(b'SATHSL0250%04d\r\n' % i if i % 2 else b'SATTHS0009\r\n', time())
+        for garbage in (b'XK3F\r\n', b'Q9ZZ71\r\n'):  # Unregistered headers don't grow counters
+            logger.write(garbage, time())
+        logger.close()
+        stats = logger.get_statistics()
+        self.assertEqual(stats['headers']['SATHSL0250'], {'enqueued_frames': 5, 'enqueued_bytes': 80,
+                                                          'written_frames': 5, 'written_bytes': 80,
+                                                          'dropped_frames': 0, 'dropped_bytes': 0})
+        self.assertEqual(sorted(stats['headers']), ['SATHSL0250', 'SATTHS0009', 'unknown'])
+        self.assertEqual(stats['headers']['unknown']['written_frames'], 2)
+        self.assertEqual((stats['written_frames'], stats['written_bytes']), (12, 154))
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_index(self):
+        logger = SatlanticLogger({'path': self.tmp_dir.name, 'length': 1 / 60})
+        start = (time() // 1) - 10
+        frames = [(b'SATHSL0250' + bytes(range(i % 50)) + b'\r\n', start + i / 50) for i in range(100)]
+        frames[10] = (b'UMTWR,1.00,2.00,0.10\r\n', frames[10][1])
+        frames[20] = (b'\xb5b\x01\x07', frames[20][1])  # Unknown header
+        frames[30] = (b'$GPRMC,120000,A,4452.1234,N,06830.5678,W,000.0,000.0,010124,015.1,W*6a\r\n', frames[30][1])
+        for data, timestamp in frames:
+            logger.write(data, timestamp)
+        logger.close()
+        raw = self.read_files()
+        indices = [read_frame_index(f) for f in sorted(glob.glob(os.path.join(self.tmp_dir.name, '*.idx')))]
+        self.assertEqual(len(indices), 2)
+        self.assertEqual(indices[0][0], [b'SATHSL0250', b'UMTWR', b'$GPRMC'])
+        read = []
+        for r, (headers, records) in zip(raw, indices):
+            for o, n, h, t in records.tolist():
+                self.assertEqual(r[o + n:o + n + 7], pack_timestamp_satlantic(t))
+                if h != 0xFFFF:
+                    self.assertEqual(r[o:o + len(headers[h])], headers[h])
+                read.append((r[o:o + n], t))
+        self.assertEqual(read, frames)
+        self.assertEqual(indices[0][1]['header_id'][20], 0xFFFF)
+        # Incomplete record is ignored
+        filename = sorted(glob.glob(os.path.join(self.tmp_dir.name, '*.idx')))[1]
+        with open(filename, 'ab') as f:
+            f.write(bytes(FRAME_INDEX_DTYPE.itemsize - 1))
+        self.assertEqual(len(read_frame_index(filename)[1]), len(indices[1][1]))
+
+    def test_flush_interval(self):
+        logger = SatlanticLogger({'path': self.tmp_dir.name, 'flush_interval': 0.2, 'fsync_interval': 0.2})
+        logger.write(b'SATTHS0000\r\n', time())
+        sleep(0.5)
+        self.assertEqual(len(self.read_files()[0]), 19)  # On disk while file is open
+        logger.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
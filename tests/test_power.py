@@ -0,0 +1,52 @@
+import unittest
+from math import isnan
+from time import sleep, time
+
+from pySAS.power import PowerOrchestrator
+
+
+def make_instrument(name, start_time, fail=False):
+    """Instrument taking start_time seconds to start once its relay is on"""
+    def power_on(self):
+        self.powered = time()
+
+    def start(self):
+        sleep(max(self.powered + start_time - time(), 0))
+        self.alive = not fail
+
+    def stop(self):
+        sleep(start_time / 2)
+        self.alive = False
+
+    return type(name, (), {'alive': False, 'powered': None, 'power_on': power_on, 'start': start, 'stop': stop})()
+
+
+class TestPowerOrchestrator(unittest.TestCase):
+
+    def test_concurrent(self):
+        instruments = [make_instrument(n, t) for n, t in (('IndexingTable', 0.3), ('IMU', 0.2), ('HyperSAS', 0.3))]
+        orchestrator = PowerOrchestrator()
+        tic = time()
+        readiness = orchestrator.start(instruments + [None])
+        elapsed = time() - tic
+        self.assertLess(elapsed, 0.5)  # Slowest instrument instead of sum (0.8 s)
+        self.assertEqual(list(readiness), ['IndexingTable', 'IMU', 'HyperSAS'])
+        self.assertAlmostEqual(readiness['IMU'], 0.2, delta=0.05)
+        self.assertTrue(all(i.alive for i in instruments))
+        readiness = orchestrator.stop(instruments)
+        self.assertFalse(any(i.alive for i in instruments))
+        self.assertAlmostEqual(readiness['HyperSAS'], 0.15, delta=0.05)
+
+    def test_deadline(self):
+        instruments = [make_instrument('Es', 0.1, fail=True), make_instrument('IMU', 0.1),
+                       make_instrument('HyperSAS', 1)]
+        tic = time()
+        readiness = PowerOrchestrator(timeout=0.3).start(instruments)
+        self.assertLess(time() - tic, 0.5)
+        self.assertTrue(isnan(readiness['Es']))
+        self.assertFalse(isnan(readiness['IMU']))
+        self.assertTrue(isnan(readiness['HyperSAS']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from configparser import ConfigParser
+from time import sleep, time
+
+from serial import Serial
+
+from pySAS.interfaces import IMU, IndexingTable, FrameBuffer, FrameMatcher
+from pySAS.simulator import Simulator, load_sip
+from pySAS.ubx import UBXDecoder
+
+
+class TestSimulator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.simulator = Simulator(gps_rate=10)
+        cls.simulator.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.simulator.close()
+
+    def read(self, name, duration=0.5):
+        with Serial(self.simulator.devices[name].port, 115200, timeout=0) as s:
+            s.reset_input_buffer()
+            sleep(duration)
+            return s.read(65536)
+
+    def test_streams(self):
+        messages = UBXDecoder().decode(self.read('GPS'))
+        self.assertGreaterEqual(len(messages), 6)
+        self.assertEqual({name for name, _ in messages}, {'PVT', 'RELPOSNED'})
+        pvt = next(msg for name, msg in messages if name == 'PVT')
+        self.assertAlmostEqual(pvt.headMot / 1e5, 45)
+        self.assertAlmostEqual(pvt.lat / 1e7, 44.9, places=2)
+        frames, _ = IMU.decode_frames(self.read('IMU'))
+        self.assertGreater(len(frames), 30)
+        self.assertAlmostEqual(frames['yaw'][-1] / 100, 45)
+
+    def test_satlantic(self):
+        parser = load_sip(self.simulator.sip)
+        matcher, buffer = FrameMatcher(parser), FrameBuffer(16384)
+        buffer.extend(self.read('HyperSAS', 1.2))
+        frames = {}
+        while True:
+            frame, header, unknown_bytes = buffer.next_frame(matcher)
+            if frame is None and unknown_bytes is None:
+                break
+            if frame is not None:
+                frames[header] = bytes(frame)
+        self.assertIn('SATHSL0250', frames)
+        self.assertIn('SATHSL0251', frames)
+        self.assertNotIn('SATHSE0187', frames)
+        data, _ = parser.parse_frame(frames['SATHSL0250'])
+        self.assertGreater(max(data['LI']), 1)  # Calibrated signal above dark
+        ths, _ = parser.parse_frame(frames['SATTHS0009'])
+        self.assertAlmostEqual(ths['COMP'], self.simulator.get_tower_heading(), delta=3)
+
+    def test_mdrive(self):
+        cfg = ConfigParser()
+        cfg.read_dict({'IndexingTable': {'port': self.simulator.devices['IndexingTable'].port, 'baudrate': '9600',
+                                         'timeout': '1'}})
+        indexing_table = IndexingTable(cfg)
+        self.assertTrue(indexing_table.start())
+        try:
+            self.assertEqual(self.simulator.devices['IndexingTable'].resets, 0)  # Already configured
+            tic = time()
+            future = indexing_table.move_to_async(10)
+            sleep(0.2)
+            self.assertFalse(future.done())
+            self.assertIs(indexing_table.poll_status(moving=True).moving, True)
+            self.assertTrue(future.result(timeout=IndexingTable.MOTION_TIMEOUT))
+            # 5555 steps at 20000 steps/s with acceleration and deceleration of 78125 steps/s2
+            self.assertAlmostEqual(time() - tic, 0.53, delta=0.3)
+            self.assertAlmostEqual(indexing_table.position, 10, places=2)
+            self.assertAlmostEqual(self.simulator.get_tower_heading(), 55, places=2)
+        finally:
+            indexing_table.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
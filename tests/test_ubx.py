@@ -0,0 +1,59 @@
+import unittest
+from struct import calcsize
+
+from ubxtranslator.core import Parser as UBXParser
+
+from pySAS.ubx import UBXDecoder, NAV_PVT, NAV_RELPOSNED, fletcher_checksum
+from pySAS.ubxtranslator_messages import NAV_ARDUSIMPLE
+from tests.helpers import make_ubx_stream
+
+
+class TestUBXDecoder(unittest.TestCase):
+
+    def test_message_structures(self):
+        parser = UBXParser([NAV_ARDUSIMPLE])
+        self.assertEqual(NAV_PVT.size, calcsize(parser.classes[0x01][0x07].fmt))
+        self.assertEqual(NAV_RELPOSNED.size, calcsize(parser.classes[0x01][0x3C].fmt))
+        self.assertEqual(bytes(fletcher_checksum(b'\x01\x07\x02\x00\xff\x10')),
+                         parser._generate_fletcher_checksum(b'\x01\x07\x02\x00\xff\x10'))
+
+    def test_same_as_ubxtranslator(self):
+        stream = make_ubx_stream(20)
+        decoder = UBXDecoder()
+        messages = []
+        for i in range(0, len(stream), 37):  # Split messages across reads
+            messages += decoder.decode(stream[i:i + 37])
+        parser = UBXParser([NAV_ARDUSIMPLE])
+        reference = []
+        start = 0
+        while start < len(stream):
+            length = int.from_bytes(stream[start + 4:start + 6], 'little')
+            reference.append(parser.classes[0x01].parse(stream[start + 3], stream[start + 6:start + 6 + length]))
+            start += 8 + length
+        self.assertEqual([m[0] for m in messages], [r[1] for r in reference])
+        for (name, msg), (_, _, ref) in zip(messages, reference):
+            for field in ref._fields:
+                value = getattr(ref, field)
+                if hasattr(value, '_fields'):  # Bit field
+                    if name == 'PVT' and field == 'flags':
+                        self.assertEqual(bool(msg.flags & 0x01), bool(value.gnssFixOK))
+                        self.assertEqual(bool(msg.flags & 0x20), bool(value.headVehValid))
+                    elif name == 'RELPOSNED' and field == 'flags':
+                        self.assertEqual(bool(msg.flags & 0x100), bool(value.relPosHeadingValid))
+                    elif field == 'valid':
+                        self.assertEqual(msg.valid & 0x03, value.validDate | value.validTime << 1)
+                else:
+                    self.assertEqual(getattr(msg, field), value, f'{name}.{field}')
+
+    def test_resynchronize(self):
+        stream = make_ubx_stream(2)
+        corrupted = bytearray(stream[:100])
+        corrupted[50] ^= 0xFF
+        unsupported = b'\xB5\x62\x05\x01\x02\x00\x06\x01\x0F\x38'  # ACK-ACK
+        with self.assertLogs('UBXDecoder', 'ERROR'):
+            messages = UBXDecoder().decode(b'\x00\xB5' + bytes(corrupted) + unsupported + stream)
+        self.assertEqual([m[0] for m in messages], ['PVT', 'RELPOSNED'] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()